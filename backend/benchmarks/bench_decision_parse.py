@@ -0,0 +1,122 @@
+"""Compare meta-router response parsing before and after the tolerant parser.
+
+Run from the repository root::
+
+    python -m backend.benchmarks.bench_decision_parse --iterations 20000
+
+The corpus mixes the response shapes seen in practice: bare JSON, fenced
+JSON, JSON after a sentence of prose, and responses cut off mid-object.
+For each parser it prints the per-call latency by shape and the share of
+responses that would have gone to the fallback. Truncated responses count
+as recovered by the new parser only through the repair call, which is
+simulated here with an instant perfect continuation.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import time
+from typing import Callable, Dict, List
+
+from pydantic import ValidationError
+
+from backend.devolight_router.models import RoutingDecision
+from backend.devolight_router.services.decision_parser import DecisionParseError, parse_decision
+
+DECISION = {
+    "mode": "smart",
+    "selected_roles": [
+        {
+            "name": "AntiochTeacher",
+            "score": 0.9,
+            "reason": "用户询问经文的神学含义，需要先建立救赎脉络。",
+            "handoff_note": "请交给马大姊妹，把「重生」落实到日常生活。",
+        },
+        {
+            "name": "MarthaMentor",
+            "score": 0.82,
+            "reason": "用户希望知道如何在工作中实践。",
+            "handoff_note": "最终输出",
+        },
+    ],
+    "overall_rationale": "先神学后应用，形成由理解到实践的层次。",
+    "fallback_plan": "若用户仍有疑惑，追加路加笔者补充历史背景。",
+    "warnings": [],
+}
+RAW = json.dumps(DECISION, ensure_ascii=False, indent=2)
+
+CORPUS: Dict[str, str] = {
+    "bare": RAW,
+    "fenced": f"```json\n{RAW}\n```",
+    "prose": f"根据用户的问题，我的路由决定如下：\n\n{RAW}\n\n以上。",
+    "truncated": RAW[: len(RAW) * 2 // 3],
+}
+
+
+def legacy_parse(raw: str) -> RoutingDecision:
+    """The fence-stripping ``json.loads`` + ``parse_obj`` path this replaced."""
+    text = raw.strip()
+    if text.startswith("```"):
+        text = text[3:].lstrip()
+        if text.lower().startswith("json"):
+            newline_index = text.find("\n")
+            text = text[newline_index + 1 :] if newline_index != -1 else ""
+        end_fence = text.rfind("```")
+        if end_fence != -1:
+            text = text[:end_fence]
+    if text.endswith("```"):
+        text = text[:-3]
+    return RoutingDecision.parse_obj(json.loads(text.strip()))
+
+
+def new_parse(raw: str) -> RoutingDecision:
+    try:
+        return parse_decision(raw)
+    except DecisionParseError as error:
+        if error.partial is None:
+            raise
+        return parse_decision(error.partial + RAW[len(error.partial) :])
+
+
+def _time(parse: Callable[[str], RoutingDecision], raw: str, iterations: int) -> List[float]:
+    samples: List[float] = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        try:
+            parse(raw)
+        except (ValueError, ValidationError, DecisionParseError):
+            pass
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def _fails(parse: Callable[[str], RoutingDecision], raw: str) -> bool:
+    try:
+        parse(raw)
+    except (ValueError, ValidationError, DecisionParseError):
+        return True
+    return False
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=20_000)
+    args = parser.parse_args()
+
+    for label, parse in (("legacy", legacy_parse), ("new", new_parse)):
+        failures = 0
+        for shape, raw in CORPUS.items():
+            samples = _time(parse, raw, args.iterations)
+            failed = _fails(parse, raw)
+            failures += failed
+            print(
+                f"{label:<7} {shape:<10} p50 {statistics.median(samples) * 1e6:8.2f} us"
+                f"  mean {statistics.mean(samples) * 1e6:8.2f} us"
+                f"  {'FALLBACK' if failed else 'ok'}"
+            )
+        print(f"{label:<7} fallback rate {failures / len(CORPUS):.0%}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+"""Open-loop load test of ``POST /route`` against the fake Claude server.
+
+Run from the repository root::
+
+    python -m backend.benchmarks.bench_load --rps 50 --requests 500 --latency 0.3
+    python -m backend.benchmarks.bench_load --traffic traffic.jsonl --config async-parallel-cache
+    python -m backend.benchmarks.bench_load --url http://127.0.0.1:8000 --rps 20
+
+Traffic lines use the batch format (``{"session_id": ..., "payload": {...}}``);
+without ``--traffic`` a synthetic mix of passages and questions is replayed.
+Requests are sent on a fixed schedule at ``--rps`` regardless of how fast
+earlier ones finish, so queueing shows up in the tail latencies.
+
+Each configuration runs in its own subprocess so the reported peak RSS is
+per configuration. With ``--url`` the running server is loaded as-is.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from .fake_claude import FakeClaudeConfig, start_fake_claude
+
+
+@dataclass(frozen=True)
+class LoadConfig:
+    name: str
+    llm_mode: str = "async"  # "sync" runs the blocking client in worker threads
+    role_concurrency: int = 4
+    cache: bool = False
+
+    def environment(self) -> Dict[str, str]:
+        return {
+            "DEVO_ROLE_CONCURRENCY": str(self.role_concurrency),
+            "DEVO_DECISION_CACHE": "memory" if self.cache else "off",
+            "DEVO_ROLE_CACHE": "memory" if self.cache else "off",
+            "DEVO_SESSION_BACKEND": "memory",
+            "DEVO_LOG_PAYLOAD_SAMPLE": "0",
+        }
+
+
+CONFIGURATIONS: Dict[str, LoadConfig] = {
+    config.name: config
+    for config in (
+        LoadConfig("async-parallel-cache", cache=True),
+        LoadConfig("async-parallel-nocache"),
+        LoadConfig("async-sequential-nocache", role_concurrency=1),
+        LoadConfig("sync-parallel-nocache", llm_mode="sync"),
+    )
+}
+
+SCRIPTURES = ("约3:16", "诗23:1", "罗8:28", "腓4:6", "太5:3", "赛40:31", "林前13:4", "雅1:2")
+QUESTIONS = (
+    "这段经文的核心是什么？",
+    "我该如何在工作中应用？",
+    "当时的历史背景是什么？",
+    "最近很焦虑，这段经文能安慰我吗？",
+)
+
+
+@dataclass
+class LoadResult:
+    name: str
+    sent: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    elapsed_seconds: float = 0.0
+    latencies: List[float] = field(default_factory=list)
+    peak_rss_mb: Optional[float] = None
+
+    def percentile(self, fraction: float) -> float:
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+    @property
+    def throughput(self) -> float:
+        return self.succeeded / self.elapsed_seconds if self.elapsed_seconds > 0 else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        del data["latencies"]
+        data.update(
+            p50_ms=round(self.percentile(0.50) * 1000, 2),
+            p95_ms=round(self.percentile(0.95) * 1000, 2),
+            p99_ms=round(self.percentile(0.99) * 1000, 2),
+            throughput_rps=round(self.throughput, 2),
+        )
+        return data
+
+
+def synthetic_traffic(count: int, *, sessions: int = 50, seed: int = 7) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    return [
+        {
+            "session_id": f"load-{rng.randrange(sessions)}",
+            "payload": {"scripture": rng.choice(SCRIPTURES), "user_question": rng.choice(QUESTIONS)},
+        }
+        for _ in range(count)
+    ]
+
+
+def load_traffic(path: str) -> List[Dict[str, Any]]:
+    traffic: List[Dict[str, Any]] = []
+    with open(path, encoding="utf-8") as handle:
+        for number, line in enumerate(handle, start=1):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            traffic.append(
+                {
+                    "session_id": str(item.get("session_id") or f"load-{number}"),
+                    "payload": item["payload"],
+                }
+            )
+    return traffic
+
+
+async def run_load(
+    client: httpx.AsyncClient, traffic: List[Dict[str, Any]], rps: float, name: str = "load"
+) -> LoadResult:
+    """Send ``traffic`` to ``/route`` on a fixed ``rps`` schedule and collect latencies."""
+    result = LoadResult(name=name)
+    interval = 1.0 / rps
+    started = time.perf_counter()
+
+    async def send(item: Dict[str, Any]) -> None:
+        sent_at = time.perf_counter()
+        try:
+            response = await client.post(
+                "/route", params={"session_id": item["session_id"]}, json=item["payload"]
+            )
+            ok = response.status_code == 200
+        except httpx.HTTPError:
+            ok = False
+        if ok:
+            result.succeeded += 1
+            result.latencies.append(time.perf_counter() - sent_at)
+        else:
+            result.failed += 1
+
+    tasks = []
+    for index, item in enumerate(traffic):
+        delay = started + index * interval - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        result.sent += 1
+        tasks.append(asyncio.ensure_future(send(item)))
+    await asyncio.gather(*tasks)
+    result.elapsed_seconds = time.perf_counter() - started
+    return result
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+
+
+async def run_configuration(
+    config: LoadConfig,
+    traffic: List[Dict[str, Any]],
+    rps: float,
+    fake: Optional[FakeClaudeConfig] = None,
+) -> LoadResult:
+    """Run one configuration in this process against an in-process app and fake upstream."""
+    from backend.devolight_router.container import build_container
+    from backend.devolight_router.main import app
+    from backend.devolight_router.services.llm_client import ClaudeMessagesCallable
+
+    overrides = config.environment()
+    previous = {key: os.environ.get(key) for key in overrides}
+    os.environ.update(overrides)
+    server, base_url = start_fake_claude(config=fake or FakeClaudeConfig())
+    llm = ClaudeMessagesCallable(api_key="bench", base_url=base_url, model="bench")
+    try:
+        if config.llm_mode == "sync":
+
+            def llm_call(prompt: str, payload: Dict) -> str:
+                return llm(prompt, payload)
+
+            container = build_container(llm_call=llm_call)
+        else:
+            container = build_container(llm_call=llm)
+    finally:
+        for key, value in previous.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+    app.state.container = container
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            result = await run_load(client, traffic, rps, name=config.name)
+    finally:
+        del app.state.container
+        await container.aclose()
+        llm.close()
+        server.shutdown()
+    result.peak_rss_mb = _peak_rss_mb()
+    return result
+
+
+def _print_table(results: List[Dict[str, Any]]) -> None:
+    print(
+        f"{'configuration':<26}{'ok':>6}{'fail':>6}{'p50 ms':>10}{'p95 ms':>10}"
+        f"{'p99 ms':>10}{'req/s':>9}{'RSS MB':>9}"
+    )
+    for row in results:
+        print(
+            f"{row['name']:<26}{row['succeeded']:>6}{row['failed']:>6}{row['p50_ms']:>10.1f}"
+            f"{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}{row['throughput_rps']:>9.1f}"
+            f"{(row['peak_rss_mb'] or 0):>9.1f}"
+        )
+
+
+def _fake_config(args: argparse.Namespace) -> FakeClaudeConfig:
+    return FakeClaudeConfig(
+        latency_seconds=args.latency,
+        latency=args.distribution,
+        error_rate=args.error_rate,
+        output_tokens=args.output_tokens,
+        seed=7,
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--rps", type=float, default=50.0)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--traffic", help="JSONL traffic file (batch input format)")
+    parser.add_argument(
+        "--config",
+        action="append",
+        choices=sorted(CONFIGURATIONS),
+        help="configuration(s) to run; default all",
+    )
+    parser.add_argument("--url", help="load an already running server instead")
+    parser.add_argument("--latency", type=float, default=0.3, help="fake upstream mean latency")
+    parser.add_argument(
+        "--distribution", choices=("fixed", "uniform", "lognormal"), default="lognormal"
+    )
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--output-tokens", type=int, default=300)
+    parser.add_argument("--json", action="store_true", help="print JSON lines instead of a table")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    traffic = load_traffic(args.traffic) if args.traffic else synthetic_traffic(args.requests)
+    traffic = traffic[: args.requests]
+
+    if args.worker:
+        logging.disable(logging.WARNING)
+        result = asyncio.run(
+            run_configuration(CONFIGURATIONS[args.worker], traffic, args.rps, _fake_config(args))
+        )
+        print(json.dumps(result.to_dict(), ensure_ascii=False))
+        return
+
+    if args.url:
+
+        async def against_url() -> LoadResult:
+            async with httpx.AsyncClient(base_url=args.url, timeout=120.0) as client:
+                return await run_load(client, traffic, args.rps, name=args.url)
+
+        results = [asyncio.run(against_url()).to_dict()]
+    else:
+        passthrough = list(argv if argv is not None else sys.argv[1:])
+        results = []
+        for name in args.config or list(CONFIGURATIONS):
+            # one subprocess per configuration keeps peak RSS comparable
+            output = subprocess.run(
+                [
+                    sys.executable,
+                    "-m",
+                    "backend.benchmarks.bench_load",
+                    *passthrough,
+                    "--worker",
+                    name,
+                ],
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+            results.append(json.loads(output.strip().splitlines()[-1]))
+    if args.json:
+        for row in results:
+            print(json.dumps(row, ensure_ascii=False))
+    else:
+        _print_table(results)
+
+
+if __name__ == "__main__":
+    main()
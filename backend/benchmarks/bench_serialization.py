@@ -0,0 +1,161 @@
+"""Measure serialization CPU per request on the ``/route`` hot path.
+
+Run from the repository root::
+
+    python -m backend.benchmarks.bench_serialization --requests 20000
+    python -m backend.benchmarks.bench_serialization --requests 5000 --concurrency 200 --app
+
+The first part replays the encode/decode work of one routed request (meta
+call plus two role calls and the response) with the previous
+``json.dumps`` / httpx ``json=`` / ``response_model`` path and with the
+single-encoding path, and prints process CPU per request. ``--app`` also
+drives ``POST /route`` in-process at the given concurrency with instant
+stub LLMs, so the CPU per request reported there is the whole framework
+overhead that remains once the LLM latency is removed.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+from typing import Callable, Dict, List
+
+import httpx
+from fastapi.encoders import jsonable_encoder
+
+from backend.devolight_router.container import AppContainer
+from backend.devolight_router.main import (
+    RoleOutputModel,
+    RouterResponseModel,
+    app,
+    get_container,
+    router_response_body,
+)
+from backend.devolight_router.services.decision_parser import parse_decision
+from backend.devolight_router.services.executor import build_default_orchestrator
+from backend.devolight_router.services.meta_client import MetaRouterClient
+from backend.devolight_router.services.router import RoleExecutionResult, RouterResult, RouterService
+from backend.devolight_router.services.serialization import EncodedPayload, dumps, dumps_str
+
+from .bench_decision_parse import RAW as DECISION_RAW
+
+PAYLOAD: Dict = {
+    "scripture": "约3:16",
+    "user_question": "神爱世人，甚至将他的独生子赐给他们，这对我今天的焦虑有什么意义？",
+    "user_profile": {"age_group": "30-40", "profession": "工程师", "concerns": ["工作", "家庭"]},
+    "spiritual_state": "疲惫但渴慕",
+    "session_stage": "深入",
+    "history_summary": "用户此前读过诗篇23篇，关注在压力中信靠神。" * 4,
+}
+ROLE_OUTPUT = "神的爱不是抽象的概念，而是在基督里具体显明的行动。" * 20
+
+
+def _body(text: str) -> Dict:
+    return {
+        "model": "m",
+        "max_tokens": 1024,
+        "temperature": 0.3,
+        "system": "提示词",
+        "messages": [{"role": "user", "content": [{"type": "text", "text": text}]}],
+    }
+
+
+def legacy_request() -> bytes:
+    for _ in range(3):  # meta router + two roles
+        text = json.dumps(PAYLOAD, ensure_ascii=False)
+        json.dumps(PAYLOAD, ensure_ascii=False)  # scheduler token estimate
+        json.dumps(_body(text)).encode("utf-8")  # httpx json=
+    decision = parse_decision(DECISION_RAW)
+    model = RouterResponseModel(
+        decision=decision,
+        role_outputs=[
+            RoleOutputModel(role_name=role.name, content=ROLE_OUTPUT)
+            for role in decision.selected_roles
+        ],
+        warnings=[],
+    )
+    validated = RouterResponseModel.validate(model)  # response_model re-validation
+    return json.dumps(
+        jsonable_encoder(validated), ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def new_request() -> bytes:
+    for _ in range(3):
+        payload = EncodedPayload(PAYLOAD)
+        dumps(_body(payload.json))
+        payload.json  # scheduler token estimate reuses the text
+    decision = parse_decision(DECISION_RAW)
+    result = RouterResult(
+        decision=decision,
+        role_outputs=[
+            RoleExecutionResult(role_name=role.name, content=ROLE_OUTPUT)
+            for role in decision.selected_roles
+        ],
+        warnings=[],
+    )
+    return router_response_body(result)
+
+
+def _cpu_per_call(function: Callable[[], bytes], calls: int) -> float:
+    started = time.process_time()
+    for _ in range(calls):
+        function()
+    return (time.process_time() - started) / calls
+
+
+async def _drive_app(requests: int, concurrency: int) -> List[float]:
+    def llm_call(prompt: str, payload: Dict) -> str:
+        return DECISION_RAW if "selected_roles" in prompt else ROLE_OUTPUT
+
+    service = RouterService(
+        meta_client=MetaRouterClient(llm_call), orchestrator=build_default_orchestrator(llm_call)
+    )
+    container = AppContainer(router_service=service)
+    app.dependency_overrides[get_container] = lambda: container
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+            async def one(index: int) -> None:
+                async with semaphore:
+                    response = await client.post(
+                        "/route", params={"session_id": f"s-{index % 500}"}, content=dumps_str(PAYLOAD)
+                    )
+                    response.raise_for_status()
+
+            started_cpu = time.process_time()
+            started = time.perf_counter()
+            await asyncio.gather(*(one(index) for index in range(requests)))
+            return [time.process_time() - started_cpu, time.perf_counter() - started]
+    finally:
+        app.dependency_overrides.clear()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--app", action="store_true", help="also drive POST /route in-process")
+    args = parser.parse_args()
+
+    assert json.loads(legacy_request()) == json.loads(new_request())
+    legacy = _cpu_per_call(legacy_request, args.requests)
+    new = _cpu_per_call(new_request, args.requests)
+    print(f"serialization legacy : {legacy * 1e6:8.1f} us CPU/request")
+    print(f"serialization new    : {new * 1e6:8.1f} us CPU/request  ({1 - new / legacy:.0%} less)")
+
+    if args.app:
+        logging.disable(logging.WARNING)
+        cpu, wall = asyncio.run(_drive_app(args.requests, args.concurrency))
+        print(
+            f"POST /route in-process: {args.requests / wall:8.0f} req/s"
+            f"  {cpu / args.requests * 1e6:8.1f} us CPU/request"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Compare bytes per session held by the in-memory session repository.
+
+Run from the repository root::
+
+    python -m backend.benchmarks.bench_session_memory --sessions 200000 --calls 20
+
+"pydantic" is the previous layout: an ``OrderedDict`` of
+``(last_access, SessionState)`` with one ``RoleCallRecord`` per call.
+"compact" is :class:`InMemorySessionRepository` as it is now. Both hold
+the same sessions; memory is measured with ``tracemalloc`` and includes
+the session-id keys and the summaries.
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import time
+import tracemalloc
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Callable
+
+from backend.devolight_router.models import RoleCallRecord, SessionState
+from backend.devolight_router.services.sessions import InMemorySessionRepository
+
+ROLES = ("AntiochTeacher", "LukeScribe", "MarthaMentor", "BarnabasCompanion")
+STATES = ("平安", "疲惫", "焦虑", "渴慕")
+
+
+def _state(index: int, calls: int) -> SessionState:
+    started = datetime(2026, 1, 1) + timedelta(minutes=index)
+    return SessionState(
+        session_id=f"session-{index}",
+        summary=f"用户读过约翰福音第{index % 21 + 1}章，关注信靠。",
+        last_known_spiritual_state=STATES[index % len(STATES)],
+        recent_calls=[
+            RoleCallRecord(role_name=ROLES[(index + call) % len(ROLES)], timestamp=started + timedelta(seconds=call))
+            for call in range(calls)
+        ],
+    )
+
+
+def _populate_pydantic(sessions: int, calls: int) -> Any:
+    store: "OrderedDict[str, Any]" = OrderedDict()
+    for index in range(sessions):
+        state = _state(index, calls)
+        store[state.session_id] = (time.monotonic(), state)
+    return store
+
+
+def _populate_compact(sessions: int, calls: int) -> Any:
+    repository = InMemorySessionRepository(max_sessions=sessions, max_recent_calls=calls)
+    for index in range(sessions):
+        repository.save(_state(index, calls))
+    return repository
+
+
+def _bytes_per_session(populate: Callable[[int, int], Any], sessions: int, calls: int) -> float:
+    gc.collect()
+    tracemalloc.start()
+    store = populate(sessions, calls)
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del store
+    return current / sessions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=200_000)
+    parser.add_argument("--calls", type=int, default=20)
+    args = parser.parse_args()
+
+    before = _bytes_per_session(_populate_pydantic, args.sessions, args.calls)
+    after = _bytes_per_session(_populate_compact, args.sessions, args.calls)
+    print(f"sessions            : {args.sessions} x {args.calls} calls")
+    print(f"pydantic bytes/sess : {before:10.0f}")
+    print(f"compact bytes/sess  : {after:10.0f}  ({1 - after / before:.0%} less)")
+    print(f"at 1M sessions      : {before * 1e6 / 2**30:6.2f} GiB -> {after * 1e6 / 2**30:6.2f} GiB")
+
+
+if __name__ == "__main__":
+    main()
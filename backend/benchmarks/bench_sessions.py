@@ -0,0 +1,74 @@
+"""Measure session repository get/save throughput at a large session count.
+
+Run from the repository root::
+
+    python -m backend.benchmarks.bench_sessions --backend memory --sessions 1000000
+    python -m backend.benchmarks.bench_sessions --backend sqlite --sessions 1000000 --path /tmp/s.db
+
+Each session is saved once with one role call (population phase), then a
+random sample is read back, given one new call and saved again.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import time
+
+from backend.devolight_router.models import RoleCallRecord, SessionState
+from backend.devolight_router.services.sessions import (
+    InMemorySessionRepository,
+    SQLiteSessionRepository,
+)
+
+ROLES = ("AntiochTeacher", "LukeScribe", "MarthaMentor", "BarnabasCompanion")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--backend", choices=("memory", "sqlite"), default="memory")
+    parser.add_argument("--sessions", type=int, default=1_000_000)
+    parser.add_argument("--operations", type=int, default=100_000)
+    parser.add_argument("--path", default="bench_sessions.sqlite3")
+    args = parser.parse_args()
+
+    if args.backend == "memory":
+        repository = InMemorySessionRepository(max_sessions=args.sessions)
+    else:
+        if os.path.exists(args.path):
+            os.remove(args.path)
+        repository = SQLiteSessionRepository(args.path)
+
+    started = time.perf_counter()
+    for index in range(args.sessions):
+        state = SessionState(session_id=f"session-{index}", summary="初次灵修")
+        state.recent_calls.append(RoleCallRecord(role_name=ROLES[index % len(ROLES)]))
+        repository.save(state)
+    populate = time.perf_counter() - started
+
+    rng = random.Random(7)
+    sample = [f"session-{rng.randrange(args.sessions)}" for _ in range(args.operations)]
+    started = time.perf_counter()
+    for session_id in sample:
+        repository.get(session_id)
+    get_elapsed = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for session_id in sample:
+        state = repository.get(session_id)
+        state.recent_calls.append(RoleCallRecord(role_name=rng.choice(ROLES)))
+        repository.save(state)
+    update_elapsed = time.perf_counter() - started
+
+    print(f"backend            : {args.backend}")
+    print(f"sessions           : {args.sessions}")
+    print(f"populate save/s    : {args.sessions / populate:12.0f}")
+    print(f"get/s              : {args.operations / get_elapsed:12.0f}")
+    print(f"get+append+save/s  : {args.operations / update_elapsed:12.0f}")
+    close = getattr(repository, "close", None)
+    if close:
+        close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Compare per-request service construction with the startup container.
+
+Run from the repository root::
+
+    python -m backend.benchmarks.bench_startup --requests 2000
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import time
+
+from backend.devolight_router.container import build_container
+
+
+async def _rebuild(requests: int) -> None:
+    for _ in range(requests):
+        # a per-request container owns its pools, so it has to be closed every time
+        await build_container().aclose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+    os.environ.setdefault("DEVO_CLAUDE_API_KEY", "benchmark-key")
+
+    started = time.perf_counter()
+    container = build_container()
+    startup = time.perf_counter() - started
+
+    started = time.perf_counter()
+    asyncio.run(_rebuild(args.requests))
+    per_request_build = (time.perf_counter() - started) / args.requests
+
+    started = time.perf_counter()
+    for _ in range(args.requests):
+        container.router_service  # noqa: B018 - dependency resolution cost
+    per_request_singleton = (time.perf_counter() - started) / args.requests
+
+    print(f"startup (one-off)            : {startup * 1000:8.3f} ms")
+    print(f"per-request rebuild + close  : {per_request_build * 1e6:8.1f} us")
+    print(f"per-request singleton lookup : {per_request_singleton * 1e6:8.3f} us")
+    asyncio.run(container.aclose())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Measure the latency gain of the pooled Claude transport over per-call connections.
+
+Run from the repository root::
+
+    python -m backend.benchmarks.bench_transport --calls 500
+
+The fake server speaks plain HTTP, so the gain shown is the TCP handshake
+alone; against a TLS endpoint the saving per call is larger.
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+from typing import List
+
+import httpx
+
+from backend.devolight_router.services.llm_client import ClaudeMessagesCallable, TransportSettings
+
+from .fake_claude import start_fake_claude
+
+
+def _measure(llm_call: ClaudeMessagesCallable, calls: int) -> List[float]:
+    samples: List[float] = []
+    payload = {"scripture": "约3:16", "user_question": "这段经文的核心是什么？"}
+    for _ in range(calls):
+        started = time.perf_counter()
+        llm_call("system prompt", payload)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def _report(label: str, samples: List[float]) -> None:
+    ordered = sorted(samples)
+    p95 = ordered[int(len(ordered) * 0.95) - 1]
+    print(
+        f"{label:<22} mean {statistics.mean(samples) * 1000:7.3f} ms"
+        f"  p50 {statistics.median(samples) * 1000:7.3f} ms  p95 {p95 * 1000:7.3f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.0, help="fake server latency in seconds")
+    args = parser.parse_args()
+
+    server, base_url = start_fake_claude(latency_seconds=args.latency)
+    try:
+        no_keepalive = TransportSettings(max_keepalive_connections=0)
+        fresh = ClaudeMessagesCallable(
+            api_key="bench",
+            base_url=base_url,
+            model="bench",
+            client=httpx.Client(limits=no_keepalive.limits(), timeout=no_keepalive.timeout()),
+        )
+        pooled = ClaudeMessagesCallable(api_key="bench", base_url=base_url, model="bench")
+        _report("new connection per call", _measure(fresh, args.calls))
+        _report("pooled keep-alive", _measure(pooled, args.calls))
+        fresh.close()
+        pooled.close()
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""Local stand-in for the Claude Messages API used by benchmarks.
+
+Requests whose system prompt is the meta-router prompt get a routing
+decision; every other request gets role text. Latency, error rate, token
+counts and streaming are configurable through :class:`FakeClaudeConfig`.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_DECISION: Dict[str, Any] = {
+    "mode": "smart",
+    "selected_roles": [
+        {"name": "AntiochTeacher", "score": 0.9, "reason": "神学", "handoff_note": "最终输出"},
+        {"name": "LukeScribe", "score": 0.8, "reason": "背景", "handoff_note": "最终输出"},
+        {"name": "MarthaMentor", "score": 0.7, "reason": "应用", "handoff_note": "最终输出"},
+    ],
+    "overall_rationale": "神学、背景与应用并行。",
+    "fallback_plan": "若失败则只保留成功角色。",
+    "warnings": [],
+}
+
+
+@dataclass
+class FakeClaudeConfig:
+    """Behaviour of the fake upstream.
+
+    ``latency`` is ``fixed`` (always ``latency_seconds``), ``uniform``
+    (0..2x the mean) or ``lognormal`` (mean ``latency_seconds``, shape
+    ``latency_sigma``), which matches the long tail of real LLM calls.
+    ``error_rate`` of requests fail with ``error_status`` (529 = overloaded).
+    """
+
+    latency_seconds: float = 0.0
+    latency: str = "fixed"
+    latency_sigma: float = 0.5
+    error_rate: float = 0.0
+    error_status: int = 529
+    input_tokens: int = 800
+    output_tokens: int = 300
+    stream_chunks: int = 8
+    role_text: str = "这是一段用于压测的角色回应。" * 8
+    decision: Dict[str, Any] = field(default_factory=lambda: dict(DEFAULT_DECISION))
+    seed: Optional[int] = None
+
+    def __post_init__(self) -> None:
+        if self.latency not in ("fixed", "uniform", "lognormal"):
+            raise ValueError(f"未知延迟分布: {self.latency}")
+        self._rng = random.Random(self.seed)
+        self._lock = threading.Lock()
+
+    def sample_latency(self) -> float:
+        if self.latency_seconds <= 0:
+            return 0.0
+        with self._lock:
+            if self.latency == "uniform":
+                return self._rng.uniform(0.0, 2 * self.latency_seconds)
+            if self.latency == "lognormal":
+                # choose mu so that the distribution mean equals latency_seconds
+                mu = math.log(self.latency_seconds) - self.latency_sigma ** 2 / 2
+                return self._rng.lognormvariate(mu, self.latency_sigma)
+            return self.latency_seconds
+
+    def should_fail(self) -> bool:
+        if self.error_rate <= 0:
+            return False
+        with self._lock:
+            return self._rng.random() < self.error_rate
+
+
+class FakeClaudeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    config = FakeClaudeConfig()
+
+    def do_POST(self) -> None:  # noqa: N802 - http.server naming
+        length = int(self.headers.get("Content-Length", "0"))
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            request = {}
+        config = self.config
+        delay = config.sample_latency()
+        if config.should_fail():
+            time.sleep(delay / 2)
+            self._send_json(
+                config.error_status,
+                {"type": "error", "error": {"type": "overloaded_error", "message": "fake overload"}},
+            )
+            return
+        text = self._reply_text(request)
+        usage = {"input_tokens": config.input_tokens, "output_tokens": config.output_tokens}
+        if request.get("stream"):
+            self._stream(text, usage, delay)
+            return
+        time.sleep(delay)
+        self._send_json(200, {"content": [{"type": "text", "text": text}], "usage": usage})
+
+    def _reply_text(self, request: Dict[str, Any]) -> str:
+        system = request.get("system")
+        if isinstance(system, list):
+            system = "".join(block.get("text", "") for block in system if isinstance(block, dict))
+        if isinstance(system, str) and "selected_roles" in system:
+            return json.dumps(self.config.decision, ensure_ascii=False)
+        return self.config.role_text
+
+    def _send_json(self, status: int, payload: Dict[str, Any]) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream(self, text: str, usage: Dict[str, int], delay: float) -> None:
+        chunks = max(1, self.config.stream_chunks)
+        size = max(1, -(-len(text) // chunks))
+        pieces: List[str] = [text[start : start + size] for start in range(0, len(text), size)]
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        self._write_event(
+            {"type": "message_start", "message": {"usage": {"input_tokens": usage["input_tokens"]}}}
+        )
+        for piece in pieces:
+            time.sleep(delay / len(pieces))
+            self._write_event(
+                {"type": "content_block_delta", "delta": {"type": "text_delta", "text": piece}}
+            )
+        self._write_event(
+            {"type": "message_delta", "usage": {"output_tokens": usage["output_tokens"]}}
+        )
+        self._write_event({"type": "message_stop"})
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _write_event(self, event: Dict[str, Any]) -> None:
+        data = f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+        raw = data.encode("utf-8")
+        self.wfile.write(f"{len(raw):x}\r\n".encode("ascii") + raw + b"\r\n")
+        self.wfile.flush()
+
+    def log_message(self, format: str, *args) -> None:  # noqa: A002
+        return
+
+
+class _FakeServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256  # the default of 5 drops connections under load tests
+
+
+def start_fake_claude(
+    host: str = "127.0.0.1",
+    port: int = 0,
+    *,
+    latency_seconds: float = 0.0,
+    config: Optional[FakeClaudeConfig] = None,
+) -> Tuple[ThreadingHTTPServer, str]:
+    """Start the fake server on a background thread and return it with its base URL."""
+    config = config or FakeClaudeConfig(latency_seconds=latency_seconds)
+    handler = type("ConfiguredHandler", (FakeClaudeHandler,), {"config": config})
+    server = _FakeServer((host, port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main() -> None:
+    """Serve the fake API in the foreground, e.g. for a manually started backend."""
+    parser = argparse.ArgumentParser(description="Fake Claude Messages API")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--latency", type=float, default=0.5, help="mean latency in seconds")
+    parser.add_argument(
+        "--distribution", choices=("fixed", "uniform", "lognormal"), default="lognormal"
+    )
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--output-tokens", type=int, default=300)
+    args = parser.parse_args()
+    server, base_url = start_fake_claude(
+        port=args.port,
+        config=FakeClaudeConfig(
+            latency_seconds=args.latency,
+            latency=args.distribution,
+            error_rate=args.error_rate,
+            output_tokens=args.output_tokens,
+        ),
+    )
+    print(f"Fake Claude API listening on {base_url} (set DEVO_CLAUDE_BASE_URL to it)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
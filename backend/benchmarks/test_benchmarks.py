@@ -0,0 +1,49 @@
+"""pytest-benchmark entry points for regression tracking.
+
+Run from the repository root::
+
+    python -m pytest backend/benchmarks --benchmark-only --benchmark-autosave
+    python -m pytest backend/benchmarks --benchmark-only --benchmark-compare
+
+Skipped unless pytest-benchmark is installed.
+"""
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from .bench_decision_parse import CORPUS, new_parse  # noqa: E402
+from .bench_load import CONFIGURATIONS, run_configuration, synthetic_traffic  # noqa: E402
+from .bench_serialization import new_request  # noqa: E402
+from .fake_claude import FakeClaudeConfig  # noqa: E402
+
+
+@pytest.mark.parametrize("name", sorted(CONFIGURATIONS))
+def test_route_under_load(benchmark, name):
+    traffic = synthetic_traffic(60)
+    fake = FakeClaudeConfig(latency_seconds=0.02, latency="lognormal", seed=7)
+
+    result = benchmark.pedantic(
+        lambda: asyncio.run(run_configuration(CONFIGURATIONS[name], traffic, 60.0, fake)),
+        rounds=3,
+        iterations=1,
+    )
+
+    benchmark.extra_info.update(result.to_dict())
+    assert result.failed == 0
+
+
+@pytest.mark.parametrize("shape", sorted(CORPUS))
+def test_parse_meta_router_response(benchmark, shape):
+    decision = benchmark(new_parse, CORPUS[shape])
+
+    assert decision.selected_roles
+
+
+def test_route_serialization(benchmark):
+    body = benchmark(new_request)
+
+    assert body.startswith(b"{")
@@ -0,0 +1,249 @@
+"""Batch routing for pre-generating devotionals.
+
+Usage (from the ``backend`` directory)::
+
+    python -m devolight_router.batch input.jsonl out.jsonl
+
+Each input line is ``{"id": ..., "session_id": ..., "payload": {...}}``
+(``request_id`` is accepted in place of ``id``; lines without either are
+numbered). Output lines are appended as they complete, so re-running with
+the same output file skips every id already written.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Iterable, Optional, Set, Union
+
+from .container import build_container
+from .services.rate_limit import RateLimiterRegistry
+from .services.router import RouterResult, RouterService
+from .services.scheduler import BATCH, traffic_class
+
+LOGGER = logging.getLogger(__name__)
+if not LOGGER.handlers:
+    handler = logging.StreamHandler()
+    handler.setLevel(logging.INFO)
+    formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+    handler.setFormatter(formatter)
+    LOGGER.addHandler(handler)
+LOGGER.setLevel(logging.INFO)
+LOGGER.propagate = False
+
+
+@dataclass
+class BatchReport:
+    total: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    skipped: int = 0
+    elapsed_seconds: float = 0.0
+
+    @property
+    def requests_per_minute(self) -> float:
+        processed = self.succeeded + self.failed
+        if not processed or self.elapsed_seconds <= 0:
+            return 0.0
+        return processed * 60.0 / self.elapsed_seconds
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**asdict(self), "requests_per_minute": round(self.requests_per_minute, 2)}
+
+
+def result_to_dict(result: RouterResult) -> Dict[str, Any]:
+    return {
+        "decision": result.decision.dict(),
+        "role_outputs": [
+            {"role_name": output.role_name, "content": output.content}
+            for output in result.role_outputs
+        ],
+        "warnings": result.warnings,
+    }
+
+
+def load_completed_ids(path: str) -> Set[str]:
+    """Return ids already written to an output file (the resume checkpoint)."""
+    completed: Set[str] = set()
+    if not os.path.exists(path):
+        return completed
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # a torn final line from an interrupted run
+            if isinstance(record, dict) and "id" in record and "result" in record:
+                completed.add(str(record["id"]))
+    return completed
+
+
+async def _aiter_lines(lines: Union[Iterable[str], AsyncIterable[str]]) -> AsyncIterator[str]:
+    if hasattr(lines, "__aiter__"):
+        async for line in lines:  # type: ignore[union-attr]
+            yield line
+    else:
+        for line in lines:  # type: ignore[union-attr]
+            yield line
+
+
+class BatchRunner:
+    """Routes JSONL items with bounded concurrency and a per-key rate limit."""
+
+    def __init__(
+        self,
+        service: RouterService,
+        *,
+        concurrency: int = 8,
+        rate_limiter: Optional[RateLimiterRegistry] = None,
+        limiter_key: str = "default",
+        completed_ids: Optional[Set[str]] = None,
+    ) -> None:
+        if concurrency < 1:
+            raise ValueError("concurrency 必须至少为 1。")
+        self._service = service
+        self._concurrency = concurrency
+        self._rate_limiter = rate_limiter
+        self._limiter_key = limiter_key
+        self._completed_ids = completed_ids or set()
+        self.report = BatchReport()
+
+    async def run(
+        self, lines: Union[Iterable[str], AsyncIterable[str]]
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yield one output record per input line, in completion order."""
+        items: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue(maxsize=self._concurrency * 2)
+        records: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue()
+        started = time.perf_counter()
+
+        async def produce() -> None:
+            number = 0
+            try:
+                async for line in _aiter_lines(lines):
+                    if not line.strip():
+                        continue
+                    number += 1
+                    self.report.total += 1
+                    item = self._parse_line(line, number)
+                    if item["id"] in self._completed_ids:
+                        self.report.skipped += 1
+                        continue
+                    if "error" in item:
+                        self.report.failed += 1
+                        await records.put(item)
+                        continue
+                    await items.put(item)
+            finally:
+                for _ in range(self._concurrency):
+                    await items.put(None)
+
+        async def work() -> None:
+            with traffic_class(BATCH):  # queued behind interactive LLM calls
+                while True:
+                    item = await items.get()
+                    if item is None:
+                        break
+                    await records.put(await self._process(item))
+            await records.put(None)
+
+        producer = asyncio.ensure_future(produce())
+        workers = [asyncio.ensure_future(work()) for _ in range(self._concurrency)]
+        finished = 0
+        try:
+            while finished < len(workers):
+                record = await records.get()
+                if record is None:
+                    finished += 1
+                    continue
+                yield record
+            await producer
+        finally:
+            for task in (producer, *workers):
+                task.cancel()
+            self.report.elapsed_seconds = time.perf_counter() - started
+
+    @staticmethod
+    def _parse_line(line: str, number: int) -> Dict[str, Any]:
+        try:
+            raw = json.loads(line)
+        except ValueError as exc:
+            return {"id": f"line-{number}", "error": f"无法解析 JSON: {exc}"}
+        if not isinstance(raw, dict) or not isinstance(raw.get("payload"), dict):
+            return {"id": f"line-{number}", "error": "每行必须包含 payload 对象。"}
+        item_id = str(raw.get("id") or raw.get("request_id") or f"line-{number}")
+        session_id = str(raw.get("session_id") or item_id)
+        return {"id": item_id, "session_id": session_id, "payload": raw["payload"]}
+
+    async def _process(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        if self._rate_limiter is not None:
+            await self._rate_limiter.acquire(self._limiter_key)
+        record: Dict[str, Any] = {"id": item["id"], "session_id": item["session_id"]}
+        try:
+            result = await self._service.route(item["session_id"], item["payload"])
+        except Exception as exc:  # noqa: BLE001 - one bad item must not stop the batch
+            LOGGER.warning("Batch item %s failed: %s", item["id"], exc)
+            self.report.failed += 1
+            record["error"] = str(exc)
+            return record
+        degraded = [output.role_name for output in result.role_outputs if output.freshness != "fresh"]
+        if degraded:
+            # not written as a result, so a resumed run retries the item
+            LOGGER.warning("Batch item %s got degraded outputs for %s", item["id"], degraded)
+            self.report.failed += 1
+            record["error"] = f"角色 {', '.join(degraded)} 返回了降级内容。"
+            return record
+        self.report.succeeded += 1
+        record["result"] = result_to_dict(result)
+        return record
+
+
+async def _run_cli(args: argparse.Namespace) -> BatchReport:
+    container = build_container()
+    completed = load_completed_ids(args.output) if args.resume else set()
+    runner = BatchRunner(
+        container.router_service,
+        concurrency=args.concurrency,
+        rate_limiter=RateLimiterRegistry(args.rpm),
+        limiter_key=getattr(container.llm_callable, "key_id", "default"),
+        completed_ids=completed,
+    )
+    try:
+        with open(args.input, encoding="utf-8") as source, open(
+            args.output, "a" if args.resume else "w", encoding="utf-8"
+        ) as sink:
+            async for record in runner.run(source):
+                sink.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+                sink.flush()
+    finally:
+        await container.aclose()
+    return runner.report
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="DevoLight batch router")
+    parser.add_argument("input", help="input JSONL path")
+    parser.add_argument("output", help="output JSONL path (also the resume checkpoint)")
+    parser.add_argument(
+        "--concurrency", type=int, default=int(os.getenv("DEVO_BATCH_CONCURRENCY", "8"))
+    )
+    parser.add_argument(
+        "--rpm",
+        type=float,
+        default=float(os.getenv("DEVO_BATCH_RPM", "600")),
+        help="requests per minute per LLM key",
+    )
+    parser.add_argument(
+        "--no-resume", dest="resume", action="store_false", help="overwrite the output file"
+    )
+    args = parser.parse_args(argv)
+    report = asyncio.run(_run_cli(args))
+    print(json.dumps(report.to_dict(), ensure_ascii=False), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
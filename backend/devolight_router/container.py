@@ -0,0 +1,494 @@
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Union
+
+from .prompts import PromptRegistry, default_registry, load_variant_weights
+from .services.cache import build_cache_backend
+from .services.compaction import ContextCompactor, load_compaction_policies
+from .services.degradation import DegradationPolicy
+from .services.executor import build_default_orchestrator
+from .services.fast_path import FastPathConfig, FastPathRouter
+from .services.kv import KeyValueStore, KeyValueStoreError, build_kv_store
+from .services.llm_client import (
+    AsyncLLMCallable,
+    ClaudeMessagesCallable,
+    ClaudeMessagesError,
+    LLMCallable,
+)
+from .services.meta_client import DecisionCache, MetaRouterClient
+from .services.observability import configure_payload_logging, configure_pricing
+from .services.rate_limit import RateLimiterRegistry
+from .services.resilience import (
+    CircuitBreakerRegistry,
+    HedgedLLMCallable,
+    ResilientLLMCallable,
+    RetryPolicy,
+)
+from .services.role_cache import RoleOutputCache, load_role_cache_policies
+from .services.scheduler import LLMScheduler, ScheduledLLMCallable
+from .services.router import (
+    ContextBuilder,
+    ExecutionOrchestrator,
+    FallbackManager,
+    RouterService,
+    SessionLocks,
+)
+from .services.sessions import (
+    InMemorySessionRepository,
+    KeyValueSessionRepository,
+    SessionRepository,
+    SQLiteSessionRepository,
+)
+from .services.speculation import RolePredictor, RoleSpeculator
+from .services.summarizer import SessionSummarizer
+
+
+@dataclass
+class AppContainer:
+    """Process-wide services built once at application startup."""
+
+    router_service: RouterService
+    llm_callable: Optional[Union[LLMCallable, AsyncLLMCallable]] = None
+    prompt_names: List[str] = field(default_factory=list)
+    decision_cache: Optional[DecisionCache] = None
+    session_repository: Optional[SessionRepository] = None
+    batch_concurrency: int = 8
+    batch_rate_limiter: Optional[RateLimiterRegistry] = None
+    resilient_llm: Optional[ResilientLLMCallable] = None
+    meta_llm: Optional[HedgedLLMCallable] = None
+    circuit_breakers: Optional[CircuitBreakerRegistry] = None
+    fast_path: Optional[FastPathRouter] = None
+    role_cache: Optional[RoleOutputCache] = None
+    compactor: Optional[ContextCompactor] = None
+    summarizer: Optional[SessionSummarizer] = None
+    orchestrator: Optional[ExecutionOrchestrator] = None
+    kv_store: Optional[KeyValueStore] = None
+    prompts: Optional[PromptRegistry] = None
+    scheduler: Optional[LLMScheduler] = None
+    speculator: Optional[RoleSpeculator] = None
+    degradation: Optional[DegradationPolicy] = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Return counters of the process-wide caches."""
+        stats: Dict[str, Any] = {"router": self.router_service.stats()}
+        if self.decision_cache is not None:
+            stats["decision_cache"] = self.decision_cache.stats.snapshot()
+        if self.role_cache is not None:
+            stats["role_cache"] = self.role_cache.stats.snapshot()
+        usage = getattr(self.llm_callable, "usage", None)
+        if usage is not None:
+            stats["llm_usage"] = usage.snapshot()
+        if self.compactor is not None:
+            stats["context_compaction"] = self.compactor.stats()
+        if self.summarizer is not None:
+            stats["session_summarizer"] = self.summarizer.stats()
+        kv_stats = getattr(self.kv_store, "stats", None)
+        if callable(kv_stats):
+            stats["kv_store"] = kv_stats()
+        if self.scheduler is not None:
+            stats["llm_scheduler"] = self.scheduler.stats()
+        if self.speculator is not None:
+            stats["speculation"] = self.speculator.stats()
+        if self.degradation is not None:
+            stats["degradation"] = self.degradation.stats()
+        if self.prompts is not None:
+            stats["prompts"] = self.prompts.stats()
+        if self.fast_path is not None:
+            stats["fast_path"] = self.fast_path.stats()
+        if self.resilient_llm is not None:
+            stats["llm_resilience"] = {
+                "retries": self.resilient_llm.retries,
+                "hedges": self.meta_llm.hedges if self.meta_llm is not None else 0,
+                "circuits": self.circuit_breakers.states() if self.circuit_breakers else {},
+            }
+        return stats
+
+    async def aclose(self) -> None:
+        """Release resources held by the container."""
+        if self.prompts is not None:
+            self.prompts.stop_watching()
+        if self.summarizer is not None:
+            await self.summarizer.aclose()
+        if self.degradation is not None:
+            await self.degradation.aclose()
+        await _close_resource(self.llm_callable)
+        if self.decision_cache is not None:
+            await _close_resource(self.decision_cache.backend)
+        if self.role_cache is not None:
+            await _close_resource(self.role_cache.backend)
+        await _close_resource(self.session_repository)
+        await _close_resource(self.kv_store)
+
+
+async def _close_resource(resource: Any) -> None:
+    aclose = getattr(resource, "aclose", None)
+    if callable(aclose):
+        await aclose()
+        return
+    close = getattr(resource, "close", None)
+    if callable(close):
+        close()
+
+
+def _env_int(name: str, default: int, *, minimum: int = 1) -> int:
+    raw = os.getenv(name)
+    if raw is None:
+        return default
+    try:
+        value = int(raw)
+    except ValueError as exc:
+        raise RuntimeError(f"环境变量 {name} 必须为整数: {raw}") from exc
+    if value < minimum:
+        raise RuntimeError(f"环境变量 {name} 不能小于 {minimum}。")
+    return value
+
+
+def _env_float(name: str, default: Optional[float]) -> Optional[float]:
+    raw = os.getenv(name)
+    if raw is None:
+        return default
+    try:
+        value = float(raw)
+    except ValueError as exc:
+        raise RuntimeError(f"环境变量 {name} 必须为数字: {raw}") from exc
+    return value if value > 0 else None
+
+
+def _build_prompt_registry() -> PromptRegistry:
+    registry = default_registry()
+    variants_path = os.getenv("DEVO_PROMPT_VARIANTS")
+    try:
+        registry.set_variant_weights(load_variant_weights(variants_path) if variants_path else {})
+    except (OSError, ValueError) as exc:
+        raise RuntimeError(f"无法加载提示词: {exc}") from exc
+    reload_interval = _env_float("DEVO_PROMPT_RELOAD_INTERVAL", 2.0)
+    if reload_interval is not None:
+        registry.start_watching(reload_interval)
+    return registry
+
+
+def _build_kv_store() -> Optional[KeyValueStore]:
+    url = os.getenv("DEVO_KV_URL")
+    if not url:
+        return None
+    try:
+        store = build_kv_store(url, max_connections=_env_int("DEVO_KV_POOL_SIZE", 16))
+        ping = getattr(store, "ping", None)
+        if ping is not None:
+            ping()
+    except (KeyValueStoreError, ValueError) as exc:
+        raise RuntimeError(f"无法初始化共享存储: {exc}") from exc
+    return store
+
+
+def _build_decision_cache(kv_store: Optional[KeyValueStore]) -> Optional[DecisionCache]:
+    try:
+        backend = build_cache_backend(
+            os.getenv("DEVO_DECISION_CACHE", "memory"),
+            max_entries=_env_int("DEVO_DECISION_CACHE_SIZE", 1024),
+            ttl_seconds=_env_float("DEVO_DECISION_CACHE_TTL", 3600.0),
+            path=os.getenv("DEVO_DECISION_CACHE_PATH", "devolight_decisions.sqlite3"),
+            store=kv_store,
+        )
+    except ValueError as exc:
+        raise RuntimeError(f"无法初始化调度决策缓存: {exc}") from exc
+    if backend is None:
+        return None
+    return DecisionCache(backend)
+
+
+def _degradation_enabled() -> bool:
+    return os.getenv("DEVO_DEGRADATION", "1").lower() in ("1", "true", "yes")
+
+
+def _build_role_cache(kv_store: Optional[KeyValueStore]) -> Optional[RoleOutputCache]:
+    policies_path = os.getenv("DEVO_ROLE_CACHE_POLICIES")
+    try:
+        backend = build_cache_backend(
+            os.getenv("DEVO_ROLE_CACHE", "memory"),
+            max_entries=_env_int("DEVO_ROLE_CACHE_SIZE", 4096),
+            ttl_seconds=_env_float("DEVO_ROLE_CACHE_TTL", 86400.0),
+            path=os.getenv("DEVO_ROLE_CACHE_PATH", "devolight_roles.sqlite3"),
+            store=kv_store,
+        )
+        policies = load_role_cache_policies(policies_path) if policies_path else None
+    except (OSError, ValueError) as exc:
+        raise RuntimeError(f"无法初始化角色输出缓存: {exc}") from exc
+    if backend is None:
+        return None
+    return RoleOutputCache(
+        backend,
+        policies,
+        keep_stale=_degradation_enabled(),
+        stale_ttl_seconds=_env_float("DEVO_STALE_TTL", 7 * 86400.0),
+    )
+
+
+def _build_degradation(role_cache: Optional[RoleOutputCache]) -> Optional[DegradationPolicy]:
+    if not _degradation_enabled():
+        return None
+    return DegradationPolicy(
+        role_cache,
+        max_background_refreshes=_env_int("DEVO_DEGRADATION_MAX_REFRESHES", 16, minimum=0),
+    )
+
+
+def _build_compactor() -> Optional[ContextCompactor]:
+    if os.getenv("DEVO_CONTEXT_COMPACTION", "1").lower() not in ("1", "true", "yes"):
+        return None
+    policies_path = os.getenv("DEVO_CONTEXT_POLICIES")
+    try:
+        policies = load_compaction_policies(policies_path) if policies_path else None
+    except (OSError, ValueError) as exc:
+        raise RuntimeError(f"无法加载上下文压缩策略: {exc}") from exc
+    return ContextCompactor(policies, default_budget=_env_int("DEVO_CONTEXT_BUDGET", 2000))
+
+
+def _build_session_repository(kv_store: Optional[KeyValueStore]) -> SessionRepository:
+    backend = os.getenv("DEVO_SESSION_BACKEND", "memory").lower()
+    max_recent_calls = _env_int("DEVO_SESSION_MAX_CALLS", 20)
+    if backend == "memory":
+        return InMemorySessionRepository(
+            max_sessions=_env_int("DEVO_SESSION_MAX", 100_000),
+            idle_ttl_seconds=_env_float("DEVO_SESSION_IDLE_TTL", 86400.0),
+            max_recent_calls=max_recent_calls,
+        )
+    if backend == "sqlite":
+        return SQLiteSessionRepository(
+            os.getenv("DEVO_SESSION_DB_PATH", "devolight_sessions.sqlite3"),
+            max_recent_calls=max_recent_calls,
+        )
+    if backend == "kv":
+        if kv_store is None:
+            raise RuntimeError("kv 会话存储需要配置 DEVO_KV_URL。")
+        return KeyValueSessionRepository(
+            kv_store,
+            max_recent_calls=max_recent_calls,
+            idle_ttl_seconds=_env_float("DEVO_SESSION_IDLE_TTL", 86400.0),
+        )
+    raise RuntimeError(f"未知会话存储类型: {backend}")
+
+
+def _build_fast_path() -> Optional[FastPathRouter]:
+    if os.getenv("DEVO_FAST_PATH", "1").lower() not in ("1", "true", "yes"):
+        return None
+    rules_path = os.getenv("DEVO_FAST_PATH_RULES")
+    try:
+        config = FastPathConfig.from_file(rules_path) if rules_path else FastPathConfig()
+        return FastPathRouter(config)
+    except (OSError, ValueError) as exc:
+        raise RuntimeError(f"无法加载快速路由规则: {exc}") from exc
+
+
+def _build_scheduler() -> Optional[LLMScheduler]:
+    if os.getenv("DEVO_LLM_SCHEDULER", "1").lower() not in ("1", "true", "yes"):
+        return None
+    return LLMScheduler(
+        requests_per_minute=_env_float("DEVO_LLM_RPM", None),
+        tokens_per_minute=_env_float("DEVO_LLM_TPM", None),
+        max_in_flight=_env_int("DEVO_LLM_MAX_IN_FLIGHT", 32),
+        queue_timeout=_env_float("DEVO_LLM_QUEUE_TIMEOUT", 10.0) or 10.0,
+        batch_queue_timeout=_env_float("DEVO_LLM_BATCH_QUEUE_TIMEOUT", 60.0),
+    )
+
+
+def _schedule(
+    llm_call: Union[LLMCallable, AsyncLLMCallable], scheduler: Optional[LLMScheduler]
+) -> Union[LLMCallable, AsyncLLMCallable, ScheduledLLMCallable]:
+    return ScheduledLLMCallable(llm_call, scheduler) if scheduler is not None else llm_call
+
+
+def _build_speculator(orchestrator: ExecutionOrchestrator) -> Optional[RoleSpeculator]:
+    if os.getenv("DEVO_SPECULATION", "0").lower() not in ("1", "true", "yes"):
+        return None
+    return RoleSpeculator(
+        orchestrator,
+        RolePredictor(
+            threshold=_env_float("DEVO_SPECULATION_THRESHOLD", 0.6) or 0.6,
+            max_roles=_env_int("DEVO_SPECULATION_MAX_ROLES", 1),
+        ),
+        waste_budget_tokens_per_minute=_env_float("DEVO_SPECULATION_BUDGET_TPM", 20_000.0) or 20_000.0,
+        estimated_tokens_per_role=_env_int("DEVO_SPECULATION_TOKENS_PER_ROLE", 1_500),
+    )
+
+
+def _resilient_variant(
+    llm_call: Union[LLMCallable, AsyncLLMCallable],
+    retry_policy: RetryPolicy,
+    circuit_breakers: CircuitBreakerRegistry,
+    scheduler: Optional[LLMScheduler],
+    *,
+    model: Optional[str] = None,
+    max_output_tokens: Optional[int] = None,
+) -> ResilientLLMCallable:
+    """``llm_call`` with other model/output limits, behind the shared scheduler and breakers."""
+    variant = llm_call
+    with_options = getattr(llm_call, "with_options", None)
+    if callable(with_options):
+        variant = with_options(model=model, max_output_tokens=max_output_tokens)
+    return ResilientLLMCallable(
+        _schedule(variant, scheduler),
+        retry_policy=retry_policy,
+        breaker=circuit_breakers.get(
+            getattr(variant, "base_url", "local"), getattr(variant, "model", "")
+        ),
+    )
+
+
+def _build_summarizer(
+    llm_call: Union[LLMCallable, AsyncLLMCallable],
+    retry_policy: RetryPolicy,
+    circuit_breakers: CircuitBreakerRegistry,
+    session_repository: SessionRepository,
+    session_locks: SessionLocks,
+    prompts: PromptRegistry,
+    scheduler: Optional[LLMScheduler],
+) -> Optional[SessionSummarizer]:
+    if os.getenv("DEVO_SESSION_SUMMARIZER", "1").lower() not in ("1", "true", "yes"):
+        return None
+    resilient = _resilient_variant(
+        llm_call,
+        retry_policy,
+        circuit_breakers,
+        scheduler,
+        model=os.getenv("DEVO_SUMMARY_MODEL") or None,
+        max_output_tokens=_env_int("DEVO_SUMMARY_MAX_TOKENS", 400),
+    )
+    return SessionSummarizer(
+        resilient,
+        session_repository,
+        locks=session_locks,
+        debounce_seconds=_env_float("DEVO_SUMMARY_DEBOUNCE", 2.0) or 0.0,
+        max_summary_chars=_env_int("DEVO_SUMMARY_MAX_CHARS", 600),
+        prompts=prompts,
+    )
+
+
+def build_container(llm_call: Optional[Union[LLMCallable, AsyncLLMCallable]] = None) -> AppContainer:
+    """Validate configuration, preload prompts and wire the router service.
+
+    When ``llm_call`` is omitted the Claude client is configured from the
+    environment, so a missing API key fails at startup instead of on the
+    first request.
+    """
+    prompts = _build_prompt_registry()
+    prompt_names = prompts.preload()
+    configure_payload_logging(
+        sample_rate=_env_float("DEVO_LOG_PAYLOAD_SAMPLE", 0.01) or 0.0,
+        redact=os.getenv("DEVO_LOG_PAYLOAD_REDACT", "1").lower() in ("1", "true", "yes"),
+    )
+    configure_pricing(
+        input_per_mtok=_env_float("DEVO_LLM_PRICE_INPUT_PER_MTOK", None) or 0.0,
+        output_per_mtok=_env_float("DEVO_LLM_PRICE_OUTPUT_PER_MTOK", None) or 0.0,
+    )
+    role_concurrency = _env_int("DEVO_ROLE_CONCURRENCY", 4)
+    kv_store = _build_kv_store()
+    decision_cache = _build_decision_cache(kv_store)
+    role_cache = _build_role_cache(kv_store)
+    compactor = _build_compactor()
+    session_repository = _build_session_repository(kv_store)
+    batch_concurrency = _env_int("DEVO_BATCH_CONCURRENCY", 8)
+    batch_rpm = _env_int("DEVO_BATCH_RPM", 600)
+    retry_policy = RetryPolicy(
+        max_attempts=_env_int("DEVO_LLM_MAX_ATTEMPTS", 3),
+        base_delay=_env_float("DEVO_LLM_RETRY_BASE_DELAY", 0.5) or 0.5,
+        max_delay=_env_float("DEVO_LLM_RETRY_MAX_DELAY", 8.0) or 8.0,
+    )
+    circuit_breakers = CircuitBreakerRegistry(
+        failure_threshold=_env_int("DEVO_LLM_BREAKER_THRESHOLD", 5),
+        reset_timeout=_env_float("DEVO_LLM_BREAKER_RESET", 30.0) or 30.0,
+    )
+    hedge_meta = os.getenv("DEVO_META_HEDGE", "1").lower() in ("1", "true", "yes")
+    fast_path = _build_fast_path()
+    if llm_call is None:
+        try:
+            llm_call = ClaudeMessagesCallable.from_environment()
+        except ClaudeMessagesError as exc:
+            raise RuntimeError(f"无法初始化 Claude 客户端: {exc}") from exc
+    scheduler = _build_scheduler()
+    resilient_llm = ResilientLLMCallable(
+        _schedule(llm_call, scheduler),
+        retry_policy=retry_policy,
+        breaker=circuit_breakers.get(
+            getattr(llm_call, "base_url", "local"), getattr(llm_call, "model", "")
+        ),
+    )
+    meta_llm = HedgedLLMCallable(resilient_llm) if hedge_meta else None
+    repair_meta = os.getenv("DEVO_META_REPAIR", "1").lower() in ("1", "true", "yes")
+    repair_llm = (
+        _resilient_variant(
+            llm_call,
+            retry_policy,
+            circuit_breakers,
+            scheduler,
+            max_output_tokens=_env_int("DEVO_META_REPAIR_MAX_TOKENS", 300),
+        )
+        if repair_meta
+        else None
+    )
+    degradation = _build_degradation(role_cache)
+    session_locks = SessionLocks()
+    summarizer = _build_summarizer(
+        llm_call,
+        retry_policy,
+        circuit_breakers,
+        session_repository,
+        session_locks,
+        prompts,
+        scheduler,
+    )
+    orchestrator = build_default_orchestrator(
+        resilient_llm,
+        max_concurrency=role_concurrency,
+        output_cache=role_cache,
+        compactor=compactor,
+        prompts=prompts,
+        role_timeout=_env_float("DEVO_ROLE_TIMEOUT", None),
+        degradation=degradation,
+    )
+    speculator = _build_speculator(orchestrator)
+    service = RouterService(
+        meta_client=MetaRouterClient(
+            meta_llm or resilient_llm,
+            decision_cache=decision_cache,
+            compactor=compactor,
+            prompts=prompts,
+            repair_llm_call=repair_llm,
+            repair_prompt_name="meta_router_repair" if repair_meta else None,
+        ),
+        context_builder=ContextBuilder(),
+        orchestrator=orchestrator,
+        fallback_manager=FallbackManager(),
+        session_repository=session_repository,
+        pre_router=fast_path,
+        summarizer=summarizer,
+        session_locks=session_locks,
+        speculator=speculator,
+        # opt-in: a deadline below a normal meta + multi-role run would serve stubs
+        request_timeout=_env_float("DEVO_REQUEST_DEADLINE", None),
+        degradation=degradation,
+    )
+    return AppContainer(
+        router_service=service,
+        llm_callable=llm_call,
+        prompt_names=prompt_names,
+        decision_cache=decision_cache,
+        session_repository=session_repository,
+        batch_concurrency=batch_concurrency,
+        batch_rate_limiter=RateLimiterRegistry(batch_rpm),
+        resilient_llm=resilient_llm,
+        meta_llm=meta_llm,
+        circuit_breakers=circuit_breakers,
+        fast_path=fast_path,
+        role_cache=role_cache,
+        compactor=compactor,
+        summarizer=summarizer,
+        orchestrator=orchestrator,
+        kv_store=kv_store,
+        prompts=prompts,
+        scheduler=scheduler,
+        speculator=speculator,
+        degradation=degradation,
+    )
@@ -1,28 +1,26 @@
 from __future__ import annotations
 
-from typing import List, Optional
+from contextlib import aclosing, asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List
 
-from fastapi import Depends, FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel
 
+from .batch import BatchRunner
+from .container import AppContainer, build_container
 from .models import RoutingDecision
-from .services.executor import build_default_orchestrator
-from .services.llm_client import ClaudeMessagesCallable, ClaudeMessagesError
-from .services.meta_client import MetaRouterClient
-from .services.router import (
-    ContextBuilder,
-    ExecutionOrchestrator,
-    FallbackManager,
-    RouterResult,
-    RouterService,
-    SessionRepository,
-)
+from .services.observability import REGISTRY, render_stats
+from .services.router import RouterEvent, RouterResult, RouterService
+from .services.scheduler import SchedulerOverloadedError
+from .services.serialization import dumps, dumps_str
 
 
 class RoleOutputModel(BaseModel):
     role_name: str
     content: str
+    freshness: str = "fresh"  # "stale": cached earlier output, "stub": local fallback text
 
 
 class RouterResponseModel(BaseModel):
@@ -31,7 +29,49 @@ class RouterResponseModel(BaseModel):
     warnings: List[str]
 
 
-app = FastAPI(title="DevoLight Router Demo")
+class JSONBytesResponse(Response):
+    """JSON response encoded with :func:`dumps`; ``bytes`` content is sent as is."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return content if isinstance(content, bytes) else dumps(content)
+
+
+def router_response_body(result: RouterResult) -> bytes:
+    """Encode a result in the :class:`RouterResponseModel` shape.
+
+    The decision was validated when it was parsed, so it is not validated
+    again on the way out.
+    """
+    return dumps(
+        {
+            "decision": result.decision.dict(),
+            "role_outputs": [
+                {
+                    "role_name": output.role_name,
+                    "content": output.content,
+                    "freshness": output.freshness,
+                }
+                for output in result.role_outputs
+            ],
+            "warnings": result.warnings,
+        }
+    )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Build the application container once and release it on shutdown."""
+    container = build_container()
+    app.state.container = container
+    try:
+        yield
+    finally:
+        await container.aclose()
+
+
+app = FastAPI(title="DevoLight Router Demo", lifespan=lifespan)
 
 allowed_origins = [
     "http://127.0.0.1:5173",
@@ -47,41 +87,99 @@ app.add_middleware(
 )
 
 
-def build_router_service() -> RouterService:
-    session_repository = SessionRepository()
-    try:
-        llm_callable = ClaudeMessagesCallable.from_environment()
-    except ClaudeMessagesError as exc:
-        raise RuntimeError(f"无法初始化 Claude 客户端: {exc}") from exc
-    orchestrator: ExecutionOrchestrator = build_default_orchestrator(llm_callable)
-    meta_client = MetaRouterClient(llm_callable)
-    service = RouterService(
-        meta_client=meta_client,
-        context_builder=ContextBuilder(),
-        orchestrator=orchestrator,
-        fallback_manager=FallbackManager(),
-        session_repository=session_repository,
-    )
-    return service
+def get_container(request: Request) -> AppContainer:
+    return request.app.state.container
+
+
+def get_router_service(container: AppContainer = Depends(get_container)) -> RouterService:
+    return container.router_service
 
 
-def get_router_service(service=None) -> RouterService:
-    # In production you might inject a singleton via dependency overrides.
-    return service or build_router_service()
+@app.get("/stats")
+def stats(container: AppContainer = Depends(get_container)) -> Dict[str, Any]:
+    """Return cache hit/miss counters."""
+    return container.stats()
 
 
-@app.post("/route", response_model=RouterResponseModel)
-def route(session_id: str, payload: dict, service: RouterService = Depends(get_router_service)) -> RouterResponseModel:
-    """Route a single request through the meta router."""
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics(container: AppContainer = Depends(get_container)) -> PlainTextResponse:
+    """Expose stage latency, token and cache metrics in the Prometheus text format."""
+    return PlainTextResponse(
+        REGISTRY.render() + render_stats(container.stats()),
+        media_type="text/plain; version=0.0.4",
+    )
+
+
+@app.post("/route", response_model=RouterResponseModel, response_class=JSONBytesResponse)
+async def route(
+    session_id: str, payload: dict, service: RouterService = Depends(get_router_service)
+) -> JSONBytesResponse:
+    """Route a single request through the meta router.
+
+    ``response_model`` only documents the schema; the body is encoded once
+    by :func:`router_response_body`.
+    """
     try:
-        result = service.route(session_id=session_id, raw_payload=payload)
+        result = await service.route(session_id=session_id, raw_payload=payload)
+    except SchedulerOverloadedError as exc:
+        raise HTTPException(
+            status_code=503,
+            detail=str(exc),
+            headers={"Retry-After": str(int(exc.retry_after))},
+        ) from exc
     except Exception as exc:  # noqa: BLE001
         raise HTTPException(status_code=500, detail=str(exc)) from exc
-    return RouterResponseModel(
-        decision=result.decision,
-        role_outputs=[
-            RoleOutputModel(role_name=output.role_name, content=output.content)
-            for output in result.role_outputs
-        ],
-        warnings=result.warnings,
+    return JSONBytesResponse(router_response_body(result))
+
+
+def _format_sse(event: RouterEvent) -> str:
+    data = dumps_str(event.data)
+    return f"event: {event.event}\ndata: {data}\n\n"
+
+
+@app.post("/route/stream")
+async def route_stream(
+    session_id: str, payload: dict, service: RouterService = Depends(get_router_service)
+) -> StreamingResponse:
+    """Stream the routing decision, per-role text deltas and final warnings as SSE."""
+
+    async def event_source() -> AsyncIterator[str]:
+        try:
+            # close the stream as soon as the client goes away so its pipeline is cancelled
+            async with aclosing(service.stream(session_id=session_id, raw_payload=payload)) as events:
+                async for event in events:
+                    yield _format_sse(event)
+        except Exception as exc:  # noqa: BLE001
+            yield _format_sse(RouterEvent("error", {"message": str(exc)}))
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
+
+
+@app.post("/route/batch")
+async def route_batch(
+    request: Request, container: AppContainer = Depends(get_container)
+) -> StreamingResponse:
+    """Route a JSONL body of ``{"id", "session_id", "payload"}`` lines, streaming JSONL back.
+
+    The body is read up front because Starlette consumes the receive
+    channel while a streaming response is open. The last output line is
+    ``{"report": {...}}`` with counts and requests/min.
+    """
+    lines = (await request.body()).decode("utf-8").splitlines()
+    runner = BatchRunner(
+        container.router_service,
+        concurrency=container.batch_concurrency,
+        rate_limiter=container.batch_rate_limiter,
+        limiter_key=getattr(container.llm_callable, "key_id", "default"),
+    )
+
+    async def body() -> AsyncIterator[str]:
+        async for record in runner.run(lines):
+            yield dumps_str(record) + "\n"
+        yield dumps_str({"report": runner.report.to_dict()}) + "\n"
+
+    return StreamingResponse(body(), media_type="application/x-ndjson")
@@ -1,4 +1,5 @@
 from .routing import (
+    ROLE_ALIASES,
     RoutingContext,
     RoutingDecision,
     RoutingMode,
@@ -8,6 +9,7 @@ from .routing import (
 from .session import RoleCallRecord, SessionState
 
 __all__ = [
+    "ROLE_ALIASES",
     "RoutingContext",
     "RoutingDecision",
     "RoutingMode",
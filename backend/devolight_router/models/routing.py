@@ -1,11 +1,19 @@
 from __future__ import annotations
 
 from enum import Enum
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 
 from pydantic import BaseModel, Field, validator
 
 
+ROLE_ALIASES: Dict[str, Tuple[str, ...]] = {
+    "AntiochTeacher": ("AntiochTeacher", "安提阿"),
+    "LukeScribe": ("LukeScribe", "路加"),
+    "MarthaMentor": ("MarthaMentor", "马大"),
+    "BarnabasCompanion": ("BarnabasCompanion", "巴拿巴"),
+}
+
+
 class RoutingMode(str, Enum):
     SINGLE = "single"
     SEQUENCE = "sequence"
@@ -47,13 +55,7 @@ class SelectedRole(BaseModel):
 
     @validator("name")
     def validate_role_name(cls, value: str) -> str:
-        allowed = {
-            "AntiochTeacher",
-            "LukeScribe",
-            "MarthaMentor",
-            "BarnabasCompanion",
-        }
-        if value not in allowed:
+        if value not in ROLE_ALIASES:
             raise ValueError(f"未知角色 {value}")
         return value
 
@@ -1,9 +1,9 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 
 
 class RoleCallRecord(BaseModel):
@@ -19,6 +19,10 @@ class SessionState(BaseModel):
     recent_calls: List[RoleCallRecord] = Field(default_factory=list)
     summary: Optional[str] = None
     last_known_spiritual_state: Optional[str] = None
+    # bumped on every write to a shared store; detects saves based on a stale read
+    version: int = 0
+    # scalar fields as of that version, so a merge can tell which ones this copy changed
+    _synced: Dict[str, Optional[str]] = PrivateAttr(default_factory=dict)
 
     def last_role(self) -> Optional[str]:
         if not self.recent_calls:
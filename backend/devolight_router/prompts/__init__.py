@@ -1,27 +1,40 @@
-from pathlib import Path
-from typing import Dict
+from typing import List, Optional
 
+from .registry import (
+    PROMPT_ASSIGNMENT_KEY,
+    PromptRegistry,
+    PromptVersion,
+    load_variant_weights,
+    prompt_assignment,
+)
 
-_CACHE: Dict[str, str] = {}
+__all__ = [
+    "PROMPT_ASSIGNMENT_KEY",
+    "PromptRegistry",
+    "PromptVersion",
+    "default_registry",
+    "load_prompt",
+    "load_variant_weights",
+    "preload_prompts",
+    "prompt_assignment",
+]
 
+_DEFAULT: Optional[PromptRegistry] = None
 
-def _prompts_root() -> Path:
-    """Return project-level prompts directory."""
-    current = Path(__file__).resolve()
-    for parent in current.parents:
-        candidate = parent / "prompts"
-        if candidate.exists() and any(child.suffix == ".md" for child in candidate.iterdir()):
-            return candidate
-    raise FileNotFoundError("未找到提示词目录 prompts，请确认项目结构。")
+
+def default_registry() -> PromptRegistry:
+    """Return the process-wide registry for the project-level prompts directory."""
+    global _DEFAULT
+    if _DEFAULT is None:
+        _DEFAULT = PromptRegistry()
+    return _DEFAULT
 
 
 def load_prompt(name: str) -> str:
     """Load a prompt by filename (without extension)."""
-    if name in _CACHE:
-        return _CACHE[name]
-    path = _prompts_root() / f"{name}.md"
-    if not path.exists():
-        raise FileNotFoundError(f"找不到提示词文件: {path}")
-    content = path.read_text(encoding="utf-8")
-    _CACHE[name] = content
-    return content
+    return default_registry().get(name).text
+
+
+def preload_prompts() -> List[str]:
+    """Read every prompt under the prompts directory into the cache."""
+    return default_registry().preload()
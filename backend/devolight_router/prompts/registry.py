@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Mapping, Optional, Tuple
+
+LOGGER = logging.getLogger(__name__)
+if not LOGGER.handlers:
+    handler = logging.StreamHandler()
+    handler.setLevel(logging.INFO)
+    formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+    handler.setFormatter(formatter)
+    LOGGER.addHandler(handler)
+LOGGER.setLevel(logging.INFO)
+LOGGER.propagate = False
+
+# Stable key (the session id) that decides which prompt variant a request gets.
+PROMPT_ASSIGNMENT_KEY: ContextVar[Optional[str]] = ContextVar("prompt_assignment_key", default=None)
+
+_VersionKey = Tuple[str, Optional[str]]
+
+
+@contextmanager
+def prompt_assignment(key: Optional[str]) -> Iterator[None]:
+    """Pin variant selection for the code inside the block to ``key``."""
+    token = PROMPT_ASSIGNMENT_KEY.set(key)
+    try:
+        yield
+    finally:
+        try:
+            PROMPT_ASSIGNMENT_KEY.reset(token)
+        except ValueError:
+            pass  # an async generator finalized from another task's context
+
+
+def find_prompts_root(start: Optional[Path] = None) -> Path:
+    """Return the nearest ``prompts`` directory above ``start`` that holds ``.md`` files."""
+    current = (start or Path(__file__)).resolve()
+    for parent in current.parents:
+        candidate = parent / "prompts"
+        if candidate.is_dir() and any(candidate.glob("*.md")):
+            return candidate
+    raise FileNotFoundError("未找到提示词目录 prompts，请确认项目结构。")
+
+
+@dataclass(frozen=True)
+class PromptVersion:
+    """One loaded prompt file; ``hash`` changes whenever the content does."""
+
+    name: str
+    variant: Optional[str]
+    text: str
+    hash: str
+    mtime_ns: int
+    size: int
+
+    @property
+    def label(self) -> str:
+        return f"{self.name}.{self.variant}" if self.variant else self.name
+
+
+def load_variant_weights(path: str) -> Dict[str, Dict[str, float]]:
+    """Read ``{"prompt_name": {"variant": 0.2}}``; the rest of the traffic keeps the base file."""
+    with open(path, encoding="utf-8") as handle:
+        raw = json.load(handle)
+    if not isinstance(raw, dict):
+        raise ValueError("提示词变体配置必须是 JSON 对象。")
+    weights: Dict[str, Dict[str, float]] = {}
+    for name, variants in raw.items():
+        if not isinstance(variants, dict):
+            raise ValueError(f"提示词 {name} 的变体配置必须是对象。")
+        if sum(float(share) for share in variants.values()) > 1.0:
+            raise ValueError(f"提示词 {name} 的变体流量之和不能超过 1。")
+        weights[name] = {str(variant): float(share) for variant, share in variants.items()}
+    return weights
+
+
+class PromptRegistry:
+    """Lazily loaded, hot-reloadable prompt files.
+
+    The directory is resolved once. A prompt is read the first time it is
+    requested, and :meth:`reload_changed` (run by the watcher thread) re-reads
+    files whose size or mtime changed. Reloads build a new version map and
+    replace it in one assignment, so a request always sees a complete prompt,
+    old or new. ``name.variant.md`` files are variants of ``name.md`` that
+    receive a share of traffic per :meth:`set_variant_weights`, bucketed by
+    :data:`PROMPT_ASSIGNMENT_KEY` so a session keeps its variant.
+    """
+
+    def __init__(self, root: Optional[Path] = None) -> None:
+        self.root = Path(root) if root is not None else find_prompts_root()
+        self._versions: Dict[_VersionKey, Optional[PromptVersion]] = {}
+        self._weights: Dict[str, Tuple[Tuple[str, float], ...]] = {}
+        self._write_lock = threading.Lock()
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.reloads = 0
+
+    def _path(self, name: str, variant: Optional[str]) -> Path:
+        return self.root / (f"{name}.{variant}.md" if variant else f"{name}.md")
+
+    def _read(self, name: str, variant: Optional[str]) -> Optional[PromptVersion]:
+        path = self._path(name, variant)
+        try:
+            stat = path.stat()
+            text = path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return PromptVersion(name, variant, text, digest, stat.st_mtime_ns, stat.st_size)
+
+    def _lookup(self, name: str, variant: Optional[str]) -> Optional[PromptVersion]:
+        key = (name, variant)
+        versions = self._versions
+        if key in versions:
+            return versions[key]
+        with self._write_lock:
+            if key not in self._versions:
+                self._versions = {**self._versions, key: self._read(name, variant)}
+            return self._versions[key]
+
+    def get(self, name: str, variant: Optional[str] = None) -> PromptVersion:
+        """Return ``name`` (or the given variant, falling back to the base file)."""
+        version = self._lookup(name, variant) if variant else None
+        if version is None:
+            version = self._lookup(name, None)
+        if version is None:
+            raise FileNotFoundError(f"找不到提示词文件: {self._path(name, None)}")
+        return version
+
+    def select(self, name: str) -> PromptVersion:
+        """Return the version this request should use under the configured A/B split."""
+        return self.get(name, self._assigned_variant(name))
+
+    def _assigned_variant(self, name: str) -> Optional[str]:
+        weights = self._weights.get(name)
+        key = PROMPT_ASSIGNMENT_KEY.get()
+        if not weights or key is None:
+            return None
+        digest = hashlib.sha256(f"{name}\x00{key}".encode("utf-8")).digest()
+        bucket = int.from_bytes(digest[:8], "big") / 2 ** 64
+        for variant, share in weights:
+            if bucket < share:
+                return variant
+            bucket -= share
+        return None
+
+    def set_variant_weights(self, weights: Mapping[str, Mapping[str, float]]) -> None:
+        self._weights = {
+            name: tuple(sorted(variants.items())) for name, variants in weights.items()
+        }
+
+    def variants(self, name: str) -> List[str]:
+        return sorted(
+            path.name[len(name) + 1 : -3] for path in self.root.glob(f"{name}.*.md")
+        )
+
+    def preload(self) -> List[str]:
+        """Load every base prompt now and return their names."""
+        names = sorted(
+            path.stem for path in self.root.glob("*.md") if "." not in path.stem
+        )
+        for name in names:
+            self.get(name)
+        return names
+
+    def reload_changed(self) -> List[str]:
+        """Re-read prompts whose file changed on disk; return the labels that changed."""
+        changed: List[str] = []
+        with self._write_lock:
+            versions = dict(self._versions)
+            for (name, variant), current in self._versions.items():
+                path = self._path(name, variant)
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue  # keep serving the last good version
+                if current is not None and (stat.st_mtime_ns, stat.st_size) == (
+                    current.mtime_ns,
+                    current.size,
+                ):
+                    continue
+                fresh = self._read(name, variant)
+                if fresh is None or (current is not None and fresh.hash == current.hash):
+                    continue
+                versions[(name, variant)] = fresh
+                changed.append(fresh.label)
+            if changed:
+                self._versions = versions
+                self.reloads += len(changed)
+        for label in changed:
+            LOGGER.info("Reloaded prompt %s", label)
+        return changed
+
+    def start_watching(self, interval_seconds: float = 2.0) -> None:
+        """Poll for edits on a daemon thread until :meth:`stop_watching`."""
+        if self._watcher is not None:
+            return
+        self._stop.clear()
+
+        def poll() -> None:
+            while not self._stop.wait(interval_seconds):
+                try:
+                    self.reload_changed()
+                except OSError as exc:
+                    LOGGER.warning("Prompt reload failed: %s", exc)
+
+        self._watcher = threading.Thread(target=poll, name="prompt-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self) -> None:
+        if self._watcher is None:
+            return
+        self._stop.set()
+        self._watcher.join()
+        self._watcher = None
+
+    def stats(self) -> Dict[str, object]:
+        versions = self._versions
+        return {
+            "loaded": sum(1 for version in versions.values() if version is not None),
+            "reloads": self.reloads,
+            "hashes": {
+                version.label: version.hash[:12]
+                for version in versions.values()
+                if version is not None
+            },
+        }
@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, Protocol, Tuple
+
+from .serialization import dumps_str
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .kv import KeyValueStore
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    sets: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def snapshot(self) -> Dict[str, float]:
+        return {**asdict(self), "hit_rate": round(self.hit_rate, 4)}
+
+
+class CacheBackend(Protocol):
+    """String key/value store with TTL used by the response caches."""
+
+    stats: CacheStats
+    blocking_io: bool
+
+    def get(self, key: str) -> Optional[str]:
+        ...
+
+    def set(self, key: str, value: str, ttl_seconds: Optional[float] = None) -> None:
+        ...
+
+
+class InMemoryCache:
+    """Thread-safe LRU cache with per-entry TTL and a bounded entry count."""
+
+    blocking_io = False
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        default_ttl: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if max_entries < 1:
+            raise ValueError("max_entries 必须至少为 1。")
+        self._max_entries = max_entries
+        self._default_ttl = default_ttl
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[Optional[float], str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = CacheStats()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= self._clock():
+                del self._entries[key]
+                self.stats.expirations += 1
+                self.stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return value
+
+    def set(self, key: str, value: str, ttl_seconds: Optional[float] = None) -> None:
+        ttl = ttl_seconds if ttl_seconds is not None else self._default_ttl
+        expires_at = self._clock() + ttl if ttl is not None else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            self.stats.sets += 1
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+
+
+class SQLiteCache:
+    """On-disk cache in SQLite (WAL) with TTL and least-recently-used eviction."""
+
+    blocking_io = True
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = 10000,
+        default_ttl: Optional[float] = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        if max_entries < 1:
+            raise ValueError("max_entries 必须至少为 1。")
+        self._max_entries = max_entries
+        self._default_ttl = default_ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+            " expires_at REAL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache(accessed_at)")
+        self._size = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        self.stats = CacheStats()
+
+    def get(self, key: str) -> Optional[str]:
+        now = self._clock()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.stats.misses += 1
+                return None
+            value, expires_at = row
+            if expires_at is not None and expires_at <= now:
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self._size -= 1
+                self.stats.expirations += 1
+                self.stats.misses += 1
+                return None
+            self._conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self.stats.hits += 1
+            return value
+
+    def set(self, key: str, value: str, ttl_seconds: Optional[float] = None) -> None:
+        now = self._clock()
+        ttl = ttl_seconds if ttl_seconds is not None else self._default_ttl
+        expires_at = now + ttl if ttl is not None else None
+        with self._lock:
+            exists = self._conn.execute("SELECT 1 FROM cache WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at, accessed_at)"
+                " VALUES (?, ?, ?, ?)",
+                (key, value, expires_at, now),
+            )
+            if not exists:
+                self._size += 1
+            self.stats.sets += 1
+            overflow = self._size - self._max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM cache WHERE key IN"
+                    " (SELECT key FROM cache ORDER BY accessed_at LIMIT ?)",
+                    (overflow,),
+                )
+                self._size -= overflow
+                self.stats.evictions += overflow
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def build_cache_backend(
+    kind: str,
+    *,
+    max_entries: int,
+    ttl_seconds: Optional[float],
+    path: Optional[str] = None,
+    store: Optional["KeyValueStore"] = None,
+) -> Optional[CacheBackend]:
+    """Create a backend by name: ``memory``, ``sqlite``, ``kv`` or ``off``.
+
+    ``kv`` keeps entries in the shared ``store`` so all workers see them.
+    """
+    kind = kind.lower()
+    if kind in ("", "off", "none", "0"):
+        return None
+    if kind == "memory":
+        return InMemoryCache(max_entries=max_entries, default_ttl=ttl_seconds)
+    if kind == "sqlite":
+        if not path:
+            raise ValueError("sqlite 缓存需要提供数据库路径。")
+        return SQLiteCache(path, max_entries=max_entries, default_ttl=ttl_seconds)
+    if kind == "kv":
+        if store is None:
+            raise ValueError("kv 缓存需要配置共享存储 (DEVO_KV_URL)。")
+        from .kv import KeyValueCache
+
+        return KeyValueCache(store, default_ttl=ttl_seconds)
+    raise ValueError(f"未知缓存类型: {kind}")
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if isinstance(value, dict):
+        normalized = {key: _normalize(item) for key, item in value.items()}
+        return {key: item for key, item in normalized.items() if item not in (None, "", [], {})}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    return value
+
+
+def canonical_json(value: Any) -> str:
+    """Serialize ``value`` with whitespace-normalized strings and sorted keys."""
+    return dumps_str(_normalize(value), sort_keys=True)
+
+
+def content_hash(*parts: str) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
@@ -0,0 +1,252 @@
+from __future__ import annotations
+
+import json
+import logging
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, List, Mapping, Optional, Tuple
+
+from .observability import REGISTRY, TOKEN_BUCKETS
+from .serialization import EncodedPayload, dumps_str
+
+LOGGER = logging.getLogger(__name__)
+if not LOGGER.handlers:
+    handler = logging.StreamHandler()
+    handler.setLevel(logging.INFO)
+    formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+    handler.setFormatter(formatter)
+    LOGGER.addHandler(handler)
+LOGGER.setLevel(logging.INFO)
+LOGGER.propagate = False
+
+CONTEXT_TOKENS = REGISTRY.histogram(
+    "devolight_context_tokens",
+    "Estimated LLM input tokens after compaction.",
+    ("role",),
+    TOKEN_BUCKETS,
+)
+CONTEXT_TOKENS_SAVED = REGISTRY.counter(
+    "devolight_context_tokens_saved_total", "Estimated input tokens removed by compaction.", ("role",)
+)
+
+META_ROUTER = "MetaRouter"
+
+# Fields each prompt actually reads (see prompts/*.md) plus the orchestration hints.
+_COMMON_FIELDS = frozenset({"scripture", "text", "handoff_note", "warnings"})
+DEFAULT_ROLE_FIELDS: Dict[str, FrozenSet[str]] = {
+    "AntiochTeacher": _COMMON_FIELDS | {"user_question"},
+    "LukeScribe": _COMMON_FIELDS,
+    "MarthaMentor": _COMMON_FIELDS
+    | {"user_question", "user_profile", "spiritual_state", "session_stage"},
+    "BarnabasCompanion": _COMMON_FIELDS
+    | {"user_question", "user_profile", "spiritual_state", "history_summary"},
+}
+
+# Trimmed in this order when over budget; identity fields are never trimmed.
+TRIM_ORDER = ("history_summary", "concerns", "text")
+
+_EMPTY = (None, "", [], {})
+
+
+# CJK ideographs and full-width punctuation count one token each
+_WIDE_CHARS = re.compile("[\u2e80-\u9fff\uf900-\ufaff\uff00-\uffef]")
+
+
+def _char_tokens(char: str) -> float:
+    code = ord(char)
+    if 0x2E80 <= code <= 0x9FFF or 0xF900 <= code <= 0xFAFF or 0xFF00 <= code <= 0xFFEF:
+        return 1.0
+    return 0.25
+
+
+def estimate_tokens(value: Any) -> int:
+    """Approximate Claude tokens: one per CJK character, one per four other characters."""
+    if value is None:
+        return 0
+    if isinstance(value, str):
+        text = value
+    elif isinstance(value, EncodedPayload):
+        text = value.json
+    else:
+        text = dumps_str(value)
+    wide = len(_WIDE_CHARS.findall(text))
+    return int(wide + (len(text) - wide) * 0.25 + 0.999)
+
+
+def _drop_leading_tokens(text: str, tokens: int) -> str:
+    """Remove roughly ``tokens`` from the start of ``text`` (oldest history first)."""
+    removed = 0.0
+    for index, char in enumerate(text):
+        if removed >= tokens:
+            return "…" + text[index:]
+        removed += _char_tokens(char)
+    return ""
+
+
+def _drop_trailing_tokens(text: str, tokens: int) -> str:
+    removed = 0.0
+    for index in range(len(text) - 1, -1, -1):
+        if removed >= tokens:
+            return text[: index + 1] + "…"
+        removed += _char_tokens(text[index])
+    return ""
+
+
+@dataclass(frozen=True)
+class CompactionPolicy:
+    """Fields a role receives (``None`` keeps all) and its input token budget."""
+
+    fields: Optional[FrozenSet[str]] = None
+    max_input_tokens: Optional[int] = None
+
+
+@dataclass
+class CompactionReport:
+    role: str
+    tokens_before: int
+    tokens_after: int
+    dropped_fields: List[str] = field(default_factory=list)
+    trimmed_fields: List[str] = field(default_factory=list)
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+
+def load_compaction_policies(path: str) -> Dict[str, CompactionPolicy]:
+    """Read ``{"Role": {"fields": [...], "max_input_tokens": 1500}}`` overrides from JSON."""
+    with open(path, encoding="utf-8") as handle:
+        raw = json.load(handle)
+    if not isinstance(raw, dict):
+        raise ValueError("上下文压缩策略必须是 JSON 对象。")
+    policies: Dict[str, CompactionPolicy] = {}
+    for role_name, spec in raw.items():
+        if not isinstance(spec, dict):
+            raise ValueError(f"角色 {role_name} 的压缩策略必须是对象。")
+        fields = spec.get("fields")
+        policies[role_name] = CompactionPolicy(
+            fields=frozenset(fields) if fields is not None else None,
+            max_input_tokens=spec.get("max_input_tokens"),
+        )
+    return policies
+
+
+class ContextCompactor:
+    """Shrinks LLM input payloads before they are sent.
+
+    Per call it (1) hoists the parts of ``raw_payload`` not already present as
+    parsed fields and drops the duplicate copy, (2) drops fields the role's
+    prompt does not read, and (3) trims older history, then concerns, then
+    passage text until the estimated input fits the role's budget.
+    """
+
+    def __init__(
+        self,
+        policies: Optional[Mapping[str, CompactionPolicy]] = None,
+        *,
+        default_budget: Optional[int] = 2000,
+    ) -> None:
+        self._policies: Dict[str, CompactionPolicy] = {
+            name: CompactionPolicy(fields=fields) for name, fields in DEFAULT_ROLE_FIELDS.items()
+        }
+        self._policies.update(policies or {})
+        self._default_budget = default_budget
+        self._lock = threading.Lock()
+        self._totals: Dict[str, List[int]] = {}
+
+    def policy(self, role: str) -> CompactionPolicy:
+        return self._policies.get(role, CompactionPolicy())
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {
+                role: {
+                    "calls": calls,
+                    "tokens_before": before,
+                    "tokens_after": after,
+                    "tokens_saved": before - after,
+                }
+                for role, (calls, before, after) in self._totals.items()
+            }
+
+    def compact(
+        self, role: str, payload: Dict[str, Any]
+    ) -> Tuple[Dict[str, Any], CompactionReport]:
+        before = estimate_tokens(payload)
+        policy = self.policy(role)
+        compacted = self._deduplicate(payload)
+        dropped: List[str] = []
+        if policy.fields is not None:
+            dropped = [key for key in compacted if key not in policy.fields]
+            compacted = {key: value for key, value in compacted.items() if key in policy.fields}
+        budget = policy.max_input_tokens or self._default_budget
+        trimmed = self._enforce_budget(compacted, budget) if budget else []
+        report = CompactionReport(role, before, estimate_tokens(compacted), dropped, trimmed)
+        self._record(report)
+        return compacted, report
+
+    @staticmethod
+    def _deduplicate(payload: Dict[str, Any]) -> Dict[str, Any]:
+        raw = payload.get("raw_payload")
+        compacted = {
+            key: value
+            for key, value in payload.items()
+            if key != "raw_payload" and value not in _EMPTY
+        }
+        if isinstance(raw, dict):
+            for key, value in raw.items():
+                if key not in compacted and value not in _EMPTY:
+                    compacted[key] = value
+        return compacted
+
+    @staticmethod
+    def _enforce_budget(payload: Dict[str, Any], budget: int) -> List[str]:
+        trimmed: List[str] = []
+        for name in TRIM_ORDER:
+            over = estimate_tokens(payload) - budget
+            if over <= 0:
+                break
+            if name == "concerns":
+                profile = payload.get("user_profile")
+                concerns = profile.get("concerns") if isinstance(profile, dict) else None
+                if not concerns:
+                    continue
+                kept = list(concerns)
+                while kept and estimate_tokens(payload) > budget:
+                    kept.pop(0)  # oldest concerns first
+                    payload["user_profile"] = {**profile, "concerns": kept}
+                trimmed.append(name)
+                continue
+            value = payload.get(name)
+            if not isinstance(value, str) or not value:
+                continue
+            # one spare token covers the ellipsis and rounding
+            if name == "history_summary":
+                shortened = _drop_leading_tokens(value, over + 1)
+            else:
+                shortened = _drop_trailing_tokens(value, over + 1)
+            if shortened:
+                payload[name] = shortened
+            else:
+                del payload[name]
+            trimmed.append(name)
+        return trimmed
+
+    def _record(self, report: CompactionReport) -> None:
+        CONTEXT_TOKENS.observe(report.tokens_after, role=report.role)
+        if report.tokens_saved > 0:
+            CONTEXT_TOKENS_SAVED.inc(report.tokens_saved, role=report.role)
+        with self._lock:
+            totals = self._totals.setdefault(report.role, [0, 0, 0])
+            totals[0] += 1
+            totals[1] += report.tokens_before
+            totals[2] += report.tokens_after
+        if report.trimmed_fields:
+            LOGGER.info(
+                "Compacted %s input %d -> %d tokens (trimmed %s)",
+                report.role,
+                report.tokens_before,
+                report.tokens_after,
+                ", ".join(report.trimmed_fields),
+            )
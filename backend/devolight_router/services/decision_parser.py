@@ -0,0 +1,202 @@
+"""Tolerant, fast parsing of meta-router responses into :class:`RoutingDecision`.
+
+The common case takes the direct path: one ``orjson`` decode of the text
+between the first ``{`` and the last ``}`` (so fences and prose around a
+single object cost nothing) and a hand-written check of the exact shape the
+prompt asks for, which builds the models with ``construct`` and skips
+pydantic's validators. Otherwise the text is scanned once for balanced
+top-level ``{...}`` objects. Values the fast check does not accept
+(strings for numbers, unknown roles, mode/role mismatches, ...) go through
+``RoutingDecision.parse_obj``, which stays the authority on coercion and
+error messages.
+"""
+from __future__ import annotations
+
+import re
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from pydantic import ValidationError
+
+from ..models import ROLE_ALIASES, RoutingDecision, RoutingMode, SelectedRole
+from .observability import REGISTRY
+from .serialization import loads
+
+META_PARSE = REGISTRY.counter(
+    "devolight_meta_parse_total", "Meta-router responses by parse path.", ("outcome",)
+)
+
+_TOKENS = re.compile(r'[{}"\\]')
+_MODES = {mode.value: mode for mode in RoutingMode}
+_DECISION_FIELDS = frozenset(RoutingDecision.__fields__)
+_PREVIEW_CHARS = 500
+
+
+class DecisionParseError(ValueError):
+    """Raised when no valid decision could be read from a response.
+
+    ``partial`` holds the unterminated JSON object when the response was cut
+    off, so the caller can ask for just the missing continuation.
+    """
+
+    def __init__(self, message: str, *, partial: Optional[str] = None) -> None:
+        super().__init__(message)
+        self.partial = partial
+
+
+def scan_json_objects(text: str) -> Iterator[Tuple[int, Optional[int]]]:
+    """Yield ``(start, end)`` of every balanced top-level ``{...}`` in one pass.
+
+    Braces inside JSON strings are ignored. A trailing object that never
+    closes is yielded last with ``end=None``.
+    """
+    depth = 0
+    start = 0
+    in_string = False
+    skip_to = -1
+    for match in _TOKENS.finditer(text):
+        position = match.start()
+        if position < skip_to:
+            continue
+        char = text[position]
+        if in_string:
+            if char == "\\":
+                skip_to = position + 2
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = depth > 0
+        elif char == "{":
+            if depth == 0:
+                start = position
+            depth += 1
+        elif char == "}" and depth:
+            depth -= 1
+            if depth == 0:
+                yield start, position + 1
+    if depth:
+        yield start, None
+
+
+def _preview(text: str) -> str:
+    return text if len(text) <= _PREVIEW_CHARS else f"{text[:_PREVIEW_CHARS]}…"
+
+
+def _construct(obj: Dict[str, Any]) -> Optional[RoutingDecision]:
+    """Build the decision without validators when ``obj`` has the exact expected shape."""
+    mode = obj.get("mode")
+    rationale = obj.get("overall_rationale")
+    fallback_plan = obj.get("fallback_plan")
+    warnings = obj.get("warnings", [])
+    raw_roles = obj.get("selected_roles", [])
+    if (
+        type(mode) is not str
+        or type(rationale) is not str
+        or type(fallback_plan) is not str
+        or type(warnings) is not list
+        or type(raw_roles) is not list
+    ):
+        return None
+    mode = _MODES.get(mode)
+    if mode is None or any(type(warning) is not str for warning in warnings):
+        return None
+    roles = []
+    for item in raw_roles:
+        if type(item) is not dict:
+            return None
+        name = item.get("name")
+        score = item.get("score")
+        reason = item.get("reason")
+        handoff_note = item.get("handoff_note")
+        if (
+            type(name) is not str
+            or name not in ROLE_ALIASES
+            or type(score) not in (int, float)
+            or not 0.0 <= score <= 1.0
+            or type(reason) is not str
+            or type(handoff_note) is not str
+        ):
+            return None
+        roles.append(
+            SelectedRole.construct(
+                name=name, score=float(score), reason=reason, handoff_note=handoff_note
+            )
+        )
+    if (mode is RoutingMode.HALT) == bool(roles) or (
+        mode is RoutingMode.SINGLE and len(roles) != 1
+    ):
+        return None
+    return RoutingDecision.construct(
+        _fields_set=_DECISION_FIELDS & obj.keys(),
+        mode=mode,
+        selected_roles=roles,
+        overall_rationale=rationale,
+        fallback_plan=fallback_plan,
+        warnings=list(warnings),
+    )
+
+
+def validate_decision(obj: Dict[str, Any]) -> RoutingDecision:
+    """Equivalent to ``RoutingDecision.parse_obj`` but fast for well-formed input."""
+    decision = _construct(obj)
+    if decision is not None:
+        return decision
+    try:
+        return RoutingDecision.parse_obj(obj)
+    except ValidationError as exc:
+        raise DecisionParseError("MetaRouter 返回值未通过数据模型校验。") from exc
+
+
+def loads_decision(text: str) -> RoutingDecision:
+    """Decode a decision that is known to be plain JSON, e.g. from the cache."""
+    try:
+        obj = loads(text)
+    except ValueError as exc:
+        raise DecisionParseError(f"决策不是合法 JSON：{_preview(text)}") from exc
+    if not isinstance(obj, dict):
+        raise DecisionParseError("决策 JSON 必须是对象。")
+    return validate_decision(obj)
+
+
+def parse_decision(raw: str) -> RoutingDecision:
+    """Read the routing decision from a raw meta-router response.
+
+    Picks the first balanced JSON object that has a ``mode`` field (or
+    else the first object at all) and ignores any text around it.
+    """
+    text = (raw or "").strip()
+    # common case: one object, possibly wrapped in fences or prose without braces
+    first_brace = text.find("{")
+    last_brace = text.rfind("}")
+    if 0 <= first_brace < last_brace:
+        try:
+            obj = loads(text[first_brace : last_brace + 1])
+        except ValueError:
+            obj = None
+        if isinstance(obj, dict):
+            decision = validate_decision(obj)
+            wrapped = first_brace > 0 or last_brace < len(text) - 1
+            META_PARSE.inc(outcome="extracted" if wrapped else "direct")
+            return decision
+    first: Optional[Dict[str, Any]] = None
+    for start, end in scan_json_objects(text):
+        if end is None:
+            raise DecisionParseError(
+                f"MetaRouter 返回的 JSON 不完整。原始响应：{_preview(text)}",
+                partial=text[start:],
+            )
+        try:
+            obj = loads(text[start:end])
+        except ValueError:
+            continue
+        if not isinstance(obj, dict):
+            continue
+        if "mode" in obj:
+            first = obj
+            break
+        if first is None:
+            first = obj
+    if first is None:
+        raise DecisionParseError(f"MetaRouter 返回值不是合法 JSON。原始响应：{_preview(text)}")
+    decision = validate_decision(first)
+    META_PARSE.inc(outcome="extracted")
+    return decision
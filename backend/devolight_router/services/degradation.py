@@ -0,0 +1,142 @@
+"""Graceful degradation for role calls that fail or miss their deadline.
+
+Instead of an error, the role is answered from the first tier that has
+something: the last output cached for the same role and passage, and the
+same question where the role's cache key includes it (served with
+``freshness="stale"``), then the role's local stub (``"stub"``). A
+call that only ran out of time keeps running in the background so its
+result refreshes the cache for the next request.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import Counter
+from typing import Dict, Mapping, Optional, Set
+
+from ..models import RoutingContext, RoutingDecision, RoutingMode, SelectedRole
+from .executor import build_stub_executors
+from .observability import REGISTRY
+from .role_cache import RoleOutputCache
+from .router import RoleExecutionResult, RoleExecutor
+
+LOGGER = logging.getLogger(__name__)
+if not LOGGER.handlers:
+    handler = logging.StreamHandler()
+    handler.setLevel(logging.INFO)
+    formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+    handler.setFormatter(formatter)
+    LOGGER.addHandler(handler)
+LOGGER.setLevel(logging.INFO)
+LOGGER.propagate = False
+
+DEGRADED_OUTPUTS = REGISTRY.counter(
+    "devolight_role_degraded_total", "Role outputs served by a degradation tier.", ("role", "tier")
+)
+
+STALE = "stale"
+STUB = "stub"
+
+
+class DegradationPolicy:
+    """Chooses the stand-in output for a failed role call.
+
+    At most ``max_background_refreshes`` late calls are kept running at a
+    time; further ones are cancelled. ``default_role`` answers requests
+    whose meta-router call failed.
+    """
+
+    def __init__(
+        self,
+        role_cache: Optional[RoleOutputCache] = None,
+        stubs: Optional[Mapping[str, RoleExecutor]] = None,
+        *,
+        max_background_refreshes: int = 16,
+        default_role: str = "AntiochTeacher",
+    ) -> None:
+        self._role_cache = role_cache
+        self._stubs: Dict[str, RoleExecutor] = dict(
+            build_stub_executors() if stubs is None else stubs
+        )
+        self._max_refreshes = max_background_refreshes
+        self._default_role = default_role
+        self._refreshing: Set["asyncio.Future[RoleExecutionResult]"] = set()
+        self._counts: Counter = Counter()
+
+    async def degrade(
+        self, context: RoutingContext, selected: SelectedRole, failure: RoleExecutionResult
+    ) -> RoleExecutionResult:
+        """Return a stale or stub output for ``selected``, or ``failure`` when neither exists."""
+        tier = STALE
+        content = await self._stale(context, selected)
+        if content is None:
+            stub = self._stubs.get(selected.name)
+            if stub is None:
+                return failure
+            tier = STUB
+            content = await stub(context, selected)
+        LOGGER.warning("Role %s served %s output: %s", selected.name, tier, failure.error)
+        DEGRADED_OUTPUTS.inc(role=selected.name, tier=tier)
+        self._counts[tier] += 1
+        return RoleExecutionResult(
+            selected.name, content, freshness=tier, degraded_reason=failure.error
+        )
+
+    async def _stale(self, context: RoutingContext, selected: SelectedRole) -> Optional[str]:
+        if self._role_cache is None:
+            return None
+        try:
+            return await self._role_cache.get_stale(selected, context)
+        except Exception as exc:  # noqa: BLE001 - a broken cache only skips this tier
+            LOGGER.warning("Stale output lookup for %s failed: %s", selected.name, exc)
+            return None
+
+    def keep_refreshing(self, call: "asyncio.Future[RoleExecutionResult]") -> None:
+        """Let a late call finish in the background, or cancel it when too many are running."""
+        if call.done():
+            return
+        if len(self._refreshing) >= self._max_refreshes:
+            self._counts["refreshes_dropped"] += 1
+            call.cancel()
+            return
+        self._counts["refreshes"] += 1
+        self._refreshing.add(call)
+        call.add_done_callback(self._refreshing.discard)
+
+    def decision(self, context: RoutingContext, error: Exception) -> Optional[RoutingDecision]:
+        """A single-role decision to use when the meta router failed; ``None`` without a passage."""
+        if not context.scripture:
+            return None
+        role = context.last_role if context.last_role in self._stubs else self._default_role
+        self._counts["decisions"] += 1
+        return RoutingDecision(
+            mode=RoutingMode.SINGLE,
+            selected_roles=[
+                SelectedRole(
+                    name=role,
+                    score=0.5,
+                    reason="调度服务暂不可用，沿用默认角色。",
+                    handoff_note="最终输出",
+                )
+            ],
+            overall_rationale="MetaRouter 调度失败，已降级为单一角色。",
+            fallback_plan="稍后重试以获得完整的角色调度。",
+            warnings=[str(error) or "MetaRouter 调度失败。"],
+        )
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            STALE: self._counts[STALE],
+            STUB: self._counts[STUB],
+            "decisions": self._counts["decisions"],
+            "refreshes": self._counts["refreshes"],
+            "refreshes_dropped": self._counts["refreshes_dropped"],
+            "refreshing": len(self._refreshing),
+        }
+
+    async def aclose(self) -> None:
+        """Cancel background refreshes still running."""
+        calls = list(self._refreshing)
+        for call in calls:
+            call.cancel()
+        await asyncio.gather(*calls, return_exceptions=True)
@@ -1,23 +1,60 @@
 from __future__ import annotations
 
 import logging
-from typing import Dict, Optional
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, AsyncIterator, Dict, Iterator, Optional, Union
 
-from ..prompts import load_prompt
-from .llm_client import ClaudeMessagesCallable
+from ..prompts import PromptRegistry, PromptVersion, default_registry
+from .compaction import ContextCompactor
+from .llm_client import AsyncLLMCallable, LLMCallable, as_async_llm, as_streaming_llm
+from .observability import PROMPT_SELECTIONS
+from .role_cache import RoleOutputCache
+from .serialization import encoded_payload
 
 from ..models import RoutingContext, SelectedRole
 from .router import ExecutionOrchestrator, RoleExecutionResult, RoleExecutor
 
+if TYPE_CHECKING:
+    from .degradation import DegradationPolicy
+
+
+# Cleared for speculative runs, which start before the meta router has given a reason or score.
+ROUTING_ANNOTATIONS: ContextVar[bool] = ContextVar("routing_annotations", default=True)
+
+
+@contextmanager
+def without_routing_annotations() -> Iterator[None]:
+    """Keep the role's ``reason`` and ``score`` out of role calls started inside the block."""
+    token = ROUTING_ANNOTATIONS.set(False)
+    try:
+        yield
+    finally:
+        ROUTING_ANNOTATIONS.reset(token)
+
 
 def _create_stub_executor(prefix: str) -> RoleExecutor:
-    def executor(context: RoutingContext, role: SelectedRole) -> str:
+    async def executor(context: RoutingContext, role: SelectedRole) -> str:
         scripture = context.scripture or "未知经文"
-        return f"{prefix} 响应 {scripture}，意图评分 {role.score:.2f}。备注：{role.handoff_note}"
+        score = f"，意图评分 {role.score:.2f}" if ROUTING_ANNOTATIONS.get() else ""
+        return f"{prefix} 响应 {scripture}{score}。备注：{role.handoff_note}"
 
     return executor
 
 
+STUB_PREFIXES: Dict[str, str] = {
+    "AntiochTeacher": "安提阿老师",
+    "LukeScribe": "路加笔者",
+    "MarthaMentor": "马大姊妹",
+    "BarnabasCompanion": "巴拿巴友伴",
+}
+
+
+def build_stub_executors() -> Dict[str, RoleExecutor]:
+    """Local executors that answer without an LLM."""
+    return {name: _create_stub_executor(prefix) for name, prefix in STUB_PREFIXES.items()}
+
+
 LOGGER = logging.getLogger(__name__)
 if not LOGGER.handlers:
     handler = logging.StreamHandler()
@@ -32,16 +69,83 @@ LOGGER.propagate = False
 class PromptRoleExecutor:
     """Invoke a prompt-driven role via LLM callable."""
 
-    def __init__(self, llm_call: ClaudeMessagesCallable, prompt_name: str) -> None:
-        self._llm_call = llm_call
-        self._prompt_template = load_prompt(prompt_name)
+    def __init__(
+        self,
+        llm_call: Union[LLMCallable, AsyncLLMCallable],
+        prompt_name: str,
+        *,
+        output_cache: Optional[RoleOutputCache] = None,
+        compactor: Optional[ContextCompactor] = None,
+        prompts: Optional[PromptRegistry] = None,
+    ) -> None:
+        self._llm_call = as_async_llm(llm_call)
+        self._llm_stream = as_streaming_llm(llm_call)
+        self._prompts = prompts or default_registry()
+        self._prompt_name = prompt_name
+        self._prompts.get(prompt_name)  # fail at startup if the file is missing
+        self._model_name = getattr(llm_call, "model", "")
+        self._output_cache = output_cache
+        self._compactor = compactor
+
+    def _prompt(self) -> PromptVersion:
+        """Resolve the prompt per call so reloads and A/B variants apply immediately."""
+        prompt = self._prompts.select(self._prompt_name)
+        PROMPT_SELECTIONS.inc(prompt=prompt.label)
+        return prompt
+
+    def _cache_key(
+        self, context: RoutingContext, role: SelectedRole, prompt: PromptVersion
+    ) -> Optional[str]:
+        if self._output_cache is None:
+            return None
+        return self._output_cache.key(role, context, prompt.hash, self._model_name)
 
-    def __call__(self, context: RoutingContext, role: SelectedRole) -> str:
-        payload = self._build_payload(context, role)
+    async def __call__(self, context: RoutingContext, role: SelectedRole) -> str:
+        prompt = self._prompt()
+        cache_key = self._cache_key(context, role, prompt)
+        if cache_key is not None:
+            cached = await self._output_cache.get(cache_key)
+            if cached is not None:
+                LOGGER.info("Role %s served from output cache", role.name)
+                return cached
+        payload = self._compact(role, self._build_payload(context, role))
         LOGGER.info("Invoking role %s with payload keys: %s", role.name, ", ".join(payload.keys()))
-        raw = self._llm_call(self._prompt_template, payload)
+        raw = await self._llm_call(prompt.text, payload)
+        if cache_key is not None:
+            await self._output_cache.put(
+                cache_key, role.name, raw, stale_key=self._output_cache.stale_key(role, context)
+            )
         return raw
 
+    async def stream(self, context: RoutingContext, role: SelectedRole) -> AsyncIterator[str]:
+        """Yield the role's response text as it arrives from the LLM."""
+        prompt = self._prompt()
+        cache_key = self._cache_key(context, role, prompt)
+        if cache_key is not None:
+            cached = await self._output_cache.get(cache_key)
+            if cached is not None:
+                LOGGER.info("Role %s served from output cache", role.name)
+                yield cached
+                return
+        payload = self._compact(role, self._build_payload(context, role))
+        LOGGER.info("Streaming role %s with payload keys: %s", role.name, ", ".join(payload.keys()))
+        chunks = []
+        async for chunk in self._llm_stream(prompt.text, payload):
+            chunks.append(chunk)
+            yield chunk
+        if cache_key is not None:
+            await self._output_cache.put(
+                cache_key,
+                role.name,
+                "".join(chunks),
+                stale_key=self._output_cache.stale_key(role, context),
+            )
+
+    def _compact(self, role: SelectedRole, payload: Dict) -> Dict:
+        if self._compactor is not None:
+            payload, _ = self._compactor.compact(role.name, payload)
+        return encoded_payload(payload)
+
     @staticmethod
     def _build_payload(context: RoutingContext, role: SelectedRole) -> Dict:
         user_profile = (
@@ -55,31 +159,59 @@ class PromptRoleExecutor:
             "session_stage": context.session_stage,
             "history_summary": context.history_summary,
             "handoff_note": role.handoff_note,
-            "role_reason": role.reason,
-            "role_score": role.score,
             "raw_payload": context.raw_payload,
             "warnings": context.requires_attention(),
         }
+        if ROUTING_ANNOTATIONS.get():
+            payload.update(role_reason=role.reason, role_score=role.score)
         return {key: value for key, value in payload.items() if value not in (None, {})}
 
 
 def build_default_orchestrator(
-    llm_call: Optional[ClaudeMessagesCallable] = None,
+    llm_call: Optional[Union[LLMCallable, AsyncLLMCallable]] = None,
+    *,
+    max_concurrency: int = 4,
+    output_cache: Optional[RoleOutputCache] = None,
+    compactor: Optional[ContextCompactor] = None,
+    prompts: Optional[PromptRegistry] = None,
+    role_timeout: Optional[float] = None,
+    degradation: Optional["DegradationPolicy"] = None,
 ) -> ExecutionOrchestrator:
-    orchestrator = ExecutionOrchestrator()
+    orchestrator = ExecutionOrchestrator(
+        max_concurrency=max_concurrency, role_timeout=role_timeout, degradation=degradation
+    )
     if llm_call is None:
-        executors: Dict[str, RoleExecutor] = {
-            "AntiochTeacher": _create_stub_executor("安提阿老师"),
-            "LukeScribe": _create_stub_executor("路加笔者"),
-            "MarthaMentor": _create_stub_executor("马大姊妹"),
-            "BarnabasCompanion": _create_stub_executor("巴拿巴友伴"),
-        }
+        executors: Dict[str, RoleExecutor] = build_stub_executors()
     else:
         executors = {
-            "AntiochTeacher": PromptRoleExecutor(llm_call, "antioch_teacher"),
-            "LukeScribe": PromptRoleExecutor(llm_call, "luke_scribe"),
-            "MarthaMentor": PromptRoleExecutor(llm_call, "martha_mentor"),
-            "BarnabasCompanion": PromptRoleExecutor(llm_call, "barnabas_companion"),
+            "AntiochTeacher": PromptRoleExecutor(
+                llm_call,
+                "antioch_teacher",
+                output_cache=output_cache,
+                compactor=compactor,
+                prompts=prompts,
+            ),
+            "LukeScribe": PromptRoleExecutor(
+                llm_call,
+                "luke_scribe",
+                output_cache=output_cache,
+                compactor=compactor,
+                prompts=prompts,
+            ),
+            "MarthaMentor": PromptRoleExecutor(
+                llm_call,
+                "martha_mentor",
+                output_cache=output_cache,
+                compactor=compactor,
+                prompts=prompts,
+            ),
+            "BarnabasCompanion": PromptRoleExecutor(
+                llm_call,
+                "barnabas_companion",
+                output_cache=output_cache,
+                compactor=compactor,
+                prompts=prompts,
+            ),
         }
     for name, executor in executors.items():
         orchestrator.register(name, executor)
@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from ..models import ROLE_ALIASES, RoutingContext, RoutingDecision, RoutingMode, SelectedRole
+
+SEQUENCE_ORDER = ("AntiochTeacher", "LukeScribe", "MarthaMentor", "BarnabasCompanion")
+
+SEQUENCE_HANDOFFS = {
+    "AntiochTeacher": "请路加笔者补充经文的历史背景。",
+    "LukeScribe": "请马大姊妹把神学与背景转化为生活应用。",
+    "MarthaMentor": "请巴拿巴友伴以陪伴与祷告收尾。",
+    "BarnabasCompanion": "最终输出",
+}
+
+
+@dataclass
+class FastPathConfig:
+    """Rule table for the local pre-router.
+
+    ``rules`` is evaluated in order; the first rule that is confident wins.
+    Loadable from JSON with the same field names.
+    """
+
+    rules: Tuple[str, ...] = ("missing_scripture", "explicit_role", "full_devotion")
+    explicit_role_fields: Tuple[str, ...] = ("role", "requested_role", "role_name")
+    full_devotion_keywords: Tuple[str, ...] = (
+        "完整灵修",
+        "完整的灵修",
+        "完整解经",
+        "完整流程",
+        "全套",
+        "full devotion",
+    )
+    role_aliases: Dict[str, Tuple[str, ...]] = field(default_factory=lambda: dict(ROLE_ALIASES))
+
+    @classmethod
+    def from_file(cls, path: str) -> "FastPathConfig":
+        with open(path, encoding="utf-8") as handle:
+            raw = json.load(handle)
+        defaults = cls()
+        return cls(
+            rules=tuple(raw.get("rules", defaults.rules)),
+            explicit_role_fields=tuple(raw.get("explicit_role_fields", defaults.explicit_role_fields)),
+            full_devotion_keywords=tuple(
+                raw.get("full_devotion_keywords", defaults.full_devotion_keywords)
+            ),
+            role_aliases={
+                name: tuple(aliases)
+                for name, aliases in raw.get("role_aliases", defaults.role_aliases).items()
+            },
+        )
+
+
+class FastPathRouter:
+    """Builds a RoutingDecision locally for unambiguous requests.
+
+    Returns ``None`` whenever no rule is confident so the caller defers to
+    the meta-router LLM.
+    """
+
+    def __init__(self, config: Optional[FastPathConfig] = None) -> None:
+        self._config = config or FastPathConfig()
+        available: Dict[str, Callable[[RoutingContext], Optional[RoutingDecision]]] = {
+            "missing_scripture": self._missing_scripture,
+            "explicit_role": self._explicit_role,
+            "full_devotion": self._full_devotion,
+        }
+        unknown = [name for name in self._config.rules if name not in available]
+        if unknown:
+            raise ValueError(f"未知快速路由规则: {', '.join(unknown)}")
+        self._rules: List[Tuple[str, Callable[[RoutingContext], Optional[RoutingDecision]]]] = [
+            (name, available[name]) for name in self._config.rules
+        ]
+        self.hits: Dict[str, int] = {name: 0 for name in self._config.rules}
+        self.misses = 0
+
+    def stats(self) -> Dict[str, object]:
+        total_hits = sum(self.hits.values())
+        lookups = total_hits + self.misses
+        return {
+            "hits": dict(self.hits),
+            "misses": self.misses,
+            "hit_rate": round(total_hits / lookups, 4) if lookups else 0.0,
+        }
+
+    def route(self, context: RoutingContext) -> Optional[RoutingDecision]:
+        for name, rule in self._rules:
+            decision = rule(context)
+            if decision is not None:
+                self.hits[name] += 1
+                return decision
+        self.misses += 1
+        return None
+
+    def _missing_scripture(self, context: RoutingContext) -> Optional[RoutingDecision]:
+        warnings = context.requires_attention()
+        if not warnings:
+            return None
+        return RoutingDecision(
+            mode=RoutingMode.HALT,
+            selected_roles=[],
+            overall_rationale="缺少经文章节，暂不安排角色回应。",
+            fallback_plan="请补充经文章节（如：约3:16）后重试。",
+            warnings=warnings,
+        )
+
+    def _explicit_role(self, context: RoutingContext) -> Optional[RoutingDecision]:
+        for field_name in self._config.explicit_role_fields:
+            requested = context.raw_payload.get(field_name)
+            if not isinstance(requested, str) or not requested.strip():
+                continue
+            matches = [
+                name
+                for name, aliases in self._config.role_aliases.items()
+                if any(alias.lower() in requested.lower() for alias in aliases)
+            ]
+            if len(matches) != 1:
+                return None
+            return RoutingDecision(
+                mode=RoutingMode.SINGLE,
+                selected_roles=[
+                    SelectedRole(
+                        name=matches[0],
+                        score=1.0,
+                        reason="用户指定了该角色。",
+                        handoff_note="最终输出",
+                    )
+                ],
+                overall_rationale="用户明确指定角色，直接进入单角色模式。",
+                fallback_plan="若回应不符合期待，可交由调度者重新评估角色组合。",
+            )
+        return None
+
+    def _full_devotion(self, context: RoutingContext) -> Optional[RoutingDecision]:
+        question = (context.user_question or "").lower()
+        if not question or not any(
+            keyword.lower() in question for keyword in self._config.full_devotion_keywords
+        ):
+            return None
+        return RoutingDecision(
+            mode=RoutingMode.SEQUENCE,
+            selected_roles=[
+                SelectedRole(
+                    name=name,
+                    score=1.0,
+                    reason="用户请求完整灵修流程。",
+                    handoff_note=SEQUENCE_HANDOFFS[name],
+                )
+                for name in SEQUENCE_ORDER
+            ],
+            overall_rationale="用户请求完整灵修，按安提阿→路加→马大→巴拿巴的固定顺序执行。",
+            fallback_plan="若某角色失败，保留其余角色的回应并提示用户。",
+        )
@@ -0,0 +1,390 @@
+"""Shared key/value state for running several workers.
+
+Every uvicorn worker is a separate process, so in-process caches and
+session stores diverge between workers. A :class:`KeyValueStore` is the
+shared state the session repository and the response caches plug into:
+:class:`LocalKeyValueStore` keeps the single-process behaviour and
+:class:`RedisKeyValueStore` speaks the Redis protocol (RESP2) over a small
+connection pool, so any Redis-compatible server can back all workers.
+"""
+from __future__ import annotations
+
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Protocol, Sequence, Tuple
+from urllib.parse import unquote, urlsplit
+
+from .cache import CacheStats
+
+
+class KeyValueStoreError(RuntimeError):
+    """Raised when the shared store is unreachable or rejects a command."""
+
+
+class KeyValueConflictError(KeyValueStoreError):
+    """Raised when an optimistic update keeps losing to concurrent writers."""
+
+
+Updater = Callable[[Optional[str]], Optional[str]]
+
+
+class KeyValueStore(Protocol):
+    """String store with TTL, batched reads and optimistic read-modify-write."""
+
+    blocking_io: bool
+
+    def get(self, key: str) -> Optional[str]:
+        ...
+
+    def mget(self, keys: Sequence[str]) -> List[Optional[str]]:
+        ...
+
+    def set(self, key: str, value: str, ttl_seconds: Optional[float] = None) -> None:
+        ...
+
+    def delete(self, key: str) -> None:
+        ...
+
+    def update(
+        self, key: str, updater: Updater, ttl_seconds: Optional[float] = None
+    ) -> Optional[str]:
+        """Apply ``updater`` to the current value and write its result atomically.
+
+        ``updater`` may run more than once when another writer touches the
+        key in between; returning ``None`` leaves the key unchanged.
+        """
+        ...
+
+
+class LocalKeyValueStore:
+    """Thread-safe in-process store; only shared between threads of one worker.
+
+    Expired keys are dropped when read and by a sweep that runs whenever
+    the store has doubled since the last one, so keys that are written
+    once and never read again do not pile up.
+    """
+
+    blocking_io = False
+
+    def __init__(
+        self, clock: Callable[[], float] = time.monotonic, min_sweep_size: int = 1024
+    ) -> None:
+        self._clock = clock
+        self._entries: Dict[str, Tuple[Optional[float], str]] = {}
+        self._lock = threading.Lock()
+        self._min_sweep_size = min_sweep_size
+        self._sweep_at = min_sweep_size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _read(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= self._clock():
+            del self._entries[key]
+            return None
+        return value
+
+    def _write(self, key: str, value: str, ttl_seconds: Optional[float]) -> None:
+        expires_at = self._clock() + ttl_seconds if ttl_seconds is not None else None
+        self._entries[key] = (expires_at, value)
+        if len(self._entries) >= self._sweep_at:
+            self._sweep()
+
+    def _sweep(self) -> None:
+        now = self._clock()
+        expired = [
+            key
+            for key, (expires_at, _) in self._entries.items()
+            if expires_at is not None and expires_at <= now
+        ]
+        for key in expired:
+            del self._entries[key]
+        self._sweep_at = max(self._min_sweep_size, 2 * len(self._entries))
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            return self._read(key)
+
+    def mget(self, keys: Sequence[str]) -> List[Optional[str]]:
+        with self._lock:
+            return [self._read(key) for key in keys]
+
+    def set(self, key: str, value: str, ttl_seconds: Optional[float] = None) -> None:
+        with self._lock:
+            self._write(key, value, ttl_seconds)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def update(
+        self, key: str, updater: Updater, ttl_seconds: Optional[float] = None
+    ) -> Optional[str]:
+        with self._lock:
+            value = updater(self._read(key))
+            if value is not None:
+                self._write(key, value, ttl_seconds)
+            return value
+
+
+class _ReplyError:
+    def __init__(self, message: str) -> None:
+        self.message = message
+
+
+def _encode(args: Sequence[Any]) -> bytes:
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        data = arg if isinstance(arg, bytes) else str(arg).encode("utf-8")
+        parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(parts)
+
+
+class _RespConnection:
+    """One blocking RESP2 connection; not thread-safe, owned by the pool."""
+
+    def __init__(self, host: str, port: int, timeout: float) -> None:
+        self._sock = socket.create_connection((host, port), timeout=timeout)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._reader = self._sock.makefile("rb")
+
+    def execute(self, *args: Any) -> Any:
+        return self.pipeline([args])[0]
+
+    def pipeline(self, commands: Sequence[Sequence[Any]]) -> List[Any]:
+        """Send every command in one write and read the replies in order."""
+        self._sock.sendall(b"".join(_encode(command) for command in commands))
+        replies = [self._read_reply() for _ in commands]
+        for reply in replies:
+            if isinstance(reply, _ReplyError):
+                raise KeyValueStoreError(f"共享存储命令失败: {reply.message}")
+        return replies
+
+    def _read_reply(self) -> Any:
+        line = self._reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise ConnectionError("共享存储连接已断开。")
+        prefix, rest = line[:1], line[1:-2]
+        if prefix == b"+":
+            return rest.decode("utf-8")
+        if prefix == b"-":
+            return _ReplyError(rest.decode("utf-8"))
+        if prefix == b":":
+            return int(rest)
+        if prefix == b"$":
+            length = int(rest)
+            if length < 0:
+                return None
+            return self._reader.read(length + 2)[:-2].decode("utf-8")
+        if prefix == b"*":
+            count = int(rest)
+            if count < 0:
+                return None
+            return [self._read_reply() for _ in range(count)]
+        raise ConnectionError(f"无法解析的共享存储响应: {line!r}")
+
+    def close(self) -> None:
+        try:
+            self._reader.close()
+        finally:
+            self._sock.close()
+
+
+class _ConnectionPool:
+    """Bounded pool; a connection that raised is closed instead of reused."""
+
+    def __init__(
+        self, factory: Callable[[], _RespConnection], max_connections: int, timeout: float
+    ) -> None:
+        if max_connections < 1:
+            raise ValueError("max_connections 必须至少为 1。")
+        self._factory = factory
+        self._timeout = timeout
+        self._idle: List[_RespConnection] = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self.created = 0
+
+    @contextmanager
+    def connection(self) -> Iterator[_RespConnection]:
+        if not self._slots.acquire(timeout=self._timeout):
+            raise KeyValueStoreError("共享存储连接池已耗尽。")
+        try:
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+            if conn is None:
+                conn = self._factory()
+                self.created += 1
+            try:
+                yield conn
+            except BaseException:
+                conn.close()
+                raise
+            with self._lock:
+                self._idle.append(conn)
+        finally:
+            self._slots.release()
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+class RedisKeyValueStore:
+    """Redis-protocol client with a connection pool.
+
+    ``mget`` is one round trip for any number of keys; ``update`` uses
+    ``WATCH``/``MULTI``/``EXEC`` with the transaction pipelined into a
+    single write and retries when another writer wins the race.
+    """
+
+    blocking_io = True
+
+    def __init__(
+        self,
+        url: str = "redis://127.0.0.1:6379/0",
+        *,
+        max_connections: int = 16,
+        timeout_seconds: float = 5.0,
+        max_update_attempts: int = 5,
+    ) -> None:
+        parts = urlsplit(url)
+        if parts.scheme != "redis":
+            raise ValueError(f"不支持的共享存储地址: {url}")
+        self._host = parts.hostname or "127.0.0.1"
+        self._port = parts.port or 6379
+        self._db = int(parts.path.lstrip("/") or 0)
+        self._password = unquote(parts.password) if parts.password else None
+        self._timeout = timeout_seconds
+        self._max_update_attempts = max_update_attempts
+        self._pool = _ConnectionPool(self._connect, max_connections, timeout_seconds)
+        self.conflicts = 0
+
+    def _connect(self) -> _RespConnection:
+        try:
+            conn = _RespConnection(self._host, self._port, self._timeout)
+        except OSError as exc:
+            raise KeyValueStoreError(f"无法连接共享存储 {self._host}:{self._port}: {exc}") from exc
+        setup: List[Tuple[Any, ...]] = []
+        if self._password:
+            setup.append(("AUTH", self._password))
+        if self._db:
+            setup.append(("SELECT", self._db))
+        if setup:
+            conn.pipeline(setup)
+        return conn
+
+    @contextmanager
+    def _connection(self) -> Iterator[_RespConnection]:
+        try:
+            with self._pool.connection() as conn:
+                yield conn
+        except (OSError, ValueError) as exc:
+            raise KeyValueStoreError(f"共享存储请求失败: {exc}") from exc
+
+    def stats(self) -> Dict[str, int]:
+        return {"connections": self._pool.created, "conflicts": self.conflicts}
+
+    def ping(self) -> None:
+        with self._connection() as conn:
+            conn.execute("PING")
+
+    def get(self, key: str) -> Optional[str]:
+        with self._connection() as conn:
+            return conn.execute("GET", key)
+
+    def mget(self, keys: Sequence[str]) -> List[Optional[str]]:
+        if not keys:
+            return []
+        with self._connection() as conn:
+            return conn.execute("MGET", *keys)
+
+    def set(self, key: str, value: str, ttl_seconds: Optional[float] = None) -> None:
+        with self._connection() as conn:
+            conn.execute(*self._set_command(key, value, ttl_seconds))
+
+    def delete(self, key: str) -> None:
+        with self._connection() as conn:
+            conn.execute("DEL", key)
+
+    def update(
+        self, key: str, updater: Updater, ttl_seconds: Optional[float] = None
+    ) -> Optional[str]:
+        with self._connection() as conn:
+            for _ in range(self._max_update_attempts):
+                conn.execute("WATCH", key)
+                value = updater(conn.execute("GET", key))
+                if value is None:
+                    conn.execute("UNWATCH")
+                    return None
+                replies = conn.pipeline(
+                    [("MULTI",), self._set_command(key, value, ttl_seconds), ("EXEC",)]
+                )
+                if replies[-1] is not None:
+                    return value
+                self.conflicts += 1
+        raise KeyValueConflictError(f"键 {key} 并发写入冲突，已重试 {self._max_update_attempts} 次。")
+
+    @staticmethod
+    def _set_command(key: str, value: str, ttl_seconds: Optional[float]) -> Tuple[Any, ...]:
+        if ttl_seconds is None:
+            return ("SET", key, value)
+        return ("SET", key, value, "PX", max(1, int(ttl_seconds * 1000)))
+
+    def close(self) -> None:
+        self._pool.close()
+
+
+def build_kv_store(url: str, *, max_connections: int = 16) -> KeyValueStore:
+    """Create a store from ``memory`` or a ``redis://[:password@]host:port/db`` URL."""
+    if url.lower() == "memory":
+        return LocalKeyValueStore()
+    return RedisKeyValueStore(url, max_connections=max_connections)
+
+
+class KeyValueCache:
+    """``CacheBackend`` over a shared store, so every worker sees the same entries."""
+
+    def __init__(
+        self,
+        store: KeyValueStore,
+        *,
+        prefix: str = "devo:cache:",
+        default_ttl: Optional[float] = None,
+    ) -> None:
+        self.store = store
+        self.blocking_io = store.blocking_io
+        self._prefix = prefix
+        self._default_ttl = default_ttl
+        self.stats = CacheStats()
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.store.get(self._prefix + key)
+        self._count(value)
+        return value
+
+    def get_many(self, keys: Sequence[str]) -> List[Optional[str]]:
+        """Look several keys up in one round trip."""
+        values = self.store.mget([self._prefix + key for key in keys])
+        for value in values:
+            self._count(value)
+        return values
+
+    def set(self, key: str, value: str, ttl_seconds: Optional[float] = None) -> None:
+        ttl = ttl_seconds if ttl_seconds is not None else self._default_ttl
+        self.store.set(self._prefix + key, value, ttl)
+        self.stats.sets += 1
+
+    def _count(self, value: Optional[str]) -> None:
+        if value is None:
+            self.stats.misses += 1
+        else:
+            self.stats.hits += 1
@@ -1,18 +1,164 @@
 from __future__ import annotations
 
-import json
+import asyncio
+import hashlib
+import importlib.util
+import inspect
 import os
-from typing import Dict, Iterable, List, Optional
+import threading
+from dataclasses import asdict, dataclass
+from typing import (
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
 
 import httpx
 
+from .observability import observe_usage
+from .serialization import EncodedPayload, dumps, dumps_str, loads
+
+LLMCallable = Callable[[str, Dict], str]
+AsyncLLMCallable = Callable[[str, Dict], Awaitable[str]]
+StreamingLLMCallable = Callable[[str, Dict], AsyncIterator[str]]
+
+
+RETRYABLE_STATUS_CODES = frozenset({408, 409, 425, 429, 500, 502, 503, 504, 529})
+
 
 class ClaudeMessagesError(RuntimeError):
     """Raised when the Claude messages API call fails."""
 
+    def __init__(
+        self,
+        message: str,
+        *,
+        status_code: Optional[int] = None,
+        retry_after: Optional[float] = None,
+        retryable: bool = False,
+    ) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.retryable = retryable or status_code in RETRYABLE_STATUS_CODES
+
+
+def _retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    value = response.headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+def _status_error(response: httpx.Response, detail: str) -> ClaudeMessagesError:
+    return ClaudeMessagesError(
+        f"Claude API 返回错误状态码 {response.status_code}: {detail}",
+        status_code=response.status_code,
+        retry_after=_retry_after_seconds(response),
+    )
+
+
+@dataclass(frozen=True)
+class TransportSettings:
+    """Connection pool and timeout configuration for the Claude HTTP client."""
+
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    keepalive_expiry: float = 30.0
+    http2: bool = False
+    connect_timeout: float = 5.0
+    read_timeout: float = 30.0
+    write_timeout: float = 10.0
+    pool_timeout: float = 5.0
+
+    @classmethod
+    def from_environment(cls, read_timeout: float = 30.0) -> "TransportSettings":
+        try:
+            settings = cls(
+                max_connections=int(os.getenv("DEVO_CLAUDE_POOL_SIZE", "20")),
+                max_keepalive_connections=int(os.getenv("DEVO_CLAUDE_POOL_KEEPALIVE", "10")),
+                keepalive_expiry=float(os.getenv("DEVO_CLAUDE_KEEPALIVE_EXPIRY", "30.0")),
+                http2=os.getenv("DEVO_CLAUDE_HTTP2", "0").lower() in ("1", "true", "yes"),
+                connect_timeout=float(os.getenv("DEVO_CLAUDE_CONNECT_TIMEOUT", "5.0")),
+                read_timeout=read_timeout,
+                write_timeout=float(os.getenv("DEVO_CLAUDE_WRITE_TIMEOUT", "10.0")),
+                pool_timeout=float(os.getenv("DEVO_CLAUDE_POOL_TIMEOUT", "5.0")),
+            )
+        except ValueError as exc:
+            raise ClaudeMessagesError(f"Claude 连接池环境变量格式错误: {exc}") from exc
+        settings.validate()
+        return settings
+
+    def validate(self) -> None:
+        if self.max_connections <= 0:
+            raise ClaudeMessagesError("DEVO_CLAUDE_POOL_SIZE 必须为正整数。")
+        if self.max_keepalive_connections < 0 or self.max_keepalive_connections > self.max_connections:
+            raise ClaudeMessagesError("DEVO_CLAUDE_POOL_KEEPALIVE 必须介于 0 与连接池大小之间。")
+        if self.http2 and importlib.util.find_spec("h2") is None:
+            raise ClaudeMessagesError("启用 DEVO_CLAUDE_HTTP2 需要安装 httpx[http2]。")
+
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    def timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(
+            connect=self.connect_timeout,
+            read=self.read_timeout,
+            write=self.write_timeout,
+            pool=self.pool_timeout,
+        )
+
+
+INPUT_USAGE_FIELDS = ("input_tokens", "cache_creation_input_tokens", "cache_read_input_tokens")
+
+
+@dataclass
+class TokenUsage:
+    """Cumulative token counts parsed from Messages API ``usage`` fields."""
+
+    calls: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_creation_input_tokens: int = 0
+    cache_read_input_tokens: int = 0
+
+    def record(self, usage: Optional[Dict]) -> None:
+        if not isinstance(usage, dict):
+            return
+        for field in (
+            "input_tokens",
+            "output_tokens",
+            "cache_creation_input_tokens",
+            "cache_read_input_tokens",
+        ):
+            value = usage.get(field)
+            if isinstance(value, int):
+                setattr(self, field, getattr(self, field) + value)
+
+    def snapshot(self) -> Dict[str, int]:
+        return asdict(self)
+
 
 class ClaudeMessagesCallable:
-    """Callable wrapper that invokes the Claude messages API."""
+    """Callable wrapper that invokes the Claude messages API.
+
+    With ``prompt_cache`` enabled the system prompt, and the payload fields
+    named in ``cacheable_payload_keys``, are sent as ``cache_control``
+    blocks so the upstream can reuse the identical prefix across calls.
+    """
 
     def __init__(
         self,
@@ -23,13 +169,38 @@ class ClaudeMessagesCallable:
         max_output_tokens: int = 1024,
         temperature: float = 0.0,
         timeout_seconds: float = 30.0,
+        transport: Optional[TransportSettings] = None,
+        client: Optional[httpx.Client] = None,
+        async_client: Optional[httpx.AsyncClient] = None,
+        prompt_cache: bool = True,
+        cacheable_payload_keys: Iterable[str] = (),
     ) -> None:
         self._api_key = api_key
         self._base_url = base_url.rstrip("/")
         self._model = model
         self._max_output_tokens = max_output_tokens
         self._temperature = temperature
-        self._timeout = timeout_seconds
+        self._transport = transport or TransportSettings(read_timeout=timeout_seconds)
+        self._client = client
+        self._client_lock = threading.Lock()
+        self._async_client = async_client
+        self._pool_owner: Optional["ClaudeMessagesCallable"] = None  # set on with_options variants
+        self._prompt_cache = prompt_cache
+        self._cacheable_payload_keys = tuple(cacheable_payload_keys)
+        self.usage = TokenUsage()
+
+    @property
+    def model(self) -> str:
+        return self._model
+
+    @property
+    def base_url(self) -> str:
+        return self._base_url
+
+    @property
+    def key_id(self) -> str:
+        """Stable, non-secret identifier of the API key for per-key limits."""
+        return hashlib.sha256(self._api_key.encode("utf-8")).hexdigest()[:12]
 
     @classmethod
     def from_environment(cls) -> "ClaudeMessagesCallable":
@@ -39,9 +210,20 @@ class ClaudeMessagesCallable:
             raise ClaudeMessagesError("缺少环境变量 DEVO_CLAUDE_API_KEY，用于访问 Claude API。")
         base_url = os.getenv("DEVO_CLAUDE_BASE_URL", "https://dpapi.cn")
         model = os.getenv("DEVO_CLAUDE_MODEL", "claude-sonnet-4-20250514")
-        max_tokens = int(os.getenv("DEVO_CLAUDE_MAX_TOKENS", "1024"))
-        temperature = float(os.getenv("DEVO_CLAUDE_TEMPERATURE", "0.0"))
-        timeout = float(os.getenv("DEVO_CLAUDE_TIMEOUT", "30.0"))
+        try:
+            max_tokens = int(os.getenv("DEVO_CLAUDE_MAX_TOKENS", "1024"))
+            temperature = float(os.getenv("DEVO_CLAUDE_TEMPERATURE", "0.0"))
+            timeout = float(os.getenv("DEVO_CLAUDE_TIMEOUT", "30.0"))
+        except ValueError as exc:
+            raise ClaudeMessagesError(f"Claude 环境变量格式错误: {exc}") from exc
+        if max_tokens <= 0 or timeout <= 0:
+            raise ClaudeMessagesError("DEVO_CLAUDE_MAX_TOKENS 与 DEVO_CLAUDE_TIMEOUT 必须为正数。")
+        prompt_cache = os.getenv("DEVO_CLAUDE_PROMPT_CACHE", "1").lower() in ("1", "true", "yes")
+        cacheable_keys = [
+            key.strip()
+            for key in os.getenv("DEVO_CLAUDE_CACHE_PAYLOAD_KEYS", "").split(",")
+            if key.strip()
+        ]
         return cls(
             api_key=api_key,
             base_url=base_url,
@@ -49,51 +231,202 @@ class ClaudeMessagesCallable:
             max_output_tokens=max_tokens,
             temperature=temperature,
             timeout_seconds=timeout,
+            transport=TransportSettings.from_environment(read_timeout=timeout),
+            prompt_cache=prompt_cache,
+            cacheable_payload_keys=cacheable_keys,
         )
 
+    def with_options(
+        self, *, model: Optional[str] = None, max_output_tokens: Optional[int] = None
+    ) -> "ClaudeMessagesCallable":
+        """Return a variant for another model or output cap.
+
+        The variant shares this connection pool, created only when either
+        instance first needs it, and the token usage counters. Only the
+        original instance should be closed.
+        """
+        variant = ClaudeMessagesCallable(
+            api_key=self._api_key,
+            base_url=self._base_url,
+            model=model or self._model,
+            max_output_tokens=max_output_tokens or self._max_output_tokens,
+            temperature=self._temperature,
+            transport=self._transport,
+            prompt_cache=self._prompt_cache,
+            cacheable_payload_keys=self._cacheable_payload_keys,
+        )
+        variant._pool_owner = self._pool_owner or self
+        variant.usage = self.usage
+        return variant
+
+    def _get_client(self) -> httpx.Client:
+        """Return the shared keep-alive client, creating it on first use."""
+        if self._pool_owner is not None:
+            return self._pool_owner._get_client()
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = httpx.Client(
+                        limits=self._transport.limits(),
+                        timeout=self._transport.timeout(),
+                        http2=self._transport.http2,
+                    )
+        return self._client
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        """Return the shared async keep-alive client, creating it on first use."""
+        if self._pool_owner is not None:
+            return self._pool_owner._get_async_client()
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(
+                limits=self._transport.limits(),
+                timeout=self._transport.timeout(),
+                http2=self._transport.http2,
+            )
+        return self._async_client
+
+    def close(self) -> None:
+        """Close pooled connections; the client is recreated on next use."""
+        with self._client_lock:
+            client, self._client = self._client, None
+        if client is not None:
+            client.close()
+
+    async def aclose(self) -> None:
+        """Close both the sync and the async connection pools."""
+        self.close()
+        async_client, self._async_client = self._async_client, None
+        if async_client is not None:
+            await async_client.aclose()
+
     def __call__(self, prompt: str, payload: Dict) -> str:
         """Invoke the Claude API and return the textual response."""
+        url, headers, body = self._build_request(prompt, payload)
+        try:
+            response = self._get_client().post(url, headers=headers, content=dumps(body))
+        except httpx.HTTPError as exc:
+            raise ClaudeMessagesError(f"无法访问 Claude API: {exc}", retryable=True) from exc
+        return self._parse_response(response)
+
+    async def acall(self, prompt: str, payload: Dict) -> str:
+        """Invoke the Claude API without blocking the event loop."""
+        url, headers, body = self._build_request(prompt, payload)
+        try:
+            response = await self._get_async_client().post(
+                url, headers=headers, content=dumps(body)
+            )
+        except httpx.HTTPError as exc:
+            raise ClaudeMessagesError(f"无法访问 Claude API: {exc}", retryable=True) from exc
+        return self._parse_response(response)
+
+    async def astream(self, prompt: str, payload: Dict) -> AsyncIterator[str]:
+        """Invoke the Claude API with ``stream: true`` and yield text deltas."""
+        url, headers, body = self._build_request(prompt, payload)
+        body["stream"] = True
+        headers["Accept"] = "text/event-stream"
+        received = False
+        try:
+            async with self._get_async_client().stream(
+                "POST", url, headers=headers, content=dumps(body)
+            ) as response:
+                if response.status_code >= 400:
+                    detail = (await response.aread()).decode("utf-8", errors="replace")
+                    raise _status_error(response, detail)
+                async for line in response.aiter_lines():
+                    text = self._parse_stream_line(line)
+                    if text:
+                        received = True
+                        yield text
+        except httpx.HTTPError as exc:
+            raise ClaudeMessagesError(f"无法访问 Claude API: {exc}", retryable=True) from exc
+        if not received:
+            raise ClaudeMessagesError("Claude API 返回内容为空。")
+
+    def _parse_stream_line(self, line: str) -> Optional[str]:
+        """Return the text delta carried by one SSE ``data:`` line, if any.
+
+        Usage arrives split across ``message_start`` (input and cache
+        tokens) and ``message_delta`` (output tokens); both are recorded.
+        """
+        if not line.startswith("data:"):
+            return None
+        try:
+            event = loads(line[5:].strip())
+        except ValueError:
+            return None
+        if not isinstance(event, dict):
+            return None
+        if event.get("type") == "error":
+            error = event.get("error") or {}
+            raise ClaudeMessagesError(
+                f"Claude API 流式响应出错: {error.get('message', error)}",
+                retryable=error.get("type") in ("overloaded_error", "api_error", "rate_limit_error"),
+            )
+        if event.get("type") == "message_start":
+            usage = (event.get("message") or {}).get("usage")
+            self.usage.calls += 1
+            self.usage.record(usage)
+            observe_usage(self._model, usage, INPUT_USAGE_FIELDS)
+            return None
+        if event.get("type") == "message_delta":
+            self.usage.record(event.get("usage"))
+            observe_usage(self._model, event.get("usage"), ("output_tokens",))
+            return None
+        if event.get("type") != "content_block_delta":
+            return None
+        delta = event.get("delta") or {}
+        if delta.get("type") == "text_delta" and isinstance(delta.get("text"), str):
+            return delta["text"]
+        return None
+
+    def _build_request(self, prompt: str, payload: Dict) -> Tuple[str, Dict[str, str], Dict]:
         body = {
             "model": self._model,
             "max_tokens": self._max_output_tokens,
             "temperature": self._temperature,
-            "system": prompt,
-            "messages": [
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": json.dumps(payload, ensure_ascii=False),
-                        }
-                    ],
-                }
-            ],
+            "system": self._system_blocks(prompt),
+            "messages": [{"role": "user", "content": self._user_blocks(payload)}],
         }
         headers = {
             "Content-Type": "application/json",
             "x-api-key": self._api_key,
             "anthropic-version": "2023-06-01",
         }
-        url = f"{self._base_url}/v1/messages"
-        try:
-            response = httpx.post(
-                url,
-                headers=headers,
-                json=body,
-                timeout=self._timeout,
-            )
-        except httpx.HTTPError as exc:
-            raise ClaudeMessagesError(f"无法访问 Claude API: {exc}") from exc
+        return f"{self._base_url}/v1/messages", headers, body
+
+    def _system_blocks(self, prompt: str) -> Union[str, List[Dict]]:
+        if not self._prompt_cache:
+            return prompt
+        return [{"type": "text", "text": prompt, "cache_control": {"type": "ephemeral"}}]
+
+    def _user_blocks(self, payload: Dict) -> List[Dict]:
+        stable_keys = [key for key in self._cacheable_payload_keys if key in payload]
+        if not self._prompt_cache or not stable_keys:
+            text = payload.json if isinstance(payload, EncodedPayload) else dumps_str(payload)
+            return [{"type": "text", "text": text}]
+        stable = {key: payload[key] for key in stable_keys}
+        rest = {key: value for key, value in payload.items() if key not in stable}
+        blocks: List[Dict] = [
+            {
+                "type": "text",
+                "text": dumps_str(stable, sort_keys=True),
+                "cache_control": {"type": "ephemeral"},
+            }
+        ]
+        if rest:
+            blocks.append({"type": "text", "text": dumps_str(rest)})
+        return blocks
 
+    def _parse_response(self, response: httpx.Response) -> str:
         if response.status_code >= 400:
-            raise ClaudeMessagesError(
-                f"Claude API 返回错误状态码 {response.status_code}: {response.text}"
-            )
+            raise _status_error(response, response.text)
         try:
-            data = response.json()
+            data = loads(response.content)
         except ValueError as exc:
             raise ClaudeMessagesError("Claude API 返回值不是合法 JSON。") from exc
+        self.usage.calls += 1
+        self.usage.record(data.get("usage"))
+        observe_usage(self._model, data.get("usage"), (*INPUT_USAGE_FIELDS, "output_tokens"))
         content = self._extract_text(data.get("content", []))
         if not content:
             raise ClaudeMessagesError("Claude API 返回内容为空。")
@@ -113,3 +446,39 @@ class ClaudeMessagesCallable:
                     texts.append(text)
         return "".join(texts)
 
+
+def as_async_llm(llm_call: Union[LLMCallable, AsyncLLMCallable]) -> AsyncLLMCallable:
+    """Adapt any LLM callable to the async contract.
+
+    Objects exposing ``acall`` use it directly, coroutine functions pass
+    through, and plain sync callables run in a worker thread so they never
+    block the event loop.
+    """
+    acall = getattr(llm_call, "acall", None)
+    if acall is not None:
+        return acall
+    if inspect.iscoroutinefunction(llm_call) or inspect.iscoroutinefunction(
+        getattr(llm_call, "__call__", None)
+    ):
+        return llm_call  # type: ignore[return-value]
+
+    async def call_in_thread(prompt: str, payload: Dict) -> str:
+        return await asyncio.to_thread(llm_call, prompt, payload)
+
+    return call_in_thread
+
+
+def as_streaming_llm(llm_call: Union[LLMCallable, AsyncLLMCallable]) -> StreamingLLMCallable:
+    """Adapt any LLM callable to yield text chunks.
+
+    Callables without native streaming yield their whole response once.
+    """
+    astream = getattr(llm_call, "astream", None)
+    if astream is not None:
+        return astream
+    call = as_async_llm(llm_call)
+
+    async def stream_once(prompt: str, payload: Dict) -> AsyncIterator[str]:
+        yield await call(prompt, payload)
+
+    return stream_once
@@ -1,22 +1,24 @@
 from __future__ import annotations
 
-import json
+import asyncio
 import logging
-from typing import Callable, Dict, Tuple
-
-from pydantic import ValidationError
+from typing import Dict, Optional, Tuple, Union
 
 from ..models import RoutingContext, RoutingDecision
-from ..prompts import load_prompt
+from ..prompts import PromptRegistry, PromptVersion, default_registry
+from .cache import CacheBackend, canonical_json, content_hash
+from .compaction import META_ROUTER, ContextCompactor
+from .decision_parser import META_PARSE, DecisionParseError, loads_decision, parse_decision
+from .llm_client import AsyncLLMCallable, LLMCallable, as_async_llm
+from .observability import PROMPT_SELECTIONS, log_payload
+from .scheduler import META, call_kind
+from .serialization import encoded_payload
 
 
 class MetaRouterResponseError(RuntimeError):
     """Raised when the元调度者返回的数据无效。"""
 
 
-LLMCallable = Callable[[str, Dict], str]
-
-
 LOGGER = logging.getLogger(__name__)
 if not LOGGER.handlers:
     handler = logging.StreamHandler()
@@ -28,65 +30,150 @@ LOGGER.setLevel(logging.INFO)
 LOGGER.propagate = False
 
 
+DECISION_KEY_FIELDS = (
+    "scripture",
+    "text",
+    "user_question",
+    "user_profile",
+    "spiritual_state",
+    "session_stage",
+    "history_summary",
+    "system_warnings",
+)
+
+
+class DecisionCache:
+    """Caches routing decisions keyed on the canonical meta-router input.
+
+    The key covers the routing-relevant subset of the payload the meta
+    router sees (``DECISION_KEY_FIELDS``), the prompt content hash and the
+    model name, so a prompt edit or model switch never serves stale routes.
+    """
+
+    def __init__(self, backend: CacheBackend, *, ttl_seconds: Optional[float] = None) -> None:
+        self.backend = backend
+        self._ttl = ttl_seconds
+
+    @property
+    def stats(self):
+        return self.backend.stats
+
+    @staticmethod
+    def key(payload: Dict, prompt_hash: str, model_name: str) -> str:
+        subset = {field: payload.get(field) for field in DECISION_KEY_FIELDS}
+        return "decision:" + content_hash(canonical_json(subset), prompt_hash, model_name)
+
+    async def get(self, key: str) -> Optional[RoutingDecision]:
+        if self.backend.blocking_io:
+            raw = await asyncio.to_thread(self.backend.get, key)
+        else:
+            raw = self.backend.get(key)
+        if raw is None:
+            return None
+        try:
+            return loads_decision(raw)
+        except DecisionParseError:
+            LOGGER.warning("Discarding undecodable cached decision %s", key)
+            return None
+
+    async def put(self, key: str, decision: RoutingDecision) -> None:
+        raw = decision.json(ensure_ascii=False)
+        if self.backend.blocking_io:
+            await asyncio.to_thread(self.backend.set, key, raw, self._ttl)
+        else:
+            self.backend.set(key, raw, self._ttl)
+
+
 class MetaRouterClient:
-    """Encapsulate interaction with the meta router prompt."""
+    """Encapsulate interaction with the meta router prompt.
 
-    def __init__(self, llm_call: LLMCallable, *, prompt_name: str = "meta_router") -> None:
-        self._llm_call = llm_call
-        self._prompt_template = load_prompt(prompt_name)
+    A response that cannot be parsed gets one short repair call
+    (``repair_prompt_name``) that completes a truncated object or fixes the
+    format, instead of failing the request over to the fallback.
+    """
+
+    def __init__(
+        self,
+        llm_call: Union[LLMCallable, AsyncLLMCallable],
+        *,
+        prompt_name: str = "meta_router",
+        decision_cache: Optional[DecisionCache] = None,
+        model_name: Optional[str] = None,
+        compactor: Optional[ContextCompactor] = None,
+        prompts: Optional[PromptRegistry] = None,
+        repair_llm_call: Optional[Union[LLMCallable, AsyncLLMCallable]] = None,
+        repair_prompt_name: Optional[str] = "meta_router_repair",
+    ) -> None:
+        self._llm_call = as_async_llm(llm_call)
+        self._repair_call = (
+            as_async_llm(repair_llm_call) if repair_llm_call is not None else self._llm_call
+        )
+        self._prompts = prompts or default_registry()
+        self._prompt_name = prompt_name
+        self._repair_prompt_name = repair_prompt_name
+        self._prompts.get(prompt_name)  # fail at startup if the file is missing
+        if repair_prompt_name is not None:
+            self._prompts.get(repair_prompt_name)
+        self._model_name = model_name or getattr(llm_call, "model", "")
         self._logger = LOGGER
+        self.decision_cache = decision_cache
+        self._compactor = compactor
 
-    def _prepare_payload(self, context: RoutingContext) -> Tuple[str, Dict]:
+    def _prepare_payload(self, context: RoutingContext) -> Tuple[PromptVersion, Dict]:
         user_payload: Dict = context.raw_payload or context.dict(exclude_none=True)
         warnings = context.requires_attention()
         if warnings:
             user_payload = {**user_payload, "system_warnings": warnings}
-        return self._prompt_template, user_payload
+        if self._compactor is not None:
+            user_payload, _ = self._compactor.compact(META_ROUTER, user_payload)
+        prompt = self._prompts.select(self._prompt_name)
+        PROMPT_SELECTIONS.inc(prompt=prompt.label)
+        return prompt, encoded_payload(user_payload)
 
-    def route(self, context: RoutingContext) -> RoutingDecision:
+    async def route(self, context: RoutingContext) -> RoutingDecision:
         prompt, payload = self._prepare_payload(context)
-        # self._logger.info("MetaRouter prompt: %s", prompt)
-        try:
-            serialized_payload = json.dumps(payload, ensure_ascii=False)
-        except (TypeError, ValueError):
-            serialized_payload = str(payload)
-        self._logger.info("MetaRouter payload: %s", serialized_payload)
-        raw = self._llm_call(prompt, payload)
-        self._logger.info("MetaRouter raw response: %s", raw)
-        normalized = self._normalize_response(raw)
-        if normalized != raw:
-            self._logger.info("MetaRouter normalized response: %s", normalized)
+        cache = self.decision_cache
+        cache_key: Optional[str] = None
+        if cache is not None:
+            cache_key = cache.key(payload, prompt.hash, self._model_name)
+            cached = await cache.get(cache_key)
+            if cached is not None:
+                self._logger.info("MetaRouter decision served from cache")
+                return cached
+        log_payload(self._logger, "MetaRouter payload", payload)
+        with call_kind(META):
+            raw = await self._llm_call(prompt.text, payload)
+        log_payload(self._logger, "MetaRouter raw response", raw)
         try:
-            response = json.loads(normalized)
-        except json.JSONDecodeError as exc:
-            preview_source = normalized or raw
-            preview = preview_source if len(preview_source) <= 500 else f"{preview_source[:500]}…"
-            message = f"MetaRouter 返回值不是合法 JSON。原始响应：{preview}"
-            raise MetaRouterResponseError(message) from exc
-        try:
-            decision = RoutingDecision.parse_obj(response)
-        except ValidationError as exc:
-            raise MetaRouterResponseError("MetaRouter 返回值未通过数据模型校验。") from exc
+            decision = parse_decision(raw)
+        except DecisionParseError as error:
+            decision = await self._repair(raw, error)
+        if cache is not None and cache_key is not None:
+            await cache.put(cache_key, decision)
         return decision
 
-    @staticmethod
-    def _normalize_response(raw: str) -> str:
-        if not raw:
-            return raw
-        text = raw.strip()
-        if text.startswith("```"):
-            text = text[3:]
-            text = text.lstrip()
-            if text.lower().startswith("json"):
-                # remove optional json language hint
-                newline_index = text.find("\n")
-                if newline_index != -1:
-                    text = text[newline_index + 1 :]
-                else:
-                    text = ""
-            end_fence = text.rfind("```")
-            if end_fence != -1:
-                text = text[:end_fence]
-        if text.endswith("```"):
-            text = text[: -3]
-        return text.strip()
+    async def _repair(self, raw: str, error: DecisionParseError) -> RoutingDecision:
+        """Ask for the missing continuation (or a corrected object) once."""
+        if self._repair_prompt_name is None:
+            META_PARSE.inc(outcome="failed")
+            raise MetaRouterResponseError(str(error)) from error
+        if error.partial is not None:
+            request: Dict = {"partial_response": error.partial}
+        else:
+            request = {"previous_response": raw[:4000], "problem": str(error)}
+        self._logger.warning("Repairing unparseable MetaRouter response: %s", error)
+        prompt = self._prompts.get(self._repair_prompt_name)
+        with call_kind(META):
+            fix = await self._repair_call(prompt.text, request)
+        candidates = [error.partial + fix, fix] if error.partial is not None else [fix]
+        last_error: DecisionParseError = error
+        for candidate in candidates:
+            try:
+                decision = parse_decision(candidate)
+            except DecisionParseError as exc:
+                last_error = exc
+                continue
+            META_PARSE.inc(outcome="repaired")
+            return decision
+        META_PARSE.inc(outcome="failed")
+        raise MetaRouterResponseError(str(error)) from last_error
@@ -0,0 +1,331 @@
+"""Process-wide metrics, stage timing and sampled payload logging.
+
+Metrics are kept in a small in-process registry rendered in the Prometheus
+text format by ``GET /metrics``. When ``opentelemetry-api`` is installed,
+every :func:`stage_timer` also opens a span; without an SDK configured those
+spans are no-ops.
+"""
+from __future__ import annotations
+
+import logging
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from .serialization import EncodedPayload, dumps_str
+
+try:  # optional dependency
+    from opentelemetry import trace as _otel_trace
+except ImportError:  # pragma: no cover - depends on the environment
+    _otel_trace = None
+
+LabelValues = Tuple[str, ...]
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+TOKEN_BUCKETS = (16, 64, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Mapping[str, str]) -> LabelValues:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"指标 {self.name} 需要标签: {', '.join(self.label_names)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._render_samples())
+        return lines
+
+    def _render_samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, label_names)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _render_samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, label_names)
+        self._buckets = tuple(sorted(buckets))
+        # per label set: bucket counts (non-cumulative, last slot is +Inf), sum, count
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect_left(self._buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = ([0] * (len(self._buckets) + 1), [0.0, 0.0])
+            entry[0][index] += 1
+            entry[1][0] += value
+            entry[1][1] += 1
+
+    def count(self, **labels: str) -> int:
+        entry = self._values.get(self._key(labels))
+        return int(entry[1][1]) if entry else 0
+
+    def _render_samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(
+                (key, (list(counts), list(totals))) for key, (counts, totals) in self._values.items()
+            )
+        lines: List[str] = []
+        for key, (counts, (total, count)) in items:
+            cumulative = 0
+            for bound, bucket_count in zip((*self._buckets, float("inf")), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.label_names, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {int(count)}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named metrics rendered together in the Prometheus text format."""
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, label_names))  # type: ignore[return-value]
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, label_names, buckets))  # type: ignore[return-value]
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "devolight_stage_seconds", "Latency of each routing stage.", ("stage", "role")
+)
+STAGE_ERRORS = REGISTRY.counter(
+    "devolight_stage_errors_total", "Routing stage failures by exception class.", ("stage", "error")
+)
+LLM_TOKENS = REGISTRY.histogram(
+    "devolight_llm_tokens", "Tokens per LLM call from the usage field.", ("model", "kind"), TOKEN_BUCKETS
+)
+LLM_COST = REGISTRY.counter(
+    "devolight_llm_cost_usd_total", "Estimated LLM spend from token usage and configured prices.", ("model",)
+)
+PROMPT_SELECTIONS = REGISTRY.counter(
+    "devolight_prompt_selections_total", "LLM calls per prompt file, variants included.", ("prompt",)
+)
+PAYLOADS_LOGGED = REGISTRY.counter(
+    "devolight_payload_logs_total", "Payload log lines actually written after sampling.", ()
+)
+
+_tracer = _otel_trace.get_tracer("devolight_router") if _otel_trace is not None else None
+
+
+@contextmanager
+def stage_timer(name: str, role: str = "") -> Iterator[None]:
+    """Time a routing stage, count its failures and open an OpenTelemetry span if available.
+
+    Only wrap code inside a single task; do not hold it across ``yield`` in
+    an async generator.
+    """
+    span = (
+        _tracer.start_as_current_span(f"devolight.{name}", attributes={"devolight.role": role})
+        if _tracer is not None
+        else nullcontext()
+    )
+    with span:
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception as exc:
+            STAGE_ERRORS.inc(stage=name, error=type(exc).__name__)
+            raise
+        finally:
+            STAGE_SECONDS.observe(time.perf_counter() - started, stage=name, role=role)
+
+
+# USD per million tokens; cache reads and writes use the published multipliers.
+_PRICES = {"input": 0.0, "output": 0.0}
+_CACHE_READ_MULTIPLIER = 0.1
+_CACHE_WRITE_MULTIPLIER = 1.25
+
+
+def configure_pricing(input_per_mtok: float = 0.0, output_per_mtok: float = 0.0) -> None:
+    _PRICES["input"] = input_per_mtok
+    _PRICES["output"] = output_per_mtok
+
+
+def observe_usage(model: str, usage: Optional[Dict], fields: Sequence[str]) -> None:
+    """Record per-call token histograms and estimated cost for the given usage fields."""
+    if not isinstance(usage, dict):
+        return
+    cost = 0.0
+    for field in fields:
+        value = usage.get(field)
+        if not isinstance(value, int):
+            continue
+        LLM_TOKENS.observe(value, model=model, kind=field.replace("_tokens", ""))
+        if field == "output_tokens":
+            cost += value * _PRICES["output"]
+        elif field == "cache_read_input_tokens":
+            cost += value * _PRICES["input"] * _CACHE_READ_MULTIPLIER
+        elif field == "cache_creation_input_tokens":
+            cost += value * _PRICES["input"] * _CACHE_WRITE_MULTIPLIER
+        else:
+            cost += value * _PRICES["input"]
+    if cost:
+        LLM_COST.inc(cost / 1_000_000, model=model)
+
+
+_PAYLOAD_LOGGING = {"sample_rate": 0.01, "redact": True}
+REDACTED_FIELDS = frozenset(
+    {"user_question", "user_profile", "spiritual_state", "history_summary", "text", "user_id"}
+)
+MAX_LOGGED_CHARS = 2000
+
+
+def configure_payload_logging(sample_rate: float = 0.01, redact: bool = True) -> None:
+    _PAYLOAD_LOGGING["sample_rate"] = max(0.0, min(1.0, sample_rate))
+    _PAYLOAD_LOGGING["redact"] = redact
+
+
+def _needs_redaction(value: Any) -> bool:
+    if isinstance(value, dict):
+        return any(
+            (key in REDACTED_FIELDS and item is not None) or _needs_redaction(item)
+            for key, item in value.items()
+        )
+    if isinstance(value, list):
+        return any(_needs_redaction(item) for item in value)
+    return False
+
+
+def _redact(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {
+            key: f"<redacted {len(item) if isinstance(item, str) else len(dumps_str(item))} chars>"
+            if key in REDACTED_FIELDS and item is not None
+            else _redact(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        return [_redact(item) for item in value]
+    return value
+
+
+def log_payload(logger: logging.Logger, message: str, payload: Any) -> None:
+    """Log a sampled, redacted and truncated copy of ``payload`` at INFO.
+
+    Nothing is serialized unless the line is actually written, so the
+    unsampled path costs one random draw. An already encoded payload with
+    nothing to redact is logged from its encoded text as is.
+    """
+    if random.random() >= _PAYLOAD_LOGGING["sample_rate"] or not logger.isEnabledFor(logging.INFO):
+        return
+    if _PAYLOAD_LOGGING["redact"] and _needs_redaction(payload):
+        payload = _redact(payload)
+    if isinstance(payload, str):
+        text = payload
+    elif isinstance(payload, EncodedPayload):
+        text = payload.json  # the same text the request body carries
+    else:
+        text = dumps_str(payload)
+    if len(text) > MAX_LOGGED_CHARS:
+        text = f"{text[:MAX_LOGGED_CHARS]}…"
+    PAYLOADS_LOGGED.inc()
+    logger.info("%s: %s", message, text)
+
+
+def render_stats(stats: Mapping[str, Any], prefix: str = "devolight") -> str:
+    """Flatten the numeric leaves of ``AppContainer.stats()`` into gauges."""
+    lines: List[str] = []
+
+    def walk(path: str, value: Any) -> None:
+        if isinstance(value, Mapping):
+            for key, item in value.items():
+                walk(f"{path}_{key}", item)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            name = "".join(char if char.isalnum() or char == "_" else "_" for char in path)
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {_format_value(value)}")
+
+    for key, value in stats.items():
+        walk(f"{prefix}_{key}", value)
+    return "\n".join(lines) + "\n" if lines else ""
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Callable, Dict, Optional
+
+
+class TokenBucket:
+    """Async token bucket refilled continuously at ``rate_per_minute``."""
+
+    def __init__(
+        self,
+        rate_per_minute: float,
+        capacity: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if rate_per_minute <= 0:
+            raise ValueError("rate_per_minute 必须为正数。")
+        self._rate = rate_per_minute / 60.0
+        self._capacity = capacity if capacity is not None else max(1.0, self._rate)
+        self._tokens = self._capacity
+        self._clock = clock
+        self._updated = clock()
+        self._lock = asyncio.Lock()
+
+    @property
+    def capacity(self) -> float:
+        return self._capacity
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+    def delay_for(self, amount: float = 1.0) -> float:
+        """Seconds until ``amount`` tokens are available, without consuming them."""
+        self._refill()
+        missing = min(amount, self._capacity) - self._tokens
+        return max(0.0, missing / self._rate)
+
+    def try_acquire(self, amount: float = 1.0) -> bool:
+        amount = min(amount, self._capacity)
+        self._refill()
+        if self._tokens >= amount:
+            self._tokens -= amount
+            return True
+        return False
+
+    async def acquire(self, amount: float = 1.0) -> None:
+        """Wait until ``amount`` tokens are available and consume them.
+
+        Requests larger than the bucket are clamped to its capacity so they
+        cannot wait forever.
+        """
+        async with self._lock:
+            while not self.try_acquire(amount):
+                await asyncio.sleep(self.delay_for(amount))
+
+
+class RateLimiterRegistry:
+    """One token bucket per key (e.g. per LLM API key)."""
+
+    def __init__(self, rate_per_minute: float) -> None:
+        self._rate = rate_per_minute
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    def bucket(self, key: str) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self._rate)
+        return bucket
+
+    async def acquire(self, key: str, amount: float = 1.0) -> None:
+        await self.bucket(key).acquire(amount)
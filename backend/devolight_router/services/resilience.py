@@ -0,0 +1,273 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Optional, Union
+
+from .llm_client import (
+    AsyncLLMCallable,
+    ClaudeMessagesError,
+    LLMCallable,
+    as_async_llm,
+    as_streaming_llm,
+)
+
+LOGGER = logging.getLogger(__name__)
+if not LOGGER.handlers:
+    handler = logging.StreamHandler()
+    handler.setLevel(logging.INFO)
+    formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+    handler.setFormatter(formatter)
+    LOGGER.addHandler(handler)
+LOGGER.setLevel(logging.INFO)
+LOGGER.propagate = False
+
+
+class CircuitOpenError(ClaudeMessagesError):
+    """Raised without calling upstream while its circuit breaker is open."""
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """Jittered exponential backoff that honors upstream ``retry-after``."""
+
+    max_attempts: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 8.0
+    max_retry_after: float = 30.0
+
+    def delay_for(self, attempt: int, error: ClaudeMessagesError) -> Optional[float]:
+        """Seconds to wait before retry number ``attempt`` (1-based), or None to give up."""
+        if attempt >= self.max_attempts or not error.retryable:
+            return None
+        if error.retry_after is not None:
+            return error.retry_after if error.retry_after <= self.max_retry_after else None
+        ceiling = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return random.uniform(0.0, ceiling)
+
+
+class CircuitBreaker:
+    """Fails fast after consecutive retryable failures until ``reset_timeout`` passes.
+
+    After the timeout one probe call is let through (half-open); its outcome
+    closes or re-opens the circuit. A probe that ends without an upstream
+    verdict (cancelled, shed by the scheduler) is released so the next call
+    probes instead.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._clock = clock
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if self._clock() - self._opened_at >= self._reset_timeout:
+            return "half_open"
+        return "open"
+
+    def before_call(self) -> bool:
+        """Admit a call; True when it is the half-open probe."""
+        state = self.state
+        if state == "open" or (state == "half_open" and self._probing):
+            raise CircuitOpenError("Claude API 熔断中，暂停调用上游。")
+        if state == "half_open":
+            self._probing = True
+            return True
+        return False
+
+    def release_probe(self) -> None:
+        self._probing = False
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    def record_failure(self, error: BaseException) -> None:
+        if isinstance(error, ClaudeMessagesError) and not error.retryable:
+            self._probing = False
+            return
+        self._failures += 1
+        if self._probing or self._failures >= self._failure_threshold:
+            self._opened_at = self._clock()
+        self._probing = False
+
+
+class CircuitBreakerRegistry:
+    """One breaker per upstream (base URL + model)."""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0) -> None:
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def get(self, base_url: str, model: str) -> CircuitBreaker:
+        key = f"{base_url}|{model}"
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            breaker = self._breakers[key] = CircuitBreaker(
+                self._failure_threshold, self._reset_timeout
+            )
+        return breaker
+
+    def states(self) -> Dict[str, str]:
+        return {key: breaker.state for key, breaker in self._breakers.items()}
+
+
+class _Delegating:
+    """Forward attributes such as ``model``, ``usage`` and ``aclose`` to the wrapped callable."""
+
+    def __init__(self, inner: Any) -> None:
+        self._inner = inner
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._inner, name)
+
+
+class ResilientLLMCallable(_Delegating):
+    """Wraps an LLM callable with retries and a circuit breaker."""
+
+    def __init__(
+        self,
+        inner: Union[LLMCallable, AsyncLLMCallable],
+        *,
+        retry_policy: Optional[RetryPolicy] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        sleep: Callable[[float], Any] = asyncio.sleep,
+    ) -> None:
+        super().__init__(inner)
+        self._call = as_async_llm(inner)
+        self._stream = as_streaming_llm(inner)
+        self._retry_policy = retry_policy or RetryPolicy()
+        self._breaker = breaker or CircuitBreaker()
+        self._sleep = sleep
+        self.retries = 0
+
+    async def acall(self, prompt: str, payload: Dict) -> str:
+        attempt = 0
+        while True:
+            attempt += 1
+            probe = self._breaker.before_call()
+            try:
+                result = await self._call(prompt, payload)
+            except ClaudeMessagesError as error:
+                self._breaker.record_failure(error)
+                delay = self._retry_policy.delay_for(attempt, error)
+                if delay is None:
+                    raise
+                self.retries += 1
+                LOGGER.warning("LLM call failed (attempt %d), retrying in %.2fs: %s", attempt, delay, error)
+                await self._sleep(delay)
+                continue
+            except BaseException:
+                if probe:
+                    self._breaker.release_probe()
+                raise
+            self._breaker.record_success()
+            return result
+
+    async def astream(self, prompt: str, payload: Dict) -> AsyncIterator[str]:
+        """Stream with the breaker; retries only happen before the first chunk."""
+        attempt = 0
+        while True:
+            attempt += 1
+            probe = self._breaker.before_call()
+            emitted = False
+            try:
+                async for chunk in self._stream(prompt, payload):
+                    emitted = True
+                    yield chunk
+            except ClaudeMessagesError as error:
+                self._breaker.record_failure(error)
+                delay = None if emitted else self._retry_policy.delay_for(attempt, error)
+                if delay is None:
+                    raise
+                self.retries += 1
+                await self._sleep(delay)
+                continue
+            except BaseException:  # includes GeneratorExit when the consumer stops early
+                if probe:
+                    self._breaker.release_probe()
+                raise
+            self._breaker.record_success()
+            return
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20) -> None:
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._min_samples = min_samples
+
+    def observe(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        if len(self._samples) < self._min_samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(len(ordered) * fraction))
+        return ordered[index]
+
+
+class HedgedLLMCallable(_Delegating):
+    """Sends a second identical request when the first exceeds the p95 latency.
+
+    Whichever attempt succeeds first wins and the other is cancelled. Used
+    for the meta-router call, which gates every request.
+    """
+
+    def __init__(
+        self,
+        inner: Union[LLMCallable, AsyncLLMCallable],
+        *,
+        tracker: Optional[LatencyTracker] = None,
+        percentile: float = 0.95,
+    ) -> None:
+        super().__init__(inner)
+        self._call = as_async_llm(inner)
+        self._tracker = tracker or LatencyTracker()
+        self._percentile = percentile
+        self.hedges = 0
+
+    async def acall(self, prompt: str, payload: Dict) -> str:
+        started = time.perf_counter()
+        threshold = self._tracker.percentile(self._percentile)
+        primary = asyncio.ensure_future(self._call(prompt, payload))
+        tasks = {primary}
+        try:
+            if threshold is not None:
+                done, _ = await asyncio.wait(tasks, timeout=threshold)
+                if not done:
+                    self.hedges += 1
+                    LOGGER.info("Hedging slow LLM call after %.2fs", threshold)
+                    tasks.add(asyncio.ensure_future(self._call(prompt, payload)))
+            error: Optional[BaseException] = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        self._tracker.observe(time.perf_counter() - started)
+                        return task.result()
+                    error = task.exception()
+            assert error is not None
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from dataclasses import dataclass
+from typing import Dict, Mapping, Optional, Tuple
+
+from ..models import RoutingContext, SelectedRole
+from .cache import CacheBackend, canonical_json, content_hash
+
+LOGGER = logging.getLogger(__name__)
+if not LOGGER.handlers:
+    handler = logging.StreamHandler()
+    handler.setLevel(logging.INFO)
+    formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+    handler.setFormatter(formatter)
+    LOGGER.addHandler(handler)
+LOGGER.setLevel(logging.INFO)
+LOGGER.propagate = False
+
+
+SCRIPTURE_FIELDS = frozenset({"scripture", "text"})
+ROLE_FIELDS = frozenset({"handoff_note"})  # read from the SelectedRole, not the context
+# key fields that say nothing about who is asking
+SHARED_FIELDS = SCRIPTURE_FIELDS | ROLE_FIELDS | {"user_question"}
+
+
+@dataclass(frozen=True)
+class RoleCachePolicy:
+    """Which ``RoutingContext`` (or ``handoff_note``) fields a role's output depends on.
+
+    Outputs are shared between every request that agrees on ``key_fields``,
+    so only list fields that actually change the answer.
+    """
+
+    key_fields: Tuple[str, ...]
+    ttl_seconds: Optional[float] = None
+
+    @property
+    def shared(self) -> bool:
+        """True when no profile field is in the key, so a passage-only request can be precomputed."""
+        return set(self.key_fields) <= SHARED_FIELDS
+
+
+DEFAULT_ROLE_CACHE_POLICIES: Dict[str, RoleCachePolicy] = {
+    # answers the user's question and follows the hand-off from earlier roles
+    "AntiochTeacher": RoleCachePolicy(("scripture", "text", "user_question", "handoff_note")),
+    "LukeScribe": RoleCachePolicy(("scripture", "text")),
+    "MarthaMentor": RoleCachePolicy(
+        ("scripture", "text", "user_question", "user_profile", "spiritual_state"),
+        ttl_seconds=3600.0,
+    ),
+}
+
+
+def load_role_cache_policies(path: str) -> Dict[str, RoleCachePolicy]:
+    """Read policies from JSON; ``null`` disables caching for a role.
+
+    Example: ``{"LukeScribe": {"key_fields": ["scripture"]}, "MarthaMentor": null}``.
+    Roles missing from the file keep their default policy.
+    """
+    with open(path, encoding="utf-8") as handle:
+        raw = json.load(handle)
+    if not isinstance(raw, dict):
+        raise ValueError("角色缓存策略必须是 JSON 对象。")
+    policies = dict(DEFAULT_ROLE_CACHE_POLICIES)
+    for role_name, spec in raw.items():
+        if spec is None:
+            policies.pop(role_name, None)
+            continue
+        fields = spec.get("key_fields") if isinstance(spec, dict) else None
+        if not fields:
+            raise ValueError(f"角色 {role_name} 的缓存策略缺少 key_fields。")
+        unknown = [
+            name for name in fields if name not in RoutingContext.__fields__ and name not in ROLE_FIELDS
+        ]
+        if unknown:
+            raise ValueError(f"角色 {role_name} 的缓存字段未知: {', '.join(unknown)}")
+        policies[role_name] = RoleCachePolicy(tuple(fields), spec.get("ttl_seconds"))
+    return policies
+
+
+class RoleOutputCache:
+    """Caches role outputs keyed on each role's policy fields.
+
+    The key also covers the role prompt hash and model name. Requests
+    without a scripture are never cached.
+
+    With ``keep_stale`` every output of a shared (passage-only) role is also
+    kept as the role's last known output for that passage, independent of
+    prompt version and model and with its own ``stale_ttl_seconds``. The
+    degradation policy serves it when a fresh call fails.
+    """
+
+    def __init__(
+        self,
+        backend: CacheBackend,
+        policies: Optional[Mapping[str, RoleCachePolicy]] = None,
+        *,
+        ttl_seconds: Optional[float] = None,
+        keep_stale: bool = False,
+        stale_ttl_seconds: Optional[float] = None,
+    ) -> None:
+        self.backend = backend
+        self.policies: Dict[str, RoleCachePolicy] = dict(
+            DEFAULT_ROLE_CACHE_POLICIES if policies is None else policies
+        )
+        self._ttl = ttl_seconds
+        self._keep_stale = keep_stale
+        self._stale_ttl = stale_ttl_seconds
+
+    @property
+    def stats(self):
+        return self.backend.stats
+
+    def key(
+        self, role: SelectedRole, context: RoutingContext, prompt_hash: str, model_name: str
+    ) -> Optional[str]:
+        policy = self.policies.get(role.name)
+        if policy is None or not context.scripture:
+            return None
+        subset = canonical_json(self._subset(policy, role, context))
+        return f"role:{role.name}:" + content_hash(subset, prompt_hash, model_name)
+
+    def stale_key(self, role: SelectedRole, context: RoutingContext) -> Optional[str]:
+        """Key of the last known output; personalised roles have none."""
+        policy = self.policies.get(role.name)
+        if not self._keep_stale or policy is None or not policy.shared or not context.scripture:
+            return None
+        subset = canonical_json(self._subset(policy, role, context))
+        return f"stale:{role.name}:" + content_hash(subset)
+
+    @staticmethod
+    def _subset(policy: RoleCachePolicy, role: SelectedRole, context: RoutingContext) -> Dict:
+        subset = {}
+        for field in policy.key_fields:
+            value = getattr(role if field in ROLE_FIELDS else context, field, None)
+            subset[field] = value.dict(exclude_none=True) if hasattr(value, "dict") else value
+        return subset
+
+    async def get(self, key: str) -> Optional[str]:
+        if self.backend.blocking_io:
+            return await asyncio.to_thread(self.backend.get, key)
+        return self.backend.get(key)
+
+    async def get_stale(self, role: SelectedRole, context: RoutingContext) -> Optional[str]:
+        key = self.stale_key(role, context)
+        return await self.get(key) if key is not None else None
+
+    async def put(
+        self, key: str, role_name: str, content: str, *, stale_key: Optional[str] = None
+    ) -> None:
+        """Store an output; with ``stale_key`` it also becomes the role's last known output."""
+        if not content:
+            return
+        policy = self.policies.get(role_name)
+        ttl = policy.ttl_seconds if policy is not None and policy.ttl_seconds else self._ttl
+        await self._set(key, content, ttl)
+        if stale_key is not None:
+            await self._set(stale_key, content, self._stale_ttl)
+
+    async def _set(self, key: str, content: str, ttl: Optional[float]) -> None:
+        if self.backend.blocking_io:
+            await asyncio.to_thread(self.backend.set, key, content, ttl)
+        else:
+            self.backend.set(key, content, ttl)
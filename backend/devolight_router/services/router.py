@@ -1,10 +1,27 @@
 from __future__ import annotations
 
+import asyncio
+import inspect
 import logging
+import time
+from contextlib import asynccontextmanager
 from dataclasses import dataclass
-from typing import Callable, Dict, List, Optional
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+    Union,
+)
 
 from ..models import (
+    ROLE_ALIASES,
     RoleCallRecord,
     RoutingContext,
     RoutingDecision,
@@ -12,9 +29,22 @@ from ..models import (
     SelectedRole,
     SessionState,
 )
+from ..prompts import prompt_assignment
+from .cache import canonical_json, content_hash
+from .fast_path import FastPathRouter
+from .llm_client import ClaudeMessagesError
 from .meta_client import MetaRouterClient, MetaRouterResponseError
+from .observability import stage_timer
+from .scheduler import SchedulerOverloadedError
+from .sessions import SessionRepository
+
+if TYPE_CHECKING:
+    from .degradation import DegradationPolicy
+    from .speculation import RoleSpeculator
+    from .summarizer import SessionSummarizer
 
-RoleExecutor = Callable[[RoutingContext, SelectedRole], str]
+RoleExecutor = Callable[[RoutingContext, SelectedRole], Awaitable[str]]
+SyncRoleExecutor = Callable[[RoutingContext, SelectedRole], str]
 
 LOGGER = logging.getLogger(__name__)
 if not LOGGER.handlers:
@@ -31,6 +61,31 @@ LOGGER.propagate = False
 class RoleExecutionResult:
     role_name: str
     content: str
+    error: Optional[str] = None
+    retry_after: Optional[float] = None  # set when the LLM scheduler shed the call
+    freshness: str = "fresh"  # "stale" or "stub" when served by the degradation policy
+    degraded_reason: Optional[str] = None  # the failure a degraded output stands in for
+
+
+@dataclass
+class RoleStreamEvent:
+    event: str
+    role_name: str
+    index: int
+    text: str = ""
+    freshness: str = "fresh"
+    degraded_reason: Optional[str] = None
+
+
+@dataclass
+class _RoleFinished:
+    index: int
+
+
+@dataclass
+class RouterEvent:
+    event: str
+    data: Dict[str, Any]
 
 
 @dataclass
@@ -61,28 +116,316 @@ class ContextBuilder:
         return context
 
 
+class ExecutionPlanner:
+    """Groups selected roles into stages; roles within a stage run concurrently.
+
+    ``sequence`` mode is the fixed devotional hand-off chain, so every role
+    gets its own stage. In other modes a role only waits for an earlier role
+    whose ``handoff_note`` names it.
+    """
+
+    def plan(self, decision: RoutingDecision) -> List[List[int]]:
+        roles = decision.selected_roles
+        if decision.mode == RoutingMode.SEQUENCE:
+            return [[index] for index in range(len(roles))]
+        stages = [0] * len(roles)
+        for index, role in enumerate(roles):
+            aliases = ROLE_ALIASES.get(role.name, (role.name,))
+            for earlier in range(index):
+                note = roles[earlier].handoff_note
+                if any(alias in note for alias in aliases):
+                    stages[index] = max(stages[index], stages[earlier] + 1)
+        grouped: Dict[int, List[int]] = {}
+        for index, stage in enumerate(stages):
+            grouped.setdefault(stage, []).append(index)
+        return [grouped[stage] for stage in sorted(grouped)]
+
+
 class ExecutionOrchestrator:
-    """Executes the selected roles sequentially."""
-
-    def __init__(self, role_callers: Optional[Dict[str, RoleExecutor]] = None) -> None:
-        self._role_callers = role_callers or {}
-
-    def register(self, role_name: str, executor: RoleExecutor) -> None:
-        self._role_callers[role_name] = executor
-
-    def run(self, context: RoutingContext, decision: RoutingDecision) -> List[RoleExecutionResult]:
-        results: List[RoleExecutionResult] = []
-        role_names = [selected.name for selected in decision.selected_roles]
-        if role_names:
-            LOGGER.info("Executing roles in order: %s", " -> ".join(role_names))
-        for selected in decision.selected_roles:
-            executor = self._role_callers.get(selected.name)
-            if executor is None:
+    """Executes the selected roles stage by stage, in parallel within a stage.
+
+    A role gets at most ``role_timeout`` seconds and never runs past the
+    request deadline given to :meth:`run`. Late or failed roles are handed
+    to ``degradation`` when one is configured.
+    """
+
+    def __init__(
+        self,
+        role_callers: Optional[Dict[str, Union[RoleExecutor, SyncRoleExecutor]]] = None,
+        *,
+        max_concurrency: int = 4,
+        planner: Optional[ExecutionPlanner] = None,
+        role_timeout: Optional[float] = None,
+        degradation: Optional["DegradationPolicy"] = None,
+    ) -> None:
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency 必须至少为 1。")
+        self._role_callers: Dict[str, RoleExecutor] = {}
+        for role_name, executor in (role_callers or {}).items():
+            self.register(role_name, executor)
+        self._max_concurrency = max_concurrency
+        self._planner = planner or ExecutionPlanner()
+        self._role_timeout = role_timeout
+        self._degradation = degradation
+
+    def register(self, role_name: str, executor: Union[RoleExecutor, SyncRoleExecutor]) -> None:
+        self._role_callers[role_name] = _as_async_executor(executor)
+
+    def has_role(self, role_name: str) -> bool:
+        return role_name in self._role_callers
+
+    def _plan(self, decision: RoutingDecision) -> List[List[int]]:
+        roles = decision.selected_roles
+        for selected in roles:
+            if selected.name not in self._role_callers:
                 raise KeyError(f"未注册角色执行器: {selected.name}")
-            LOGGER.info("Running role %s", selected.name)
-            content = executor(context, selected)
-            results.append(RoleExecutionResult(role_name=selected.name, content=content))
-        return results
+        stages = self._planner.plan(decision)
+        if stages:
+            LOGGER.info(
+                "Executing roles in stages: %s",
+                " -> ".join("+".join(roles[index].name for index in stage) for stage in stages),
+            )
+        return stages
+
+    async def run_role(self, context: RoutingContext, selected: SelectedRole) -> RoleExecutionResult:
+        """Execute one role, turning its failure into an error result."""
+        if selected.name not in self._role_callers:
+            raise KeyError(f"未注册角色执行器: {selected.name}")
+        LOGGER.info("Running role %s", selected.name)
+        try:
+            with stage_timer("role", role=selected.name):
+                content = await self._role_callers[selected.name](context, selected)
+        except SchedulerOverloadedError as exc:
+            LOGGER.warning("Role %s shed: %s", selected.name, exc)
+            return RoleExecutionResult(selected.name, "", error=str(exc), retry_after=exc.retry_after)
+        except Exception as exc:  # noqa: BLE001 - partial results are kept
+            LOGGER.warning("Role %s failed: %s", selected.name, exc)
+            return RoleExecutionResult(selected.name, "", error=str(exc))
+        return RoleExecutionResult(selected.name, content)
+
+    async def run(
+        self,
+        context: RoutingContext,
+        decision: RoutingDecision,
+        precomputed: Optional[Mapping[int, Awaitable[RoleExecutionResult]]] = None,
+        deadline: Optional[float] = None,
+    ) -> List[RoleExecutionResult]:
+        """Run the decision's roles; ``precomputed`` supplies already started results by index.
+
+        ``deadline`` is a :func:`time.monotonic` instant shared by all stages.
+        """
+        roles = decision.selected_roles
+        stages = self._plan(decision)
+        results: List[Optional[RoleExecutionResult]] = [None] * len(roles)
+        semaphore = asyncio.Semaphore(self._max_concurrency)
+        precomputed = precomputed or {}
+
+        async def run_role(index: int) -> None:
+            selected = roles[index]
+            if index in precomputed:
+                results[index] = await self._bounded(context, selected, precomputed[index], deadline)
+                return
+            async with semaphore:
+                results[index] = await self._bounded(
+                    context, selected, self.run_role(context, selected), deadline
+                )
+
+        for stage in stages:
+            tasks = [asyncio.ensure_future(run_role(index)) for index in stage]
+            try:
+                await asyncio.gather(*tasks)
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                raise
+        return [result for result in results if result is not None]
+
+    def _budget(self, deadline: Optional[float]) -> Optional[float]:
+        budgets = [] if self._role_timeout is None else [self._role_timeout]
+        if deadline is not None:
+            budgets.append(max(0.0, deadline - time.monotonic()))
+        return min(budgets) if budgets else None
+
+    async def _bounded(
+        self,
+        context: RoutingContext,
+        selected: SelectedRole,
+        pending: Awaitable[RoleExecutionResult],
+        deadline: Optional[float],
+    ) -> RoleExecutionResult:
+        """Await a role result within its time budget, degrading it when late or failed."""
+        budget = self._budget(deadline)
+        if budget is None:
+            result = await pending
+        else:
+            call = asyncio.ensure_future(pending)
+            try:
+                result = await asyncio.wait_for(asyncio.shield(call), budget)
+            except asyncio.TimeoutError:
+                LOGGER.warning("Role %s missed its %.1fs budget", selected.name, budget)
+                if self._degradation is not None:
+                    self._degradation.keep_refreshing(call)
+                else:
+                    call.cancel()
+                result = RoleExecutionResult(
+                    selected.name, "", error=f"角色 {selected.name} 未能在 {budget:.1f} 秒内完成。"
+                )
+            except BaseException:
+                call.cancel()
+                raise
+        if result.error is None or result.retry_after is not None or self._degradation is None:
+            return result  # shed calls stay errors so overload still surfaces as 503
+        return await self._degradation.degrade(context, selected, result)
+
+    async def stream(
+        self,
+        context: RoutingContext,
+        decision: RoutingDecision,
+        precomputed: Optional[Mapping[int, Awaitable[RoleExecutionResult]]] = None,
+        deadline: Optional[float] = None,
+    ) -> AsyncIterator[RoleStreamEvent]:
+        """Yield role start/delta/end events as chunks arrive.
+
+        Roles of the same stage interleave; each event carries the role's
+        position in ``decision.selected_roles`` so clients can demultiplex.
+        The time budget only bounds a role's wait for its first chunk: text
+        already on its way to the client is never cut off. A ``precomputed``
+        result is sent as a single chunk once it is ready.
+        """
+        roles = decision.selected_roles
+        stages = self._plan(decision)
+        semaphore = asyncio.Semaphore(self._max_concurrency)
+        queue: "asyncio.Queue[Union[RoleStreamEvent, _RoleFinished]]" = asyncio.Queue()
+        precomputed = precomputed or {}
+
+        async def stream_role(index: int) -> None:
+            selected = roles[index]
+            try:
+                if index in precomputed:
+                    await queue.put(RoleStreamEvent("role_start", selected.name, index))
+                    result = await self._bounded(context, selected, precomputed[index], deadline)
+                    await self._put_result(queue, index, result)
+                    return
+                async with semaphore:
+                    LOGGER.info("Streaming role %s", selected.name)
+                    await queue.put(RoleStreamEvent("role_start", selected.name, index))
+                    with stage_timer("role", role=selected.name):
+                        failure = await self._stream_bounded(
+                            context, selected, index, queue, deadline
+                        )
+                    if failure is not None:
+                        await self._stream_degraded(context, selected, index, queue, failure)
+                    else:
+                        await queue.put(RoleStreamEvent("role_end", selected.name, index))
+            except Exception as exc:  # noqa: BLE001 - partial results are kept
+                LOGGER.warning("Role %s failed: %s", selected.name, exc)
+                await queue.put(RoleStreamEvent("role_error", selected.name, index, str(exc)))
+            finally:
+                await queue.put(_RoleFinished(index))
+
+        for stage in stages:
+            tasks = [asyncio.ensure_future(stream_role(index)) for index in stage]
+            finished = 0
+            try:
+                while finished < len(tasks):
+                    item = await queue.get()
+                    if isinstance(item, _RoleFinished):
+                        finished += 1
+                        continue
+                    yield item
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+    async def _stream_bounded(
+        self,
+        context: RoutingContext,
+        selected: SelectedRole,
+        index: int,
+        queue: "asyncio.Queue[Union[RoleStreamEvent, _RoleFinished]]",
+        deadline: Optional[float],
+    ) -> Optional[RoleExecutionResult]:
+        """Stream a role's chunks into ``queue``; the failure if none arrived in time."""
+        chunks = self._stream_role(context, selected).__aiter__()
+        budget = self._budget(deadline)
+        try:
+            first = await asyncio.wait_for(chunks.__anext__(), budget)
+        except StopAsyncIteration:
+            return None
+        except asyncio.TimeoutError:
+            await chunks.aclose()
+            LOGGER.warning("Role %s missed its %.1fs budget", selected.name, budget)
+            return RoleExecutionResult(
+                selected.name, "", error=f"角色 {selected.name} 未能在 {budget:.1f} 秒内完成。"
+            )
+        except SchedulerOverloadedError as exc:
+            LOGGER.warning("Role %s shed: %s", selected.name, exc)
+            return RoleExecutionResult(selected.name, "", error=str(exc), retry_after=exc.retry_after)
+        except Exception as exc:  # noqa: BLE001 - degraded below like a run() failure
+            LOGGER.warning("Role %s failed: %s", selected.name, exc)
+            return RoleExecutionResult(selected.name, "", error=str(exc))
+        await queue.put(RoleStreamEvent("role_delta", selected.name, index, first))
+        async for chunk in chunks:
+            await queue.put(RoleStreamEvent("role_delta", selected.name, index, chunk))
+        return None
+
+    async def _stream_degraded(
+        self,
+        context: RoutingContext,
+        selected: SelectedRole,
+        index: int,
+        queue: "asyncio.Queue[Union[RoleStreamEvent, _RoleFinished]]",
+        failure: RoleExecutionResult,
+    ) -> None:
+        result = failure
+        if failure.retry_after is None and self._degradation is not None:
+            result = await self._degradation.degrade(context, selected, failure)
+        await self._put_result(queue, index, result)
+
+    @staticmethod
+    async def _put_result(
+        queue: "asyncio.Queue[Union[RoleStreamEvent, _RoleFinished]]",
+        index: int,
+        result: RoleExecutionResult,
+    ) -> None:
+        """Send a whole, non-streamed role result as one chunk."""
+        if result.error is not None:
+            await queue.put(RoleStreamEvent("role_error", result.role_name, index, result.error))
+            return
+        await queue.put(RoleStreamEvent("role_delta", result.role_name, index, result.content))
+        await queue.put(
+            RoleStreamEvent(
+                "role_end",
+                result.role_name,
+                index,
+                freshness=result.freshness,
+                degraded_reason=result.degraded_reason,
+            )
+        )
+
+    async def _stream_role(
+        self, context: RoutingContext, selected: SelectedRole
+    ) -> AsyncIterator[str]:
+        executor = self._role_callers[selected.name]
+        stream = getattr(executor, "stream", None)
+        if stream is None:
+            yield await executor(context, selected)
+            return
+        async for chunk in stream(context, selected):
+            yield chunk
+
+
+def _as_async_executor(executor: Union[RoleExecutor, SyncRoleExecutor]) -> RoleExecutor:
+    """Run legacy sync executors in a worker thread behind the async contract."""
+    if inspect.iscoroutinefunction(executor) or inspect.iscoroutinefunction(
+        getattr(executor, "__call__", None)
+    ):
+        return executor  # type: ignore[return-value]
+
+    async def call_in_thread(context: RoutingContext, role: SelectedRole) -> str:
+        return await asyncio.to_thread(executor, context, role)
+
+    return call_in_thread
 
 
 class FallbackManager:
@@ -91,18 +434,77 @@ class FallbackManager:
     def handle_failure(
         self, error: Exception, context: RoutingContext
     ) -> RouterResult:
-        pseudo_decision = RoutingDecision(
-            mode=RoutingMode.HALT,
-            selected_roles=[],
-            overall_rationale="MetaRouter 调度失败，已触发兜底策略。",
-            fallback_plan="提示用户检查输入或稍后重试。",
-            warnings=[str(error), *context.requires_attention()],
-        )
+        with stage_timer("fallback"):
+            pseudo_decision = RoutingDecision(
+                mode=RoutingMode.HALT,
+                selected_roles=[],
+                overall_rationale="MetaRouter 调度失败，已触发兜底策略。",
+                fallback_plan="提示用户检查输入或稍后重试。",
+                warnings=[str(error), *context.requires_attention()],
+            )
         return RouterResult(decision=pseudo_decision, role_outputs=[], warnings=pseudo_decision.warnings)
 
+    def handle_role_failures(
+        self, results: List[RoleExecutionResult], context: RoutingContext
+    ) -> Optional[RouterResult]:
+        """Return a HALT result when every role failed; partial failures only warn."""
+        if any(result.error is None for result in results):
+            return None
+        reasons = "；".join(f"{result.role_name}: {result.error}" for result in results)
+        return self.handle_failure(RuntimeError(f"所有角色执行失败：{reasons}"), context)
+
+    @staticmethod
+    def role_failure_warnings(results: List[RoleExecutionResult]) -> List[str]:
+        return [
+            f"角色 {result.role_name} 执行失败，已返回其余角色的结果：{result.error}"
+            for result in results
+            if result.error is not None
+        ]
+
+    @staticmethod
+    def degradation_warnings(results: List[RoleExecutionResult]) -> List[str]:
+        described = {"stale": "此前缓存的内容", "stub": "简化的备用内容"}
+        return [
+            f"角色 {result.role_name} 暂时不可用，已返回{described.get(result.freshness, '备用内容')}："
+            f"{result.degraded_reason}"
+            for result in results
+            if result.freshness != "fresh"
+        ]
+
+
+class SessionLocks:
+    """Per-session asyncio locks that are dropped once nobody holds or awaits them."""
+
+    def __init__(self) -> None:
+        self._locks: Dict[str, Tuple[asyncio.Lock, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+    @asynccontextmanager
+    async def hold(self, session_id: str) -> AsyncIterator[None]:
+        lock, users = self._locks.get(session_id, (None, 0))
+        if lock is None:
+            lock = asyncio.Lock()
+        self._locks[session_id] = (lock, users + 1)
+        try:
+            async with lock:
+                yield
+        finally:
+            _, users = self._locks[session_id]
+            if users <= 1:
+                del self._locks[session_id]
+            else:
+                self._locks[session_id] = (lock, users - 1)
+
 
 class RouterService:
-    """High-level orchestration entry point."""
+    """High-level orchestration entry point.
+
+    Requests for the same session are serialized so session writes never
+    race, and an identical payload already in flight for that session is
+    shared instead of launching a second LLM pipeline.
+    """
 
     def __init__(
         self,
@@ -110,37 +512,281 @@ class RouterService:
         context_builder: Optional[ContextBuilder] = None,
         orchestrator: Optional[ExecutionOrchestrator] = None,
         fallback_manager: Optional[FallbackManager] = None,
-        session_repository: Optional["SessionRepository"] = None,
+        session_repository: Optional[SessionRepository] = None,
+        pre_router: Optional[FastPathRouter] = None,
+        summarizer: Optional["SessionSummarizer"] = None,
+        session_locks: Optional[SessionLocks] = None,
+        speculator: Optional["RoleSpeculator"] = None,
+        request_timeout: Optional[float] = None,
+        degradation: Optional["DegradationPolicy"] = None,
     ) -> None:
         self._meta_client = meta_client
+        self._pre_router = pre_router
         self._context_builder = context_builder or ContextBuilder()
         self._orchestrator = orchestrator or ExecutionOrchestrator()
         self._fallback_manager = fallback_manager or FallbackManager()
         self._session_repository = session_repository
+        self._summarizer = summarizer
+        self._session_locks = session_locks or SessionLocks()
+        self._speculator = speculator
+        self._request_timeout = request_timeout
+        self._degradation = degradation
+        self._inflight: Dict[Tuple[str, str], "asyncio.Future[RouterResult]"] = {}
+        self.coalesced_requests = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "inflight": len(self._inflight),
+            "locked_sessions": len(self._session_locks),
+            "coalesced_requests": self.coalesced_requests,
+        }
+
+    async def route(self, session_id: str, raw_payload: Dict) -> RouterResult:
+        key = (session_id, content_hash(canonical_json(raw_payload)))
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.coalesced_requests += 1
+            LOGGER.info("Coalescing duplicate request for session %s", session_id)
+            return await asyncio.shield(pending)
+        task = asyncio.ensure_future(self._route_serialized(session_id, raw_payload))
+        self._inflight[key] = task
+        task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shield so one caller disconnecting does not cancel the shared work.
+        return await asyncio.shield(task)
 
-    def route(self, session_id: str, raw_payload: Dict) -> RouterResult:
-        session = self._load_session(session_id)
-        context = self._context_builder.build(raw_payload, session)
+    async def _route_serialized(self, session_id: str, raw_payload: Dict) -> RouterResult:
+        async with self._session_locks.hold(session_id):
+            with prompt_assignment(session_id):
+                return await self._route_once(session_id, raw_payload)
+
+    async def _route_once(self, session_id: str, raw_payload: Dict) -> RouterResult:
+        session = await self._load_session(session_id)
+        with stage_timer("context_build"):
+            context = self._context_builder.build(raw_payload, session)
+        deadline = (
+            time.monotonic() + self._request_timeout if self._request_timeout is not None else None
+        )
         try:
-            decision = self._meta_client.route(context)
+            decision, speculative = await self._decide_in_time(context, session)
         except MetaRouterResponseError as error:
             return self._fallback_manager.handle_failure(error, context)
         if decision.mode == RoutingMode.HALT:
             return RouterResult(decision=decision, role_outputs=[], warnings=decision.warnings)
         try:
-            outputs = self._orchestrator.run(context, decision)
+            results = await self._orchestrator.run(
+                context, decision, precomputed=speculative, deadline=deadline
+            )
         except Exception as error:  # noqa: BLE001
+            for task in speculative.values():
+                task.cancel()
             return self._fallback_manager.handle_failure(error, context)
-        self._persist_session(session_id, session, decision, outputs, context)
-        warnings = [*decision.warnings, *context.requires_attention()]
+        shed = [result.retry_after for result in results if result.retry_after is not None]
+        if shed and all(result.error is not None for result in results):
+            # overload is transient: surface it as 503 rather than a HALT
+            raise SchedulerOverloadedError("服务繁忙，所有角色均未能排上队，请稍后重试。", max(shed))
+        failed = self._fallback_manager.handle_role_failures(results, context)
+        if failed is not None:
+            return failed
+        outputs = [result for result in results if result.error is None]
+        # stale and stub text is not something the user was actually told by the role
+        fresh = [result for result in outputs if result.freshness == "fresh"]
+        if fresh:
+            await self._persist_session(session_id, session, decision, fresh, context)
+        warnings = [
+            *decision.warnings,
+            *context.requires_attention(),
+            *self._fallback_manager.role_failure_warnings(results),
+            *self._fallback_manager.degradation_warnings(results),
+        ]
         return RouterResult(decision=decision, role_outputs=outputs, warnings=warnings)
 
-    def _load_session(self, session_id: str) -> Optional[SessionState]:
-        if not self._session_repository:
+    async def stream(self, session_id: str, raw_payload: Dict) -> AsyncIterator[RouterEvent]:
+        """Route a request, yielding the decision, role chunks and final warnings.
+
+        The pipeline runs in its own task, which holds the session lock, so
+        a slow or vanished client never keeps the session locked. Closing
+        the generator cancels the task.
+        """
+        events: "asyncio.Queue[Optional[RouterEvent]]" = asyncio.Queue()
+        producer = asyncio.ensure_future(self._produce_stream(session_id, raw_payload, events))
+        try:
+            while True:
+                event = await events.get()
+                if event is None:
+                    break
+                yield event
+            await producer  # re-raise what stopped the pipeline
+        finally:
+            producer.cancel()
+            await asyncio.gather(producer, return_exceptions=True)  # the lock is free on return
+
+    async def _produce_stream(
+        self, session_id: str, raw_payload: Dict, events: "asyncio.Queue[Optional[RouterEvent]]"
+    ) -> None:
+        async def pump() -> None:
+            async with self._session_locks.hold(session_id):
+                with prompt_assignment(session_id):
+                    async for event in self._stream_once(session_id, raw_payload):
+                        events.put_nowait(event)
+
+        try:
+            await pump()
+        finally:
+            events.put_nowait(None)
+
+    async def _stream_once(self, session_id: str, raw_payload: Dict) -> AsyncIterator[RouterEvent]:
+        deadline = (
+            time.monotonic() + self._request_timeout if self._request_timeout is not None else None
+        )
+        session = await self._load_session(session_id)
+        with stage_timer("context_build"):
+            context = self._context_builder.build(raw_payload, session)
+        try:
+            decision, speculative = await self._decide_in_time(context, session)
+        except MetaRouterResponseError as error:
+            fallback = self._fallback_manager.handle_failure(error, context)
+            yield RouterEvent("decision", fallback.decision.dict())
+            yield RouterEvent("warnings", {"warnings": fallback.warnings})
+            return
+        try:
+            async for event in self._stream_decided(
+                session_id, session, context, decision, speculative, deadline
+            ):
+                yield event
+        finally:
+            for task in speculative.values():
+                task.cancel()
+
+    async def _stream_decided(
+        self,
+        session_id: str,
+        session: Optional[SessionState],
+        context: RoutingContext,
+        decision: RoutingDecision,
+        speculative: Dict[int, "asyncio.Task[RoleExecutionResult]"],
+        deadline: Optional[float],
+    ) -> AsyncIterator[RouterEvent]:
+        yield RouterEvent("decision", decision.dict())
+        if decision.mode == RoutingMode.HALT:
+            yield RouterEvent("warnings", {"warnings": decision.warnings})
+            return
+        chunks: Dict[int, List[str]] = {}
+        errors: Dict[int, str] = {}
+        ends: Dict[int, RoleStreamEvent] = {}
+        try:
+            async for event in self._orchestrator.stream(
+                context, decision, precomputed=speculative, deadline=deadline
+            ):
+                if event.event == "role_delta":
+                    chunks.setdefault(event.index, []).append(event.text)
+                if event.event == "role_error":
+                    errors[event.index] = event.text
+                data: Dict[str, Any] = {"role_name": event.role_name, "index": event.index}
+                if event.event == "role_delta":
+                    data["text"] = event.text
+                elif event.event == "role_error":
+                    data["message"] = event.text
+                elif event.event == "role_end":
+                    ends[event.index] = event
+                    data["freshness"] = event.freshness
+                yield RouterEvent(event.event, data)
+        except Exception as error:  # noqa: BLE001
+            fallback = self._fallback_manager.handle_failure(error, context)
+            yield RouterEvent("error", {"message": str(error)})
+            yield RouterEvent("warnings", {"warnings": fallback.warnings})
+            return
+        results = [
+            RoleExecutionResult(
+                role_name=selected.name,
+                content="".join(chunks.get(index, [])),
+                error=errors.get(index),
+                freshness=ends[index].freshness if index in ends else "fresh",
+                degraded_reason=ends[index].degraded_reason if index in ends else None,
+            )
+            for index, selected in enumerate(decision.selected_roles)
+        ]
+        failed = self._fallback_manager.handle_role_failures(results, context)
+        if failed is not None:
+            yield RouterEvent("warnings", {"warnings": failed.warnings})
+            return
+        outputs = [result for result in results if result.error is None]
+        fresh = [result for result in outputs if result.freshness == "fresh"]
+        if fresh:
+            await self._persist_session(session_id, session, decision, fresh, context)
+        warnings = [
+            *decision.warnings,
+            *context.requires_attention(),
+            *self._fallback_manager.role_failure_warnings(results),
+            *self._fallback_manager.degradation_warnings(results),
+        ]
+        yield RouterEvent("warnings", {"warnings": warnings})
+
+    async def _decide_speculatively(
+        self, context: RoutingContext, session: Optional[SessionState]
+    ) -> Tuple[RoutingDecision, Dict[int, "asyncio.Task[RoleExecutionResult]"]]:
+        """Fast path, else the meta router, running likely roles during the meta-router call."""
+        decision = self._fast_path(context)
+        if decision is not None or self._speculator is None:
+            return decision or await self._meta_route(context), {}
+        run = self._speculator.start(context, session)
+        try:
+            decision = await self._meta_route(context)
+        except BaseException:
+            if run is not None:
+                self._speculator.abandon(run)
+            raise
+        self._speculator.predictor.observe(context, decision)
+        if run is None:
+            return decision, {}
+        return decision, self._speculator.resolve(run, decision)
+
+    async def _decide_in_time(
+        self, context: RoutingContext, session: Optional[SessionState]
+    ) -> Tuple[RoutingDecision, Dict[int, "asyncio.Task[RoleExecutionResult]"]]:
+        """Decide within the request deadline, degrading to a single role on an outage.
+
+        A meta router that timed out or failed upstream is replaced by the
+        degradation policy's decision when there is one. An unparsable
+        decision is not an outage and raises :class:`MetaRouterResponseError`
+        for the caller's HALT, as does a timeout that cannot be degraded.
+        """
+        try:
+            return await asyncio.wait_for(
+                self._decide_speculatively(context, session), self._request_timeout
+            )
+        except asyncio.TimeoutError:
+            error: Exception = MetaRouterResponseError("MetaRouter 未能在请求时限内完成调度。")
+        except ClaudeMessagesError as exc:
+            error = exc
+        decision = self._degradation.decision(context, error) if self._degradation else None
+        if decision is None:
+            raise error
+        LOGGER.warning("MetaRouter unavailable, degrading to a single role: %s", error)
+        return decision, {}
+
+    def _fast_path(self, context: RoutingContext) -> Optional[RoutingDecision]:
+        if self._pre_router is None:
+            return None
+        with stage_timer("fast_path"):
+            decision = self._pre_router.route(context)
+        if decision is not None:
+            LOGGER.info("Fast-path routed request in %s mode", decision.mode.value)
+        return decision
+
+    async def _meta_route(self, context: RoutingContext) -> RoutingDecision:
+        with stage_timer("meta_router"):
+            return await self._meta_client.route(context)
+
+    async def _load_session(self, session_id: str) -> Optional[SessionState]:
+        repository = self._session_repository
+        if repository is None:
             return None
-        return self._session_repository.get(session_id)
+        with stage_timer("session_load"):
+            if repository.blocking_io:
+                return await asyncio.to_thread(repository.get, session_id)
+            return repository.get(session_id)
 
-    def _persist_session(
+    async def _persist_session(
         self,
         session_id: str,
         session: Optional[SessionState],
@@ -148,25 +794,20 @@ class RouterService:
         outputs: List[RoleExecutionResult],
         context: RoutingContext,
     ) -> None:
-        if not self._session_repository:
+        if self._session_repository is None:
             return
         state = session or SessionState(session_id=session_id)
         for result in outputs:
             state.recent_calls.append(RoleCallRecord(role_name=result.role_name))
-        state.summary = decision.overall_rationale
+        if self._summarizer is None:
+            state.summary = decision.overall_rationale
         if context.spiritual_state:
             state.last_known_spiritual_state = context.spiritual_state
-        self._session_repository.save(state)
-
-
-class SessionRepository:
-    """Simple in-memory session repository for demonstration."""
-
-    def __init__(self) -> None:
-        self._store: Dict[str, SessionState] = {}
-
-    def get(self, session_id: str) -> Optional[SessionState]:
-        return self._store.get(session_id)
+        with stage_timer("session_persist"):
+            if self._session_repository.blocking_io:
+                await asyncio.to_thread(self._session_repository.save, state)
+            else:
+                self._session_repository.save(state)
+        if self._summarizer is not None and outputs:
+            self._summarizer.schedule(session_id, context, outputs)
 
-    def save(self, state: SessionState) -> None:
-        self._store[state.session_id] = state
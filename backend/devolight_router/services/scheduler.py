@@ -0,0 +1,270 @@
+"""Admission control for LLM calls.
+
+Every upstream call waits for a slot in one :class:`LLMScheduler`. A slot
+is granted only while the number of in-flight calls is below the limit and
+the requests/min and tokens/min buckets allow it. Waiting calls are served
+strictly by priority: interactive before batch and, within a class,
+meta-router calls before role calls, so a burst of background work cannot
+starve ``/route``. A call that waits longer than its class allows fails
+fast with :class:`SchedulerOverloadedError`, which the API maps to HTTP 503
+with ``Retry-After``.
+"""
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from .compaction import estimate_tokens
+from .llm_client import AsyncLLMCallable, LLMCallable, as_async_llm, as_streaming_llm
+from .observability import REGISTRY
+from .rate_limit import TokenBucket
+from .resilience import _Delegating
+
+LOGGER = logging.getLogger(__name__)
+if not LOGGER.handlers:
+    handler = logging.StreamHandler()
+    handler.setLevel(logging.INFO)
+    formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+    handler.setFormatter(formatter)
+    LOGGER.addHandler(handler)
+LOGGER.setLevel(logging.INFO)
+LOGGER.propagate = False
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+META = "meta"
+ROLE = "role"
+
+TRAFFIC_CLASS: ContextVar[str] = ContextVar("llm_traffic_class", default=INTERACTIVE)
+CALL_KIND: ContextVar[str] = ContextVar("llm_call_kind", default=ROLE)
+
+QUEUE_SECONDS = REGISTRY.histogram(
+    "devolight_llm_queue_seconds", "Time LLM calls waited for admission.", ("priority",)
+)
+REJECTED = REGISTRY.counter(
+    "devolight_llm_rejected_total", "LLM calls shed after waiting too long for admission.", ("priority",)
+)
+
+
+class SchedulerOverloadedError(RuntimeError):
+    """Raised when an LLM call could not be admitted within its queue timeout."""
+
+    def __init__(self, message: str, retry_after: float) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@contextmanager
+def traffic_class(name: str) -> Iterator[None]:
+    """Mark LLM calls made inside the block (and tasks it spawns) as ``name``."""
+    token = TRAFFIC_CLASS.set(name)
+    try:
+        yield
+    finally:
+        TRAFFIC_CLASS.reset(token)
+
+
+@contextmanager
+def call_kind(name: str) -> Iterator[None]:
+    token = CALL_KIND.set(name)
+    try:
+        yield
+    finally:
+        CALL_KIND.reset(token)
+
+
+def current_priority() -> str:
+    """``interactive-meta`` < ``interactive-role`` < ``batch-meta`` < ``batch-role``."""
+    return f"{TRAFFIC_CLASS.get()}-{CALL_KIND.get()}"
+
+
+_PRIORITY_ORDER = {
+    f"{INTERACTIVE}-{META}": 0,
+    f"{INTERACTIVE}-{ROLE}": 1,
+    f"{BATCH}-{META}": 2,
+    f"{BATCH}-{ROLE}": 3,
+}
+
+
+class _Waiter:
+    __slots__ = ("priority", "tokens", "future", "enqueued_at")
+
+    def __init__(self, priority: str, tokens: int, future: "asyncio.Future[None]", now: float) -> None:
+        self.priority = priority
+        self.tokens = tokens
+        self.future = future
+        self.enqueued_at = now
+
+
+class LLMScheduler:
+    """Priority queue in front of the upstream's rate and concurrency limits.
+
+    Limits left as ``None`` are not enforced. Must be used from one event loop.
+    """
+
+    def __init__(
+        self,
+        *,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        max_in_flight: int = 32,
+        queue_timeout: float = 10.0,
+        batch_queue_timeout: Optional[float] = None,
+        burst_seconds: float = 10.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight 必须至少为 1。")
+        self._requests = (
+            TokenBucket(requests_per_minute, max(1.0, requests_per_minute * burst_seconds / 60), clock)
+            if requests_per_minute
+            else None
+        )
+        self._tokens = (
+            TokenBucket(tokens_per_minute, tokens_per_minute * burst_seconds / 60, clock)
+            if tokens_per_minute
+            else None
+        )
+        self._requests_per_minute = requests_per_minute
+        self._max_in_flight = max_in_flight
+        self._timeouts = {
+            INTERACTIVE: queue_timeout,
+            BATCH: batch_queue_timeout if batch_queue_timeout is not None else queue_timeout * 6,
+        }
+        self._clock = clock
+        self._queue: List[Tuple[int, int, _Waiter]] = []
+        self._sequence = itertools.count()
+        self._in_flight = 0
+        self._wakeup: Optional[asyncio.TimerHandle] = None
+        self.admitted = 0
+        self.rejected = 0
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def queued(self) -> int:
+        return sum(1 for _, _, waiter in self._queue if not waiter.future.done())
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "in_flight": self._in_flight,
+            "queued": self.queued(),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+        }
+
+    @asynccontextmanager
+    async def slot(self, tokens: int = 0, priority: Optional[str] = None) -> AsyncIterator[None]:
+        """Hold one upstream slot for the duration of the block."""
+        await self.acquire(tokens, priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def acquire(self, tokens: int = 0, priority: Optional[str] = None) -> None:
+        priority = priority or current_priority()
+        loop = asyncio.get_running_loop()
+        waiter = _Waiter(priority, tokens, loop.create_future(), self._clock())
+        heapq.heappush(self._queue, (_PRIORITY_ORDER.get(priority, 3), next(self._sequence), waiter))
+        self._dispatch()
+        timeout = self._timeouts[BATCH if priority.startswith(BATCH) else INTERACTIVE]
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout)
+        except asyncio.TimeoutError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                pass  # granted while the timeout fired; keep the slot
+            else:
+                waiter.future.cancel()
+                self.rejected += 1
+                REJECTED.inc(priority=priority)
+                retry_after = self._retry_after()
+                LOGGER.warning(
+                    "Shedding %s LLM call after %.1fs in queue (retry after %.0fs)",
+                    priority,
+                    timeout,
+                    retry_after,
+                )
+                raise SchedulerOverloadedError(
+                    f"LLM 调用排队超过 {timeout:.0f} 秒，服务繁忙，请稍后重试。", retry_after
+                ) from None
+        except BaseException:
+            if waiter.future.done() and not waiter.future.cancelled():
+                self.release()  # cancelled right after being granted
+            else:
+                waiter.future.cancel()
+            raise
+        QUEUE_SECONDS.observe(self._clock() - waiter.enqueued_at, priority=priority)
+
+    def release(self) -> None:
+        self._in_flight -= 1
+        self._dispatch()
+
+    def _retry_after(self) -> float:
+        """Rough time until the current backlog drains, at least one second."""
+        backlog = self.queued() + self._in_flight
+        if self._requests_per_minute:
+            return float(max(1, math.ceil(backlog * 60 / self._requests_per_minute)))
+        return float(max(1, math.ceil(backlog / self._max_in_flight)))
+
+    def _dispatch(self) -> None:
+        """Grant slots to the head of the queue while every limit allows it."""
+        if self._wakeup is not None:
+            self._wakeup.cancel()
+            self._wakeup = None
+        while self._queue:
+            _, _, waiter = self._queue[0]
+            if waiter.future.done():  # timed out or cancelled
+                heapq.heappop(self._queue)
+                continue
+            if self._in_flight >= self._max_in_flight:
+                return
+            delay = max(
+                self._requests.delay_for(1) if self._requests is not None else 0.0,
+                self._tokens.delay_for(waiter.tokens) if self._tokens is not None and waiter.tokens else 0.0,
+            )
+            if delay > 0:
+                # strict priority: lower classes wait behind the head
+                self._wakeup = asyncio.get_running_loop().call_later(delay, self._dispatch)
+                return
+            if self._requests is not None:
+                self._requests.try_acquire(1)
+            if self._tokens is not None and waiter.tokens:
+                self._tokens.try_acquire(waiter.tokens)
+            heapq.heappop(self._queue)
+            self._in_flight += 1
+            self.admitted += 1
+            waiter.future.set_result(None)
+
+
+class ScheduledLLMCallable(_Delegating):
+    """Routes every call (and stream) of the wrapped callable through a scheduler.
+
+    The token cost is estimated from the prompt and payload before the call.
+    Wrap it inside the retrying layer so each retry is admitted separately.
+    """
+
+    def __init__(
+        self, inner: Union[LLMCallable, AsyncLLMCallable], scheduler: LLMScheduler
+    ) -> None:
+        super().__init__(inner)
+        self._call = as_async_llm(inner)
+        self._stream = as_streaming_llm(inner)
+        self.scheduler = scheduler
+
+    async def acall(self, prompt: str, payload: Dict) -> str:
+        async with self.scheduler.slot(estimate_tokens(prompt) + estimate_tokens(payload)):
+            return await self._call(prompt, payload)
+
+    async def astream(self, prompt: str, payload: Dict) -> AsyncIterator[str]:
+        async with self.scheduler.slot(estimate_tokens(prompt) + estimate_tokens(payload)):
+            async for chunk in self._stream(prompt, payload):
+                yield chunk
@@ -0,0 +1,58 @@
+"""JSON encoding shared by the LLM client, logging, caches and the API.
+
+Output is compact UTF-8 (no ASCII escaping). ``orjson`` is used when it is
+installed; the standard library produces the same text otherwise.
+"""
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, Optional
+
+try:  # optional: several times faster than the standard library
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without orjson
+    orjson = None
+
+
+def dumps(value: Any, *, sort_keys: bool = False) -> bytes:
+    """Encode ``value``; objects JSON cannot represent are written as ``str(value)``."""
+    if orjson is not None:
+        return orjson.dumps(value, default=str, option=orjson.OPT_SORT_KEYS if sort_keys else 0)
+    return json.dumps(
+        value, ensure_ascii=False, sort_keys=sort_keys, separators=(",", ":"), default=str
+    ).encode("utf-8")
+
+
+def dumps_str(value: Any, *, sort_keys: bool = False) -> str:
+    return dumps(value, sort_keys=sort_keys).decode("utf-8")
+
+
+def loads(data: Any) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class EncodedPayload(dict):
+    """An LLM payload that is encoded at most once.
+
+    The request body, token estimates and sampled logs all read
+    :attr:`json`. Build a new payload instead of mutating one whose
+    encoding was already read.
+    """
+
+    __slots__ = ("_json",)
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._json: Optional[str] = None
+
+    @property
+    def json(self) -> str:
+        if self._json is None:
+            self._json = dumps_str(self)
+        return self._json
+
+
+def encoded_payload(payload: Dict) -> EncodedPayload:
+    return payload if isinstance(payload, EncodedPayload) else EncodedPayload(payload)
@@ -0,0 +1,480 @@
+from __future__ import annotations
+
+import sqlite3
+import sys
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterator, List, Optional, Protocol, Sequence, Tuple
+
+from ..models import RoleCallRecord, SessionState
+from .kv import KeyValueStore
+
+
+class SessionRepository(Protocol):
+    """Storage for per-session routing state."""
+
+    blocking_io: bool
+
+    def get(self, session_id: str) -> Optional[SessionState]:
+        ...
+
+    def save(self, state: SessionState) -> None:
+        ...
+
+
+def _trim_calls(state: SessionState, max_recent_calls: int) -> None:
+    overflow = len(state.recent_calls) - max_recent_calls
+    if overflow > 0:
+        del state.recent_calls[:overflow]
+
+
+_ROLE_ID_BITS = 16
+_ROLE_ID_MASK = (1 << _ROLE_ID_BITS) - 1
+
+
+class RoleTable:
+    """Interns role names as small integer ids shared by every compact session."""
+
+    def __init__(self) -> None:
+        self._ids: Dict[str, int] = {}
+        self._names: List[str] = []
+        self._lock = threading.Lock()
+
+    def id_of(self, name: str) -> int:
+        role_id = self._ids.get(name)
+        if role_id is not None:
+            return role_id
+        with self._lock:
+            if name not in self._ids:
+                if len(self._names) >= _ROLE_ID_MASK:
+                    raise ValueError("角色名称过多，无法压缩存储。")
+                self._ids[name] = len(self._names)
+                self._names.append(sys.intern(name))
+            return self._ids[name]
+
+    def name_of(self, role_id: int) -> str:
+        return self._names[role_id]
+
+
+ROLES = RoleTable()
+
+
+def _epoch_ms(timestamp: datetime) -> int:
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return round(timestamp.timestamp() * 1000)
+
+
+def _utc_datetime(epoch_ms: int) -> datetime:
+    return datetime.fromtimestamp(epoch_ms / 1000, timezone.utc).replace(tzinfo=None)
+
+
+class CompactSession:
+    """Memory-lean form of :class:`SessionState` kept by the in-memory repository.
+
+    Call history is a ring buffer of ``epoch_ms << 16 | role_id`` values in
+    one ``array('Q')`` that grows up to the repository's capacity and then
+    overwrites the oldest entry. Highlights and feedback, which are rarely
+    set, live in a side dict keyed by ring slot, since two calls to the same
+    role within one millisecond pack to the same value. The pydantic model
+    is only rebuilt by :meth:`to_state`, when a caller reads the session.
+    """
+
+    __slots__ = (
+        "session_id",
+        "user_id",
+        "summary",
+        "spiritual_state",
+        "version",
+        "touched",
+        "_calls",
+        "_head",
+        "_extras",
+    )
+
+    def __init__(self, session_id: str) -> None:
+        self.session_id = session_id
+        self.user_id: Optional[str] = None
+        self.summary: Optional[str] = None
+        self.spiritual_state: Optional[str] = None
+        self.version = 0
+        self.touched = 0.0
+        self._calls = array("Q")
+        self._head = 0
+        self._extras: Optional[Dict[int, Tuple[Optional[str], Optional[str]]]] = None
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    @staticmethod
+    def _pack(record: RoleCallRecord) -> int:
+        return _epoch_ms(record.timestamp) << _ROLE_ID_BITS | ROLES.id_of(record.role_name)
+
+    def append(self, record: RoleCallRecord, capacity: int) -> None:
+        packed = self._pack(record)
+        calls = self._calls
+        if len(calls) < capacity:
+            slot = len(calls)
+            calls.append(packed)
+        else:
+            slot = self._head
+            calls[slot] = packed
+            self._head = (self._head + 1) % capacity
+        if record.highlights is not None or record.feedback is not None:
+            if self._extras is None:
+                self._extras = {}
+            self._extras[slot] = (record.highlights, record.feedback)
+        elif self._extras is not None:
+            self._extras.pop(slot, None)
+
+    def _slots(self) -> Iterator[int]:
+        """Ring slots, oldest call first."""
+        size, head = len(self._calls), self._head
+        for index in range(size):
+            yield (head + index) % size
+
+    def packed_calls(self) -> Iterator[int]:
+        """Packed calls, oldest first."""
+        calls = self._calls
+        for slot in self._slots():
+            yield calls[slot]
+
+    def last_role(self) -> Optional[str]:
+        if not self._calls:
+            return None
+        return ROLES.name_of(self._calls[self._head - 1] & _ROLE_ID_MASK)
+
+    def update(self, state: SessionState, capacity: int) -> bool:
+        """Take ``state``'s scalars and append the calls it added after ours.
+
+        ``state.recent_calls`` must start with every call we hold, as a
+        state returned by :meth:`to_state` does, so repeated calls within
+        one millisecond still line up. Returns ``False`` (and changes
+        nothing) otherwise, i.e. when it was not read from this session.
+        """
+        records = state.recent_calls
+        start = len(self._calls)
+        if len(records) < start or any(
+            self._pack(record) != packed for record, packed in zip(records, self.packed_calls())
+        ):
+            return False
+        for record in records[start:]:
+            self.append(record, capacity)
+        self.user_id = state.user_id
+        self.summary = state.summary
+        spiritual_state = state.last_known_spiritual_state
+        self.spiritual_state = sys.intern(spiritual_state) if spiritual_state is not None else None
+        self.version = state.version
+        return True
+
+    @classmethod
+    def from_state(cls, state: SessionState, capacity: int) -> "CompactSession":
+        compact = cls(state.session_id)
+        compact.update(state, capacity)
+        return compact
+
+    def to_state(self) -> SessionState:
+        extras = self._extras or {}
+        calls = []
+        for slot in self._slots():
+            packed = self._calls[slot]
+            highlights, feedback = extras.get(slot, (None, None))
+            calls.append(
+                RoleCallRecord.construct(
+                    role_name=ROLES.name_of(packed & _ROLE_ID_MASK),
+                    timestamp=_utc_datetime(packed >> _ROLE_ID_BITS),
+                    highlights=highlights,
+                    feedback=feedback,
+                )
+            )
+        return SessionState.construct(
+            session_id=self.session_id,
+            user_id=self.user_id,
+            recent_calls=calls,
+            summary=self.summary,
+            last_known_spiritual_state=self.spiritual_state,
+            version=self.version,
+        )
+
+
+class InMemorySessionRepository:
+    """Process-local LRU store with an idle TTL and capped call history.
+
+    Sessions are held as :class:`CompactSession`; ``get`` returns a fresh
+    :class:`SessionState`, so changes take effect only through ``save``.
+    """
+
+    blocking_io = False
+
+    def __init__(
+        self,
+        max_sessions: int = 100_000,
+        idle_ttl_seconds: Optional[float] = None,
+        max_recent_calls: int = 20,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if max_sessions < 1 or max_recent_calls < 1:
+            raise ValueError("max_sessions 与 max_recent_calls 必须至少为 1。")
+        self._max_sessions = max_sessions
+        self._idle_ttl = idle_ttl_seconds
+        self._max_recent_calls = max_recent_calls
+        self._clock = clock
+        self._store: "OrderedDict[str, CompactSession]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+    def get(self, session_id: str) -> Optional[SessionState]:
+        now = self._clock()
+        with self._lock:
+            compact = self._store.get(session_id)
+            if compact is None:
+                return None
+            if self._idle_ttl is not None and now - compact.touched > self._idle_ttl:
+                del self._store[session_id]
+                return None
+            compact.touched = now
+            self._store.move_to_end(session_id)
+        return compact.to_state()
+
+    def save(self, state: SessionState) -> None:
+        with self._lock:
+            compact = self._store.get(state.session_id)
+            # matched before trimming: the untrimmed calls start with the ones we hold
+            if compact is None or not compact.update(state, self._max_recent_calls):
+                compact = CompactSession.from_state(state, self._max_recent_calls)
+                self._store[state.session_id] = compact
+            compact.touched = self._clock()
+            self._store.move_to_end(state.session_id)
+            while len(self._store) > self._max_sessions:
+                self._store.popitem(last=False)
+        _trim_calls(state, self._max_recent_calls)
+
+
+class SQLiteSessionRepository:
+    """SQLite (WAL) store that appends only the role calls it has not seen.
+
+    Session scalars live in ``sessions``; call history is an append-only
+    ``role_calls`` table pruned to the newest ``max_recent_calls`` rows per
+    session, so a save costs one upsert plus the new records.
+    """
+
+    blocking_io = True
+
+    def __init__(self, path: str, max_recent_calls: int = 20) -> None:
+        if max_recent_calls < 1:
+            raise ValueError("max_recent_calls 必须至少为 1。")
+        self._max_recent_calls = max_recent_calls
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                user_id TEXT,
+                summary TEXT,
+                last_known_spiritual_state TEXT,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS role_calls (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id TEXT NOT NULL,
+                role_name TEXT NOT NULL,
+                timestamp TEXT NOT NULL,
+                highlights TEXT,
+                feedback TEXT
+            );
+            CREATE INDEX IF NOT EXISTS role_calls_session ON role_calls(session_id, id);
+            """
+        )
+
+    def get(self, session_id: str) -> Optional[SessionState]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT user_id, summary, last_known_spiritual_state FROM sessions"
+                " WHERE session_id = ?",
+                (session_id,),
+            ).fetchone()
+            if row is None:
+                return None
+            calls = self._conn.execute(
+                "SELECT role_name, timestamp, highlights, feedback FROM role_calls"
+                " WHERE session_id = ? ORDER BY id DESC LIMIT ?",
+                (session_id, self._max_recent_calls),
+            ).fetchall()
+        return SessionState(
+            session_id=session_id,
+            user_id=row[0],
+            summary=row[1],
+            last_known_spiritual_state=row[2],
+            recent_calls=[
+                RoleCallRecord(
+                    role_name=role_name,
+                    timestamp=datetime.fromisoformat(timestamp),
+                    highlights=highlights,
+                    feedback=feedback,
+                )
+                for role_name, timestamp, highlights, feedback in reversed(calls)
+            ],
+        )
+
+    def save(self, state: SessionState) -> None:
+        _trim_calls(state, self._max_recent_calls)
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute(
+                    "INSERT INTO sessions"
+                    " (session_id, user_id, summary, last_known_spiritual_state, updated_at)"
+                    " VALUES (?, ?, ?, ?, ?)"
+                    " ON CONFLICT(session_id) DO UPDATE SET user_id = excluded.user_id,"
+                    " summary = excluded.summary,"
+                    " last_known_spiritual_state = excluded.last_known_spiritual_state,"
+                    " updated_at = excluded.updated_at",
+                    (
+                        state.session_id,
+                        state.user_id,
+                        state.summary,
+                        state.last_known_spiritual_state,
+                        time.time(),
+                    ),
+                )
+                new_calls = self._unsaved_calls(state)
+                if new_calls:
+                    self._conn.executemany(
+                        "INSERT INTO role_calls"
+                        " (session_id, role_name, timestamp, highlights, feedback)"
+                        " VALUES (?, ?, ?, ?, ?)",
+                        [
+                            (
+                                state.session_id,
+                                record.role_name,
+                                record.timestamp.isoformat(),
+                                record.highlights,
+                                record.feedback,
+                            )
+                            for record in new_calls
+                        ],
+                    )
+                    self._conn.execute(
+                        "DELETE FROM role_calls WHERE session_id = ? AND id <= ("
+                        " SELECT id FROM role_calls WHERE session_id = ?"
+                        " ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                        (state.session_id, state.session_id, self._max_recent_calls),
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _unsaved_calls(self, state: SessionState) -> List[RoleCallRecord]:
+        last = self._conn.execute(
+            "SELECT role_name, timestamp FROM role_calls WHERE session_id = ?"
+            " ORDER BY id DESC LIMIT 1",
+            (state.session_id,),
+        ).fetchone()
+        if last is None:
+            return list(state.recent_calls)
+        for index in range(len(state.recent_calls) - 1, -1, -1):
+            record = state.recent_calls[index]
+            if (record.role_name, record.timestamp.isoformat()) == tuple(last):
+                return state.recent_calls[index + 1 :]
+        return list(state.recent_calls)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_SCALAR_FIELDS = ("user_id", "summary", "last_known_spiritual_state")
+
+
+def _call_key(record: RoleCallRecord) -> Tuple[str, str]:
+    return record.role_name, record.timestamp.isoformat()
+
+
+class KeyValueSessionRepository:
+    """Sessions in a shared :class:`KeyValueStore`, one JSON document per session.
+
+    Writes are optimistic: a save based on version ``n`` only lands while
+    the stored document is still at ``n``. When another worker saved first,
+    the two are merged instead of one overwriting the other: role calls the
+    store has not seen are appended, and only the fields this copy changed
+    since it was read replace the stored ones.
+    """
+
+    def __init__(
+        self,
+        store: KeyValueStore,
+        *,
+        prefix: str = "devo:session:",
+        max_recent_calls: int = 20,
+        idle_ttl_seconds: Optional[float] = None,
+    ) -> None:
+        if max_recent_calls < 1:
+            raise ValueError("max_recent_calls 必须至少为 1。")
+        self.store = store
+        self.blocking_io = store.blocking_io
+        self._prefix = prefix
+        self._max_recent_calls = max_recent_calls
+        self._idle_ttl = idle_ttl_seconds
+        self.merges = 0
+
+    def get(self, session_id: str) -> Optional[SessionState]:
+        raw = self.store.get(self._prefix + session_id)
+        return self._parse(raw) if raw is not None else None
+
+    def get_many(self, session_ids: Sequence[str]) -> Dict[str, SessionState]:
+        """Load several sessions with one batched read."""
+        raws = self.store.mget([self._prefix + session_id for session_id in session_ids])
+        return {
+            session_id: self._parse(raw)
+            for session_id, raw in zip(session_ids, raws)
+            if raw is not None
+        }
+
+    def save(self, state: SessionState) -> None:
+        _trim_calls(state, self._max_recent_calls)
+
+        def apply(current_raw: Optional[str]) -> str:
+            current = SessionState.parse_raw(current_raw) if current_raw is not None else None
+            if current is None or current.version == state.version:
+                return state.copy(update={"version": state.version + 1}).json()
+            return self._merge(current, state).json()
+
+        stored = self._parse(self.store.update(self._prefix + state.session_id, apply, self._idle_ttl))
+        for name in ("recent_calls", *_SCALAR_FIELDS, "version"):
+            setattr(state, name, getattr(stored, name))
+        state._synced = stored._synced
+
+    @staticmethod
+    def _parse(raw: str) -> SessionState:
+        state = SessionState.parse_raw(raw)
+        state._synced = {name: getattr(state, name) for name in _SCALAR_FIELDS}
+        return state
+
+    def _merge(self, current: SessionState, incoming: SessionState) -> SessionState:
+        self.merges += 1
+        seen = {_call_key(record) for record in current.recent_calls}
+        calls = current.recent_calls + [
+            record for record in incoming.recent_calls if _call_key(record) not in seen
+        ]
+        merged = current.copy(
+            update={
+                "recent_calls": sorted(calls, key=lambda record: record.timestamp),
+                "version": current.version + 1,
+            }
+        )
+        for name in _SCALAR_FIELDS:
+            value = getattr(incoming, name)
+            if name not in incoming._synced or value != incoming._synced[name]:
+                if value is not None:
+                    setattr(merged, name, value)
+        _trim_calls(merged, self._max_recent_calls)
+        return merged
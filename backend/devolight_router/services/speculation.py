@@ -0,0 +1,246 @@
+"""Speculative role execution overlapped with the meta-router call.
+
+While the meta router is still deciding, the roles it is most likely to
+pick are already running. A speculative result is kept only when the
+decision selects that role in its first stage with exactly the
+``handoff_note`` the speculative run was given (the final-output note).
+Speculative runs are started without the meta router's ``reason`` and
+``score``, which do not exist yet, so those are not compared; the reused
+output therefore never saw them, whether or not compaction would have
+dropped them. All other speculative runs are cancelled and their estimated
+tokens are charged to a per-deployment waste budget. When the budget is exhausted, speculation
+pauses until the budget refills.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from ..models import RoutingContext, RoutingDecision, SelectedRole, SessionState
+from .executor import without_routing_annotations
+from .observability import REGISTRY
+from .rate_limit import TokenBucket
+from .router import ExecutionOrchestrator, ExecutionPlanner, RoleExecutionResult
+
+LOGGER = logging.getLogger(__name__)
+if not LOGGER.handlers:
+    handler = logging.StreamHandler()
+    handler.setLevel(logging.INFO)
+    formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+    handler.setFormatter(formatter)
+    LOGGER.addHandler(handler)
+LOGGER.setLevel(logging.INFO)
+LOGGER.propagate = False
+
+SPECULATIONS = REGISTRY.counter(
+    "devolight_speculation_total", "Speculative role runs by outcome.", ("outcome",)
+)
+SPECULATION_SAVED = REGISTRY.histogram(
+    "devolight_speculation_saved_seconds", "Role latency hidden behind the meta-router call.", ("role",)
+)
+
+FINAL_NOTE = "最终输出"
+SHAPE_FIELDS = ("scripture", "text", "user_question", "user_profile", "spiritual_state", "session_stage")
+
+# Before enough decisions are observed: passage-only requests almost always get the teacher.
+DEFAULT_PRIORS: Dict[Tuple[str, ...], Dict[str, float]] = {
+    ("scripture",): {"AntiochTeacher": 0.8},
+    ("scripture", "text"): {"AntiochTeacher": 0.8},
+}
+
+
+def payload_shape(context: RoutingContext) -> Tuple[str, ...]:
+    """Which request fields are present, e.g. ``("scripture", "user_question")``."""
+    return tuple(name for name in SHAPE_FIELDS if getattr(context, name))
+
+
+class RolePredictor:
+    """Estimates how likely the meta router is to select each role.
+
+    Per payload shape it counts the roles the meta router actually chose
+    (falling back to ``priors`` until ``min_samples`` decisions were seen)
+    and blends that with how often the session used the role recently.
+    """
+
+    def __init__(
+        self,
+        *,
+        threshold: float = 0.6,
+        max_roles: int = 1,
+        min_samples: int = 20,
+        session_weight: float = 0.3,
+        history_window: int = 6,
+        priors: Optional[Dict[Tuple[str, ...], Dict[str, float]]] = None,
+    ) -> None:
+        self._threshold = threshold
+        self._max_roles = max_roles
+        self._min_samples = min_samples
+        self._session_weight = session_weight
+        self._history_window = history_window
+        self._priors = DEFAULT_PRIORS if priors is None else priors
+        self._seen: Dict[Tuple[str, ...], Tuple[int, Counter]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, context: RoutingContext, decision: RoutingDecision) -> None:
+        shape = payload_shape(context)
+        with self._lock:
+            total, counts = self._seen.get(shape, (0, Counter()))
+            counts.update({role.name for role in decision.selected_roles})
+            self._seen[shape] = (total + 1, counts)
+
+    def scores(self, context: RoutingContext, session: Optional[SessionState]) -> Dict[str, float]:
+        shape = payload_shape(context)
+        with self._lock:
+            total, counts = self._seen.get(shape, (0, Counter()))
+            if total >= self._min_samples:
+                base = {name: count / total for name, count in counts.items()}
+            else:
+                base = dict(self._priors.get(shape, {}))
+        calls = session.recent_calls[-self._history_window :] if session else []
+        if not calls:
+            return base
+        used = Counter(call.role_name for call in calls)
+        if session is not None and session.last_role():
+            used[session.last_role()] += 1
+        norm = max(used.values())
+        weight = self._session_weight
+        return {
+            name: (1 - weight) * base.get(name, 0.0) + weight * used.get(name, 0) / norm
+            for name in set(base) | set(used)
+        }
+
+    def predict(self, context: RoutingContext, session: Optional[SessionState]) -> List[str]:
+        ranked = sorted(self.scores(context, session).items(), key=lambda item: -item[1])
+        return [name for name, score in ranked if score >= self._threshold][: self._max_roles]
+
+
+@dataclass
+class SpeculativeRun:
+    started_at: float
+    tasks: Dict[str, "asyncio.Task[RoleExecutionResult]"] = field(default_factory=dict)
+    roles: Dict[str, SelectedRole] = field(default_factory=dict)
+    finished_at: Dict[str, float] = field(default_factory=dict)
+
+    def cancel(self) -> None:
+        for task in self.tasks.values():
+            task.cancel()
+
+
+class RoleSpeculator:
+    """Starts predicted roles early and hands compatible ones to the orchestrator."""
+
+    def __init__(
+        self,
+        orchestrator: ExecutionOrchestrator,
+        predictor: Optional[RolePredictor] = None,
+        *,
+        waste_budget_tokens_per_minute: float = 20_000,
+        estimated_tokens_per_role: int = 1_500,
+        clock=time.perf_counter,
+    ) -> None:
+        self._orchestrator = orchestrator
+        self.predictor = predictor or RolePredictor()
+        self._budget = TokenBucket(
+            waste_budget_tokens_per_minute, capacity=waste_budget_tokens_per_minute
+        )
+        self._estimate = estimated_tokens_per_role
+        self._planner = ExecutionPlanner()
+        self._clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0
+        self.wasted_tokens = 0
+        self.saved_seconds = 0.0
+
+    def stats(self) -> Dict[str, float]:
+        attempts = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "skipped": self.skipped,
+            "hit_rate": round(self.hits / attempts, 4) if attempts else 0.0,
+            "wasted_tokens": self.wasted_tokens,
+            "saved_seconds": round(self.saved_seconds, 3),
+        }
+
+    def start(
+        self, context: RoutingContext, session: Optional[SessionState]
+    ) -> Optional[SpeculativeRun]:
+        roles = [
+            name
+            for name in self.predictor.predict(context, session)
+            if self._orchestrator.has_role(name)
+        ]
+        if not roles:
+            return None
+        if self._budget.delay_for(self._estimate * len(roles)) > 0:
+            self.skipped += len(roles)
+            SPECULATIONS.inc(len(roles), outcome="skipped")
+            return None
+        run = SpeculativeRun(started_at=self._clock())
+        for name in roles:
+            selected = SelectedRole(
+                name=name, score=1.0, reason="推测执行。", handoff_note=FINAL_NOTE
+            )
+            run.roles[name] = selected
+            with without_routing_annotations():
+                task = asyncio.ensure_future(self._orchestrator.run_role(context, selected))
+            task.add_done_callback(
+                lambda _, role=name: run.finished_at.setdefault(role, self._clock())
+            )
+            run.tasks[name] = task
+        LOGGER.info("Speculatively started %s", ", ".join(roles))
+        return run
+
+    def resolve(
+        self, run: SpeculativeRun, decision: RoutingDecision
+    ) -> Dict[int, "asyncio.Task[RoleExecutionResult]"]:
+        """Return reusable runs keyed by role index and cancel the rest."""
+        decided_at = self._clock()
+        usable = self._compatible(run, decision)
+        accepted: Dict[int, "asyncio.Task[RoleExecutionResult]"] = {}
+        for name, task in run.tasks.items():
+            index = usable.get(name)
+            failed = task.done() and (task.cancelled() or task.result().error is not None)
+            if index is None or failed:
+                task.cancel()
+                self._waste(name)
+                continue
+            accepted[index] = task
+            saved = run.finished_at.get(name, decided_at) - run.started_at
+            self.hits += 1
+            self.saved_seconds += saved
+            SPECULATIONS.inc(outcome="hit")
+            SPECULATION_SAVED.observe(saved, role=name)
+        return accepted
+
+    def abandon(self, run: SpeculativeRun) -> None:
+        """Cancel every run, e.g. when the meta router failed."""
+        for name, task in run.tasks.items():
+            task.cancel()
+            self._waste(name)
+
+    def _waste(self, name: str) -> None:
+        self.misses += 1
+        self.wasted_tokens += self._estimate
+        self._budget.try_acquire(self._estimate)
+        SPECULATIONS.inc(outcome="miss")
+        LOGGER.info("Discarded speculative run of %s", name)
+
+    def _compatible(self, run: SpeculativeRun, decision: RoutingDecision) -> Dict[str, int]:
+        """Roles whose speculative input matches: first stage and the same hand-off note."""
+        roles = decision.selected_roles
+        stages = self._planner.plan(decision)
+        first_stage = stages[0] if stages else []
+        compatible: Dict[str, int] = {}
+        for index in first_stage:
+            decided = roles[index]
+            speculative = run.roles.get(decided.name)
+            if speculative is not None and speculative.handoff_note == decided.handoff_note:
+                compatible.setdefault(decided.name, index)
+        return compatible
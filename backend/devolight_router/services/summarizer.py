@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from contextlib import nullcontext
+from typing import Any, Dict, List, Optional, Set, Union
+
+from ..models import RoutingContext, SessionState
+from ..prompts import PromptRegistry, default_registry
+from .llm_client import AsyncLLMCallable, LLMCallable, as_async_llm
+from .observability import stage_timer
+from .scheduler import BATCH, traffic_class
+from .router import RoleExecutionResult, SessionLocks
+from .sessions import SessionRepository
+
+LOGGER = logging.getLogger(__name__)
+if not LOGGER.handlers:
+    handler = logging.StreamHandler()
+    handler.setLevel(logging.INFO)
+    formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+    handler.setFormatter(formatter)
+    LOGGER.addHandler(handler)
+LOGGER.setLevel(logging.INFO)
+LOGGER.propagate = False
+
+
+class SessionSummarizer:
+    """Folds finished turns into a bounded rolling session summary in the background.
+
+    ``schedule`` only queues the turn; a per-session timer restarts on every
+    new turn (debounce), then one LLM call merges the queued turns into the
+    stored summary. The result is written under the session lock so it never
+    races a request persisting the same session. Failures are logged and the
+    previous summary is kept.
+    """
+
+    def __init__(
+        self,
+        llm_call: Union[LLMCallable, AsyncLLMCallable],
+        repository: SessionRepository,
+        *,
+        locks: Optional[SessionLocks] = None,
+        prompt_name: str = "session_summarizer",
+        debounce_seconds: float = 2.0,
+        max_summary_chars: int = 600,
+        max_output_chars: int = 400,
+        max_pending_turns: int = 5,
+        prompts: Optional[PromptRegistry] = None,
+    ) -> None:
+        self._llm_call = as_async_llm(llm_call)
+        self._prompts = prompts or default_registry()
+        self._prompt_name = prompt_name
+        self._prompts.get(prompt_name)  # fail at startup if the file is missing
+        self._repository = repository
+        self._locks = locks
+        self._debounce = debounce_seconds
+        self._max_summary_chars = max_summary_chars
+        self._max_output_chars = max_output_chars
+        self._max_pending_turns = max_pending_turns
+        self._pending: Dict[str, List[Dict[str, Any]]] = {}
+        self._tasks: Dict[str, "asyncio.Task[None]"] = {}
+        self._waiting: Set[str] = set()
+        self.scheduled = 0
+        self.completed = 0
+        self.failed = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "scheduled": self.scheduled,
+            "completed": self.completed,
+            "failed": self.failed,
+            "pending_sessions": len(self._pending),
+        }
+
+    def schedule(
+        self, session_id: str, context: RoutingContext, outputs: List[RoleExecutionResult]
+    ) -> None:
+        """Queue one finished turn; must be called from the event loop."""
+        turns = self._pending.setdefault(session_id, [])
+        turns.append(
+            {
+                "user_question": context.user_question,
+                "scripture": context.scripture,
+                "spiritual_state": context.spiritual_state,
+                "outputs": [
+                    {
+                        "role_name": output.role_name,
+                        "content": output.content[: self._max_output_chars],
+                    }
+                    for output in outputs
+                ],
+            }
+        )
+        del turns[: -self._max_pending_turns]
+        self.scheduled += 1
+        task = self._tasks.get(session_id)
+        if task is not None and session_id not in self._waiting:
+            return  # summarizing right now; the pending turn is picked up afterwards
+        if task is not None:
+            task.cancel()
+        self._start(session_id, self._debounce)
+
+    async def flush(self) -> None:
+        """Summarize every queued session now and wait for completion."""
+        while self._tasks:
+            for session_id in list(self._waiting):
+                self._tasks[session_id].cancel()
+                self._start(session_id, 0.0)
+            await asyncio.gather(*list(self._tasks.values()), return_exceptions=True)
+
+    async def aclose(self) -> None:
+        """Drop queued work; summaries are best effort and rebuilt on later turns."""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
+        self._waiting.clear()
+        self._pending.clear()
+
+    def _start(self, session_id: str, delay: float) -> None:
+        self._waiting.add(session_id)
+        self._tasks[session_id] = asyncio.ensure_future(self._run(session_id, delay))
+
+    async def _run(self, session_id: str, delay: float) -> None:
+        await asyncio.sleep(delay)
+        self._waiting.discard(session_id)
+        try:
+            with traffic_class(BATCH):
+                await self._summarize(session_id)
+        finally:
+            if self._tasks.get(session_id) is asyncio.current_task():
+                del self._tasks[session_id]
+                if self._pending.get(session_id):
+                    self._start(session_id, self._debounce)
+
+    async def _summarize(self, session_id: str) -> None:
+        turns = self._pending.pop(session_id, [])
+        if not turns:
+            return
+        state = await self._load(session_id)
+        payload = {
+            "previous_summary": (state.summary if state else None) or "",
+            "new_turns": turns,
+            "max_chars": self._max_summary_chars,
+        }
+        try:
+            with stage_timer("session_summary"):
+                prompt = self._prompts.get(self._prompt_name).text
+                summary = (await self._llm_call(prompt, payload)).strip()
+        except Exception as exc:  # noqa: BLE001 - background work must not crash the loop
+            self.failed += 1
+            LOGGER.warning("Session summary for %s failed: %s", session_id, exc)
+            return
+        if not summary:
+            self.failed += 1
+            return
+        summary = summary[: self._max_summary_chars]
+        lock = self._locks.hold(session_id) if self._locks is not None else nullcontext()
+        async with lock:
+            state = await self._load(session_id)
+            if state is None:
+                return
+            state.summary = summary
+            await self._save(state)
+        self.completed += 1
+
+    async def _load(self, session_id: str) -> Optional[SessionState]:
+        if self._repository.blocking_io:
+            return await asyncio.to_thread(self._repository.get, session_id)
+        return self._repository.get(session_id)
+
+    async def _save(self, state: SessionState) -> None:
+        if self._repository.blocking_io:
+            await asyncio.to_thread(self._repository.save, state)
+        else:
+            self._repository.save(state)
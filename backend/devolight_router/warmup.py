@@ -0,0 +1,145 @@
+"""Precompute shareable role outputs for a reading plan.
+
+Usage (from the ``backend`` directory)::
+
+    python -m devolight_router.warmup plan.jsonl
+
+Each input line is ``{"scripture": "约3:16", "text": "..."}`` (``text`` is
+optional). Every role whose cache policy depends on the passage alone is run
+once per entry so the day's requests are served from the role output cache.
+Run it with ``DEVO_ROLE_CACHE=sqlite`` and the server's ``DEVO_ROLE_CACHE_PATH``;
+an in-memory cache would be discarded when the job exits.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterable, List, Optional
+
+from .container import build_container
+from .models import RoutingContext, RoutingDecision, RoutingMode, SelectedRole
+from .services.role_cache import RoleOutputCache
+from .services.router import ExecutionOrchestrator
+from .services.scheduler import BATCH, traffic_class
+
+LOGGER = logging.getLogger(__name__)
+if not LOGGER.handlers:
+    handler = logging.StreamHandler()
+    handler.setLevel(logging.INFO)
+    formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+    handler.setFormatter(formatter)
+    LOGGER.addHandler(handler)
+LOGGER.setLevel(logging.INFO)
+LOGGER.propagate = False
+
+
+@dataclass
+class WarmupReport:
+    entries: int = 0
+    outputs: int = 0
+    failed: int = 0
+    skipped: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def parse_plan(lines: Iterable[str]) -> List[Dict[str, Optional[str]]]:
+    """Return ``{"scripture", "text"}`` entries, ignoring blank or invalid lines."""
+    entries: List[Dict[str, Optional[str]]] = []
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            raw = json.loads(line)
+        except ValueError:
+            LOGGER.warning("Skipping unparsable plan line %d", number)
+            continue
+        if not isinstance(raw, dict) or not raw.get("scripture"):
+            LOGGER.warning("Skipping plan line %d without scripture", number)
+            continue
+        entries.append({"scripture": raw["scripture"], "text": raw.get("text")})
+    return entries
+
+
+async def warm_role_cache(
+    orchestrator: ExecutionOrchestrator,
+    role_cache: RoleOutputCache,
+    entries: Iterable[Dict[str, Optional[str]]],
+    *,
+    concurrency: int = 4,
+) -> WarmupReport:
+    """Run every passage-only role for each plan entry through the orchestrator."""
+    roles = [name for name, policy in role_cache.policies.items() if policy.shared]
+    report = WarmupReport()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def warm(entry: Dict[str, Optional[str]]) -> None:
+        context = RoutingContext(scripture=entry["scripture"], text=entry.get("text"))
+        decision = RoutingDecision(
+            mode=RoutingMode.SMART,
+            selected_roles=[
+                SelectedRole(name=name, score=1.0, reason="预热阅读计划。", handoff_note="最终输出")
+                for name in roles
+            ],
+            overall_rationale="预热经文级角色输出缓存。",
+            fallback_plan="预热失败时在请求时再生成。",
+        )
+        async with semaphore:
+            with traffic_class(BATCH):
+                results = await orchestrator.run(context, decision)
+        for result in results:
+            if result.error or result.freshness != "fresh":
+                LOGGER.warning(
+                    "Warm-up of %s for %s failed: %s",
+                    result.role_name,
+                    entry["scripture"],
+                    result.error or result.degraded_reason,
+                )
+                report.failed += 1
+            else:
+                report.outputs += 1
+
+    entries = list(entries)
+    report.entries = len(entries)
+    if not roles:
+        report.skipped = len(entries)
+        return report
+    await asyncio.gather(*(warm(entry) for entry in entries))
+    return report
+
+
+async def _run_cli(args: argparse.Namespace) -> WarmupReport:
+    container = build_container()
+    try:
+        if container.role_cache is None or container.orchestrator is None:
+            raise RuntimeError("角色输出缓存未启用（DEVO_ROLE_CACHE=off），无需预热。")
+        if not container.role_cache.backend.blocking_io:
+            LOGGER.warning("Warming a process-local cache; set DEVO_ROLE_CACHE=sqlite to share it")
+        with open(args.plan, encoding="utf-8") as source:
+            entries = parse_plan(source)
+        return await warm_role_cache(
+            container.orchestrator,
+            container.role_cache,
+            entries,
+            concurrency=args.concurrency,
+        )
+    finally:
+        await container.aclose()
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="DevoLight role output cache warm-up")
+    parser.add_argument("plan", help="reading plan JSONL path")
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args(argv)
+    report = asyncio.run(_run_cli(args))
+    print(json.dumps(report.to_dict(), ensure_ascii=False), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.devolight_router.container import build_container
+from backend.devolight_router.main import app, get_router_service
+
+
+def test_container_preloads_prompts_and_builds_service_once(monkeypatch):
+    monkeypatch.setenv("DEVO_CLAUDE_API_KEY", "test-key")
+
+    with TestClient(app) as client:
+        container = client.app.state.container
+        first = get_router_service(container)
+        second = get_router_service(container)
+
+    assert first is second
+    assert "meta_router" in container.prompt_names
+    assert "antioch_teacher" in container.prompt_names
+
+
+def test_container_fails_fast_without_api_key(monkeypatch):
+    monkeypatch.delenv("DEVO_CLAUDE_API_KEY", raising=False)
+
+    with pytest.raises(RuntimeError):
+        build_container()
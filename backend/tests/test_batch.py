@@ -0,0 +1,62 @@
+import asyncio
+import json
+
+from fastapi.testclient import TestClient
+
+from backend.devolight_router.batch import BatchRunner, load_completed_ids
+from backend.devolight_router.container import build_container
+from backend.devolight_router.main import app, get_container
+
+DECISION = {
+    "mode": "single",
+    "selected_roles": [
+        {"name": "LukeScribe", "score": 0.9, "reason": "背景", "handoff_note": "最终输出"}
+    ],
+    "overall_rationale": "历史背景。",
+    "fallback_plan": "无",
+    "warnings": [],
+}
+
+
+def _llm_call(prompt, payload):
+    return json.dumps(DECISION, ensure_ascii=False)
+
+
+def _lines(count):
+    return [
+        json.dumps({"id": f"day-{day}", "session_id": f"plan-{day}", "payload": {"scripture": f"诗{day}:1"}})
+        for day in range(1, count + 1)
+    ]
+
+
+def test_batch_runner_skips_checkpointed_ids_and_reports_failures(tmp_path):
+    output = tmp_path / "out.jsonl"
+    output.write_text(json.dumps({"id": "day-1", "result": {}}) + "\n{torn", encoding="utf-8")
+    container = build_container(llm_call=_llm_call)
+    runner = BatchRunner(
+        container.router_service, concurrency=2, completed_ids=load_completed_ids(str(output))
+    )
+
+    async def collect():
+        return [record async for record in runner.run([*_lines(3), "not json"])]
+
+    records = asyncio.run(collect())
+
+    assert sorted(record["id"] for record in records) == ["day-2", "day-3", "line-4"]
+    assert runner.report.skipped == 1
+    assert runner.report.succeeded == 2
+    assert runner.report.failed == 1
+
+
+def test_batch_endpoint_streams_jsonl_with_report():
+    container = build_container(llm_call=_llm_call)
+    app.dependency_overrides[get_container] = lambda: container
+    try:
+        response = TestClient(app).post("/route/batch", content="\n".join(_lines(3)))
+    finally:
+        app.dependency_overrides.clear()
+
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert len([record for record in records if "result" in record]) == 3
+    assert records[-1]["report"]["succeeded"] == 3
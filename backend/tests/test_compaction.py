@@ -0,0 +1,92 @@
+import asyncio
+
+from backend.devolight_router.models import RoutingContext, SelectedRole, UserProfile
+from backend.devolight_router.services.compaction import (
+    CompactionPolicy,
+    ContextCompactor,
+    estimate_tokens,
+)
+from backend.devolight_router.services.executor import PromptRoleExecutor
+
+
+def _role(name):
+    return SelectedRole(name=name, score=0.9, reason="测试", handoff_note="最终输出")
+
+
+def test_estimate_tokens_counts_cjk_per_character():
+    assert estimate_tokens("约翰福音") == 4
+    assert estimate_tokens("abcdefgh") == 2
+    assert estimate_tokens(None) == 0
+
+
+def test_raw_payload_is_deduplicated_and_unused_fields_dropped():
+    payload = PromptRoleExecutor._build_payload(
+        RoutingContext(
+            scripture="约3:16",
+            text="神爱世人",
+            user_question="背景？",
+            user_profile=UserProfile(profession="教师"),
+            raw_payload={
+                "scripture": "约3:16",
+                "text": "神爱世人",
+                "user_question": "背景？",
+                "user_profile": {"profession": "教师"},
+            },
+        ),
+        _role("LukeScribe"),
+    )
+
+    compacted, report = ContextCompactor().compact("LukeScribe", payload)
+
+    assert compacted == {"scripture": "约3:16", "text": "神爱世人", "handoff_note": "最终输出"}
+    assert "raw_payload" not in compacted
+    assert {"user_question", "user_profile", "role_reason"} <= set(report.dropped_fields)
+    assert report.tokens_saved > 0
+
+
+def test_budget_trims_oldest_history_then_concerns():
+    compactor = ContextCompactor(
+        {"BarnabasCompanion": CompactionPolicy(max_input_tokens=120)}, default_budget=None
+    )
+    payload = {
+        "scripture": "诗23:1",
+        "history_summary": "旧的灵修记录。" * 40 + "最近一次：感到平安。",
+        "user_profile": {"concerns": ["工作压力", "家庭关系", "健康"]},
+    }
+
+    compacted, report = compactor.compact("BarnabasCompanion", payload)
+
+    assert report.tokens_after <= 120
+    assert compacted["scripture"] == "诗23:1"
+    assert compacted["history_summary"].endswith("最近一次：感到平安。")
+    assert compacted["history_summary"].startswith("…")
+    assert report.trimmed_fields == ["history_summary"]
+    assert compactor.stats()["BarnabasCompanion"]["tokens_saved"] == report.tokens_saved
+
+
+def test_meta_router_policy_keeps_all_fields():
+    compacted, report = ContextCompactor().compact(
+        "MetaRouter", {"scripture": "约3:16", "custom": "保留"}
+    )
+
+    assert compacted == {"scripture": "约3:16", "custom": "保留"}
+    assert report.tokens_saved == 0
+
+
+def test_executor_sends_compacted_payload():
+    seen = []
+
+    def llm_call(prompt, payload):
+        seen.append(payload)
+        return "ok"
+
+    executor = PromptRoleExecutor(llm_call, "antioch_teacher", compactor=ContextCompactor())
+    context = RoutingContext(
+        scripture="约3:16",
+        user_question="什么是永生？",
+        raw_payload={"scripture": "约3:16", "user_question": "什么是永生？"},
+    )
+
+    asyncio.run(executor(context, _role("AntiochTeacher")))
+
+    assert set(seen[0]) == {"scripture", "user_question", "handoff_note"}
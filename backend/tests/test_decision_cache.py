@@ -0,0 +1,68 @@
+import asyncio
+import json
+
+from backend.devolight_router.models import RoutingContext
+from backend.devolight_router.services.cache import InMemoryCache, SQLiteCache
+from backend.devolight_router.services.meta_client import DecisionCache, MetaRouterClient
+
+DECISION = {
+    "mode": "single",
+    "selected_roles": [
+        {"name": "LukeScribe", "score": 0.9, "reason": "历史背景", "handoff_note": "最终输出"}
+    ],
+    "overall_rationale": "单角色即可。",
+    "fallback_plan": "无",
+    "warnings": [],
+}
+
+
+def test_in_memory_cache_evicts_lru_and_expires_entries():
+    now = [0.0]
+    cache = InMemoryCache(max_entries=2, default_ttl=10.0, clock=lambda: now[0])
+    cache.set("a", "1")
+    cache.set("b", "2")
+    assert cache.get("a") == "1"
+    cache.set("c", "3")
+
+    assert cache.get("b") is None
+    now[0] = 11.0
+    assert cache.get("a") is None
+    assert cache.stats.evictions == 1
+    assert cache.stats.expirations == 1
+
+
+def test_sqlite_cache_persists_and_bounds_entries(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = SQLiteCache(path, max_entries=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.set("c", "3")
+    cache.close()
+
+    reopened = SQLiteCache(path, max_entries=2)
+    assert reopened.get("a") is None
+    assert reopened.get("c") == "3"
+    reopened.close()
+
+
+def test_meta_router_reuses_cached_decision_for_equivalent_payloads():
+    calls = []
+
+    def llm_call(prompt, payload):
+        calls.append(payload)
+        return json.dumps(DECISION, ensure_ascii=False)
+
+    cache = DecisionCache(InMemoryCache())
+    client = MetaRouterClient(llm_call, decision_cache=cache)
+
+    async def scenario():
+        first = await client.route(RoutingContext(raw_payload={"scripture": "约3:16"}))
+        second = await client.route(RoutingContext(raw_payload={"scripture": " 约3:16 ", "text": ""}))
+        return first, second
+
+    first, second = asyncio.run(scenario())
+
+    assert len(calls) == 1
+    assert first == second
+    assert cache.stats.hits == 1
+    assert cache.stats.misses == 1
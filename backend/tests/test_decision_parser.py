@@ -0,0 +1,114 @@
+import asyncio
+import json
+
+import pytest
+
+from backend.devolight_router.models import RoutingContext, RoutingDecision
+from backend.devolight_router.services.decision_parser import (
+    DecisionParseError,
+    parse_decision,
+    scan_json_objects,
+    validate_decision,
+)
+from backend.devolight_router.services.meta_client import MetaRouterClient, MetaRouterResponseError
+
+DECISION = {
+    "mode": "smart",
+    "selected_roles": [
+        {"name": "AntiochTeacher", "score": 0.9, "reason": "神学 {脉络}", "handoff_note": "交给\"马大\""},
+        {"name": "MarthaMentor", "score": 1, "reason": "应用", "handoff_note": "最终输出"},
+    ],
+    "overall_rationale": "先神学后应用。",
+    "fallback_plan": "无",
+    "warnings": [],
+}
+RAW = json.dumps(DECISION, ensure_ascii=False)
+
+
+@pytest.mark.parametrize(
+    "response",
+    [
+        RAW,
+        f"```json\n{RAW}\n```",
+        f"```JSON {RAW}```",
+        f"好的，以下是路由结果（格式 {{...}}）：\n{RAW}\n希望有帮助。",
+        f'{{"note": "先说明"}} 然后 {RAW}',
+    ],
+)
+def test_decision_is_extracted_from_prose_and_fences(response):
+    assert parse_decision(response) == RoutingDecision.parse_obj(DECISION)
+
+
+def test_scanner_ignores_braces_in_strings_and_reports_truncation():
+    text = 'x {"a": "}\\"{"} y {"b": {"c": 1}} z {"d": "'
+    spans = list(scan_json_objects(text))
+
+    assert [text[start:end] for start, end in spans[:2]] == ['{"a": "}\\"{"}', '{"b": {"c": 1}}']
+    assert spans[2] == (text.index('{"d"'), None)
+    with pytest.raises(DecisionParseError) as excinfo:
+        parse_decision("决策如下：" + RAW[:60])
+    assert excinfo.value.partial == RAW[:60]
+
+
+@pytest.mark.parametrize(
+    "obj",
+    [
+        DECISION,
+        {**DECISION, "extra": "ignored"},
+        {"mode": "halt", "overall_rationale": "缺经文", "fallback_plan": "补充"},
+        {**DECISION, "selected_roles": [{**DECISION["selected_roles"][0], "score": "0.5"}]},
+    ],
+)
+def test_fast_validation_matches_pydantic(obj):
+    decision = validate_decision(obj)
+
+    assert decision == RoutingDecision.parse_obj(obj)
+    assert decision.__fields_set__ == RoutingDecision.parse_obj(obj).__fields_set__
+
+
+@pytest.mark.parametrize(
+    "obj",
+    [
+        {**DECISION, "mode": "single"},
+        {**DECISION, "selected_roles": [{**DECISION["selected_roles"][0], "name": "Paul"}]},
+        {**DECISION, "selected_roles": [{**DECISION["selected_roles"][0], "score": 1.5}]},
+        {"mode": "halt", "selected_roles": DECISION["selected_roles"], "overall_rationale": "", "fallback_plan": ""},
+    ],
+)
+def test_fast_validation_rejects_what_pydantic_rejects(obj):
+    with pytest.raises(DecisionParseError):
+        validate_decision(obj)
+
+
+def test_truncated_response_is_repaired_with_a_short_continuation():
+    calls = []
+
+    def llm_call(prompt, payload):
+        calls.append(payload)
+        if "partial_response" in payload:
+            return RAW[len(payload["partial_response"]) :]
+        return "```json\n" + RAW[:120]
+
+    decision = asyncio.run(MetaRouterClient(llm_call).route(RoutingContext(scripture="约3:16")))
+
+    assert decision == RoutingDecision.parse_obj(DECISION)
+    assert calls[1] == {"partial_response": RAW[:120]}
+
+
+def test_failed_repair_raises_the_original_error():
+    calls = []
+
+    def llm_call(prompt, payload):
+        calls.append(payload)
+        return "抱歉，我无法给出决定。"
+
+    client = MetaRouterClient(llm_call)
+    with pytest.raises(MetaRouterResponseError, match="不是合法 JSON"):
+        asyncio.run(client.route(RoutingContext(scripture="约3:16")))
+    assert calls[1]["previous_response"] == "抱歉，我无法给出决定。"
+
+    calls.clear()
+    no_repair = MetaRouterClient(llm_call, repair_prompt_name=None)
+    with pytest.raises(MetaRouterResponseError):
+        asyncio.run(no_repair.route(RoutingContext(scripture="约3:16")))
+    assert len(calls) == 1
@@ -0,0 +1,200 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from backend.devolight_router.batch import BatchRunner
+from backend.devolight_router.models import RoutingContext, RoutingDecision, RoutingMode, SelectedRole
+from backend.devolight_router.services.cache import InMemoryCache
+from backend.devolight_router.services.degradation import DegradationPolicy
+from backend.devolight_router.services.executor import build_default_orchestrator
+from backend.devolight_router.services.llm_client import ClaudeMessagesError
+from backend.devolight_router.services.meta_client import MetaRouterClient
+from backend.devolight_router.services.role_cache import RoleOutputCache
+from backend.devolight_router.services.router import RouterService
+from backend.devolight_router.services.scheduler import SchedulerOverloadedError
+from backend.devolight_router.services.sessions import InMemorySessionRepository
+from backend.devolight_router.warmup import warm_role_cache
+
+
+def _single(role_name):
+    return RoutingDecision(
+        mode=RoutingMode.SINGLE,
+        selected_roles=[
+            SelectedRole(name=role_name, score=0.9, reason="测试。", handoff_note="最终输出")
+        ],
+        overall_rationale="测试。",
+        fallback_plan="无。",
+    )
+
+
+def test_late_role_serves_stale_output_and_refreshes_it_in_the_background():
+    cache = RoleOutputCache(InMemoryCache(), keep_stale=True)
+    context = RoutingContext(scripture="路2:1")
+    calls = []
+
+    async def llm_call(prompt, payload):
+        calls.append(payload["scripture"])
+        await asyncio.sleep(0.2)
+        return "新的输出"
+
+    async def scenario():
+        # left behind by an earlier prompt version, so only the stale entry matches
+        role = _single("LukeScribe").selected_roles[0]
+        await cache.put("role:old", "LukeScribe", "旧的输出", stale_key=cache.stale_key(role, context))
+        policy = DegradationPolicy(cache)
+        orchestrator = build_default_orchestrator(
+            llm_call, output_cache=cache, role_timeout=0.05, degradation=policy
+        )
+        [result] = await orchestrator.run(context, _single("LukeScribe"))
+        refreshing = policy.stats()["refreshing"]
+        await asyncio.sleep(0.3)
+        return result, refreshing, await cache.get_stale(role, context), policy.stats()
+
+    result, refreshing, refreshed, stats = asyncio.run(scenario())
+
+    assert (result.content, result.freshness, result.error) == ("旧的输出", "stale", None)
+    assert result.degraded_reason.startswith("角色 LukeScribe 未能在")
+    assert refreshing == 1
+    assert calls == ["路2:1"]
+    assert refreshed == "新的输出"
+    assert stats["stale"] == 1 and stats["refreshing"] == 0
+
+
+def test_request_deadline_bounds_latency_and_falls_back_to_the_stub():
+    decision = _single("MarthaMentor")
+
+    async def llm_call(prompt, payload):
+        if "selected_roles" in prompt:
+            return decision.json()
+        await asyncio.sleep(5)
+        return "不会返回"
+
+    async def scenario():
+        # MarthaMentor is personalised, so nothing is kept as a stale copy for it
+        cache = RoleOutputCache(InMemoryCache(), keep_stale=True)
+        policy = DegradationPolicy(cache)
+        service = RouterService(
+            meta_client=MetaRouterClient(llm_call),
+            orchestrator=build_default_orchestrator(
+                llm_call, output_cache=cache, degradation=policy
+            ),
+            request_timeout=0.2,
+            degradation=policy,
+        )
+        started = time.perf_counter()
+        result = await service.route("s", {"scripture": "约3:16", "user_question": "如何应用？"})
+        elapsed = time.perf_counter() - started
+        await policy.aclose()
+        return result, elapsed
+
+    result, elapsed = asyncio.run(scenario())
+
+    assert elapsed < 1.0
+    [output] = result.role_outputs
+    assert output.freshness == "stub"
+    assert output.content.startswith("马大姊妹 响应 约3:16")
+    assert any("简化的备用内容" in warning for warning in result.warnings)
+
+
+def test_meta_router_failure_degrades_to_a_single_role_instead_of_halting():
+    async def llm_call(prompt, payload):
+        if "selected_roles" in prompt:
+            raise ClaudeMessagesError("上游繁忙", status_code=529)
+        return "安提阿老师的讲解"
+
+    policy = DegradationPolicy()
+    service = RouterService(
+        meta_client=MetaRouterClient(llm_call),
+        orchestrator=build_default_orchestrator(llm_call, degradation=policy),
+        degradation=policy,
+    )
+
+    result = asyncio.run(service.route("s", {"scripture": "约3:16"}))
+
+    assert result.decision.mode == RoutingMode.SINGLE
+    assert [output.content for output in result.role_outputs] == ["安提阿老师的讲解"]
+    assert [output.freshness for output in result.role_outputs] == ["fresh"]
+    assert "上游繁忙" in result.warnings
+    assert policy.stats()["decisions"] == 1
+
+
+def test_overload_and_bugs_are_not_degraded():
+    async def shed_roles(prompt, payload):
+        if "selected_roles" in prompt:
+            return _single("LukeScribe").json()
+        raise SchedulerOverloadedError("繁忙", 3.0)
+
+    async def shed_meta(prompt, payload):
+        raise SchedulerOverloadedError("繁忙", 3.0)
+
+    async def broken_meta(prompt, payload):
+        raise TypeError("bug")
+
+    def service(llm_call):
+        policy = DegradationPolicy()
+        return RouterService(
+            meta_client=MetaRouterClient(llm_call),
+            orchestrator=build_default_orchestrator(llm_call, degradation=policy),
+            degradation=policy,
+        )
+
+    for llm_call, expected in (
+        (shed_roles, SchedulerOverloadedError),
+        (shed_meta, SchedulerOverloadedError),
+        (broken_meta, TypeError),
+    ):
+        with pytest.raises(expected):
+            asyncio.run(service(llm_call).route("s", {"scripture": "路2:1"}))
+
+
+def test_degraded_outputs_are_not_saved_or_counted_as_successes():
+    async def down(prompt, payload):
+        if "selected_roles" in prompt:
+            return _single("LukeScribe").json()
+        raise ClaudeMessagesError("上游故障", status_code=500)
+
+    policy = DegradationPolicy()
+    orchestrator = build_default_orchestrator(down, degradation=policy)
+    repository = InMemorySessionRepository()
+    service = RouterService(
+        meta_client=MetaRouterClient(down),
+        orchestrator=orchestrator,
+        session_repository=repository,
+        degradation=policy,
+    )
+    runner = BatchRunner(service)
+    lines = [json.dumps({"id": "a", "payload": {"scripture": "路2:1"}})]
+
+    async def scenario():
+        records = [record async for record in runner.run(lines)]
+        report = await warm_role_cache(
+            orchestrator, RoleOutputCache(InMemoryCache()), [{"scripture": "路2:1"}]
+        )
+        return records, report
+
+    records, report = asyncio.run(scenario())
+
+    assert "result" not in records[0] and "LukeScribe" in records[0]["error"]
+    assert (runner.report.succeeded, runner.report.failed) == (0, 1)
+    assert repository.get("a") is None
+    assert (report.outputs, report.failed) == (0, 2)
+
+
+def test_invalid_meta_router_decision_still_halts():
+    async def llm_call(prompt, payload):
+        return "这不是 JSON" if "selected_roles" in prompt else "不应被调用"
+
+    policy = DegradationPolicy()
+    service = RouterService(
+        meta_client=MetaRouterClient(llm_call),
+        orchestrator=build_default_orchestrator(llm_call, degradation=policy),
+        degradation=policy,
+    )
+
+    result = asyncio.run(service.route("s", {"scripture": "约3:16"}))
+
+    assert result.decision.mode == RoutingMode.HALT
+    assert result.role_outputs == []
+    assert policy.stats()["decisions"] == 0
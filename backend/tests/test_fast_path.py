@@ -0,0 +1,86 @@
+import asyncio
+import json
+
+from backend.devolight_router.models import RoutingMode
+from backend.devolight_router.services.executor import build_default_orchestrator
+from backend.devolight_router.services.fast_path import FastPathConfig, FastPathRouter
+from backend.devolight_router.services.meta_client import MetaRouterClient
+from backend.devolight_router.services.router import ContextBuilder, FallbackManager, RouterService
+
+
+def _context(**payload):
+    return ContextBuilder().build(payload, None)
+
+
+def test_missing_scripture_halts_locally():
+    router = FastPathRouter()
+
+    decision = router.route(_context(user_question="今天读什么？"))
+
+    assert decision.mode is RoutingMode.HALT
+    assert decision.warnings
+    assert router.stats()["hits"]["missing_scripture"] == 1
+
+
+def test_explicit_role_by_alias():
+    router = FastPathRouter()
+
+    decision = router.route(_context(scripture="约3:16", role="请马大姊妹回答"))
+
+    assert decision.mode is RoutingMode.SINGLE
+    assert [role.name for role in decision.selected_roles] == ["MarthaMentor"]
+
+
+def test_ambiguous_role_defers_to_llm():
+    router = FastPathRouter()
+
+    assert router.route(_context(scripture="约3:16", role="路加和马大")) is None
+    assert router.route(_context(scripture="约3:16", user_question="这节经文的意思？")) is None
+    assert router.stats()["misses"] == 2
+    assert router.stats()["hit_rate"] == 0.0
+
+
+def test_full_devotion_sequence():
+    decision = FastPathRouter().route(_context(scripture="约3:16", user_question="给我完整灵修"))
+
+    assert decision.mode is RoutingMode.SEQUENCE
+    assert [role.name for role in decision.selected_roles] == [
+        "AntiochTeacher",
+        "LukeScribe",
+        "MarthaMentor",
+        "BarnabasCompanion",
+    ]
+
+
+def test_rule_table_loads_from_json(tmp_path):
+    path = tmp_path / "rules.json"
+    path.write_text(
+        json.dumps({"rules": ["full_devotion"], "full_devotion_keywords": ["everything"]}),
+        encoding="utf-8",
+    )
+    router = FastPathRouter(FastPathConfig.from_file(str(path)))
+
+    assert router.route(_context(user_question="Everything please")).mode is RoutingMode.SEQUENCE
+    assert router.route(_context(role="路加")) is None
+
+
+def test_router_service_skips_meta_call_on_fast_path():
+    calls = []
+
+    def llm_call(prompt, payload):
+        calls.append(payload)
+        return "角色输出"
+
+    service = RouterService(
+        meta_client=MetaRouterClient(llm_call),
+        context_builder=ContextBuilder(),
+        orchestrator=build_default_orchestrator(),
+        fallback_manager=FallbackManager(),
+        pre_router=FastPathRouter(),
+    )
+
+    result = asyncio.run(service.route("s1", {"scripture": "约3:16", "role": "LukeScribe"}))
+
+    assert result.decision.mode is RoutingMode.SINGLE
+    assert calls == []
+    assert [output.role_name for output in result.role_outputs] == ["LukeScribe"]
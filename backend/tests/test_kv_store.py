@@ -0,0 +1,235 @@
+import socketserver
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend.devolight_router.models import RoleCallRecord, SessionState
+from backend.devolight_router.services.cache import build_cache_backend
+from backend.devolight_router.services.kv import (
+    KeyValueConflictError,
+    LocalKeyValueStore,
+    RedisKeyValueStore,
+)
+from backend.devolight_router.services.sessions import KeyValueSessionRepository
+
+
+class _FakeRedis:
+    """Just enough of the Redis protocol for the store: strings, TTL and WATCH."""
+
+    def __init__(self):
+        self.data = {}
+        self.revisions = {}
+        self.connections = 0
+        self.lock = threading.Lock()
+
+    def touch(self, key):
+        self.revisions[key] = self.revisions.get(key, 0) + 1
+
+    def read(self, key):
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.data[key]
+            return None
+        return value
+
+
+def _start_fake_redis():
+    fake = _FakeRedis()
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            with fake.lock:
+                fake.connections += 1
+            watched, queued = {}, None
+            while True:
+                command = self._read_command()
+                if command is None:
+                    return
+                name = command[0].upper()
+                if queued is not None and name != "EXEC":
+                    queued.append(command)
+                    self._write(b"+QUEUED\r\n")
+                    continue
+                with fake.lock:
+                    if name == "WATCH":
+                        watched[command[1]] = fake.revisions.get(command[1], 0)
+                        reply = b"+OK\r\n"
+                    elif name == "UNWATCH":
+                        watched.clear()
+                        reply = b"+OK\r\n"
+                    elif name == "MULTI":
+                        queued = []
+                        reply = b"+OK\r\n"
+                    elif name == "EXEC":
+                        stale = any(fake.revisions.get(key, 0) != rev for key, rev in watched.items())
+                        watched.clear()
+                        commands, queued = queued, None
+                        if stale:
+                            reply = b"*-1\r\n"
+                        else:
+                            replies = [self._apply(queued_command) for queued_command in commands]
+                            reply = b"*%d\r\n" % len(replies) + b"".join(replies)
+                    else:
+                        reply = self._apply(command)
+                self._write(reply)
+
+        def _apply(self, command):
+            name, args = command[0].upper(), command[1:]
+            if name == "PING":
+                return b"+PONG\r\n"
+            if name == "GET":
+                return self._bulk(fake.read(args[0]))
+            if name == "MGET":
+                return b"*%d\r\n" % len(args) + b"".join(self._bulk(fake.read(key)) for key in args)
+            if name == "SET":
+                expires_at = None
+                if len(args) == 4 and args[2].upper() == "PX":
+                    expires_at = time.monotonic() + int(args[3]) / 1000
+                fake.data[args[0]] = (args[1], expires_at)
+                fake.touch(args[0])
+                return b"+OK\r\n"
+            if name == "DEL":
+                removed = fake.data.pop(args[0], None) is not None
+                fake.touch(args[0])
+                return b":%d\r\n" % removed
+            return b"-ERR unknown command\r\n"
+
+        @staticmethod
+        def _bulk(value):
+            if value is None:
+                return b"$-1\r\n"
+            data = value.encode("utf-8")
+            return b"$%d\r\n%s\r\n" % (len(data), data)
+
+        def _read_command(self):
+            header = self.rfile.readline()
+            if not header:
+                return None
+            parts = []
+            for _ in range(int(header[1:-2])):
+                length = int(self.rfile.readline()[1:-2])
+                parts.append(self.rfile.read(length + 2)[:-2].decode("utf-8"))
+            return parts
+
+        def _write(self, data):
+            self.wfile.write(data)
+            self.wfile.flush()
+
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, fake, f"redis://127.0.0.1:{server.server_address[1]}/0"
+
+
+@pytest.fixture()
+def redis_url():
+    server, fake, url = _start_fake_redis()
+    yield url, fake
+    server.shutdown()
+    server.server_close()
+
+
+def test_redis_store_reads_writes_and_reuses_pooled_connections(redis_url):
+    url, fake = redis_url
+    store = RedisKeyValueStore(url, max_connections=2)
+    store.ping()
+    store.set("a", "经文")
+    store.set("b", "背景", ttl_seconds=0.05)
+
+    assert store.get("a") == "经文"
+    assert store.mget(["a", "missing", "b"]) == ["经文", None, "背景"]
+    time.sleep(0.1)
+    assert store.get("b") is None
+    store.delete("a")
+    assert store.get("a") is None
+    assert fake.connections == 1
+    store.close()
+
+
+def test_redis_update_retries_when_another_writer_wins(redis_url):
+    url, _ = redis_url
+    store = RedisKeyValueStore(url)
+    rival = RedisKeyValueStore(url)
+    store.set("counter", "1")
+    attempts = []
+
+    def increment(current):
+        attempts.append(current)
+        if len(attempts) == 1:
+            rival.set("counter", "10")  # lands between WATCH and EXEC
+        return str(int(current) + 1)
+
+    assert store.update("counter", increment) == "11"
+    assert attempts == ["1", "10"]
+    assert store.stats()["conflicts"] == 1
+
+    def always_lose(current):
+        rival.set("counter", "0")
+        return "x"
+
+    with pytest.raises(KeyValueConflictError):
+        store.update("counter", always_lose)
+    store.close()
+    rival.close()
+
+
+def test_concurrent_session_saves_from_two_workers_are_merged(redis_url):
+    url, _ = redis_url
+    worker_a = KeyValueSessionRepository(RedisKeyValueStore(url))
+    worker_b = KeyValueSessionRepository(RedisKeyValueStore(url))
+    worker_a.save(SessionState(session_id="s", summary="起初"))
+
+    state_a = worker_a.get("s")
+    state_b = worker_b.get("s")
+    started = datetime.utcnow()
+    state_a.recent_calls.append(RoleCallRecord(role_name="AntiochTeacher", timestamp=started))
+    state_a.last_known_spiritual_state = "平安"
+    state_b.recent_calls.append(
+        RoleCallRecord(role_name="LukeScribe", timestamp=started + timedelta(seconds=1))
+    )
+    state_b.summary = "讨论约3:16"
+    worker_a.save(state_a)
+    worker_b.save(state_b)
+
+    stored = worker_a.get("s")
+    assert [call.role_name for call in stored.recent_calls] == ["AntiochTeacher", "LukeScribe"]
+    assert stored.summary == "讨论约3:16"
+    assert stored.last_known_spiritual_state == "平安"
+    assert stored.version == 3
+    assert worker_b.merges == 1
+    assert state_b.version == 3
+    assert set(worker_b.get_many(["s", "other"])) == {"s"}
+
+
+def test_kv_cache_backend_shares_entries_through_the_store():
+    store = LocalKeyValueStore()
+    first = build_cache_backend("kv", max_entries=1, ttl_seconds=None, store=store)
+    second = build_cache_backend("kv", max_entries=1, ttl_seconds=None, store=store)
+
+    first.set("decision:abc", "{}")
+
+    assert second.get("decision:abc") == "{}"
+    assert second.get_many(["decision:abc", "decision:def"]) == ["{}", None]
+    assert second.stats.hits == 2 and second.stats.misses == 1
+    with pytest.raises(ValueError):
+        build_cache_backend("kv", max_entries=1, ttl_seconds=None)
+
+
+def test_local_store_sweeps_expired_keys_that_are_never_read():
+    now = [0.0]
+    store = LocalKeyValueStore(clock=lambda: now[0], min_sweep_size=4)
+    for index in range(3):
+        store.set(f"old:{index}", "x", ttl_seconds=1)
+    store.set("kept", "x")
+    now[0] = 5.0
+
+    for index in range(4):
+        store.set(f"new:{index}", "x", ttl_seconds=1)
+
+    assert len(store) == 5
+    assert store.get("kept") == "x"
@@ -0,0 +1,146 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from backend.devolight_router.services.llm_client import (
+    ClaudeMessagesCallable,
+    ClaudeMessagesError,
+    TransportSettings,
+    as_async_llm,
+)
+
+
+def _messages_handler(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(200, json={"content": [{"type": "text", "text": "平安"}]})
+
+
+def test_callable_reuses_injected_client_across_calls():
+    client = httpx.Client(transport=httpx.MockTransport(_messages_handler))
+    llm_call = ClaudeMessagesCallable(
+        api_key="key", base_url="http://claude.test", model="m", client=client
+    )
+
+    assert llm_call("prompt", {"scripture": "约3:16"}) == "平安"
+    assert llm_call("prompt", {"scripture": "约3:17"}) == "平安"
+    assert llm_call._get_client() is client
+
+    llm_call.close()
+    assert client.is_closed
+
+
+def test_option_variants_share_the_pool_and_usage_counters():
+    def handler(request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        return httpx.Response(
+            200,
+            json={
+                "content": [{"type": "text", "text": body["model"]}],
+                "usage": {"input_tokens": 10, "output_tokens": body["max_tokens"]},
+            },
+        )
+
+    client = httpx.Client(transport=httpx.MockTransport(handler))
+    llm_call = ClaudeMessagesCallable(
+        api_key="key", base_url="http://claude.test", model="m", client=client
+    )
+    summary = llm_call.with_options(model="small", max_output_tokens=300)
+
+    assert llm_call("prompt", {"scripture": "约3:16"}) == "m"
+    assert summary("prompt", {"scripture": "约3:16"}) == "small"
+    assert summary._get_client() is client
+    assert summary.usage is llm_call.usage
+    assert (llm_call.usage.calls, llm_call.usage.input_tokens) == (2, 20)
+
+
+def test_option_variants_create_the_shared_pools_lazily():
+    llm_call = ClaudeMessagesCallable(api_key="key", base_url="http://claude.test", model="m")
+    summary = llm_call.with_options(model="small").with_options(max_output_tokens=300)
+
+    assert (llm_call._client, llm_call._async_client) == (None, None)
+    async_client = summary._get_async_client()
+    assert llm_call._async_client is async_client
+    assert llm_call._client is None
+    asyncio.run(llm_call.aclose())
+
+
+def test_async_call_uses_async_client_and_closes_it():
+    async_client = httpx.AsyncClient(transport=httpx.MockTransport(_messages_handler))
+    llm_call = ClaudeMessagesCallable(
+        api_key="key", base_url="http://claude.test", model="m", async_client=async_client
+    )
+
+    async def scenario():
+        adapted = as_async_llm(llm_call)
+        text = await adapted("prompt", {"scripture": "约3:16"})
+        await llm_call.aclose()
+        return text
+
+    assert asyncio.run(scenario()) == "平安"
+    assert async_client.is_closed
+
+
+def test_sync_callable_is_adapted_to_async_contract():
+    adapted = as_async_llm(lambda prompt, payload: f"{prompt}:{payload['scripture']}")
+
+    assert asyncio.run(adapted("p", {"scripture": "诗23:1"})) == "p:诗23:1"
+
+
+def test_transport_settings_reject_invalid_pool(monkeypatch):
+    monkeypatch.setenv("DEVO_CLAUDE_POOL_SIZE", "2")
+    monkeypatch.setenv("DEVO_CLAUDE_POOL_KEEPALIVE", "5")
+
+    with pytest.raises(ClaudeMessagesError):
+        TransportSettings.from_environment()
+
+
+def test_prompt_cache_marks_system_and_stable_fields_and_records_usage():
+    bodies = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        bodies.append(json.loads(request.content))
+        return httpx.Response(
+            200,
+            json={
+                "content": [{"type": "text", "text": "平安"}],
+                "usage": {"input_tokens": 12, "output_tokens": 5, "cache_read_input_tokens": 900},
+            },
+        )
+
+    llm_call = ClaudeMessagesCallable(
+        api_key="key",
+        base_url="http://claude.test",
+        model="m",
+        client=httpx.Client(transport=httpx.MockTransport(handler)),
+        cacheable_payload_keys=("scripture",),
+    )
+    llm_call("系统提示", {"scripture": "约3:16", "user_question": "何为永生？"})
+
+    system, content = bodies[0]["system"], bodies[0]["messages"][0]["content"]
+    assert system[0]["cache_control"] == {"type": "ephemeral"}
+    assert json.loads(content[0]["text"]) == {"scripture": "约3:16"}
+    assert "cache_control" in content[0] and "cache_control" not in content[1]
+    assert llm_call.usage.cache_read_input_tokens == 900
+    assert llm_call.usage.output_tokens == 5
+
+
+def test_prompt_cache_can_be_disabled_for_plain_proxies():
+    bodies = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        bodies.append(json.loads(request.content))
+        return _messages_handler(request)
+
+    llm_call = ClaudeMessagesCallable(
+        api_key="key",
+        base_url="http://claude.test",
+        model="m",
+        client=httpx.Client(transport=httpx.MockTransport(handler)),
+        prompt_cache=False,
+        cacheable_payload_keys=("scripture",),
+    )
+    llm_call("系统提示", {"scripture": "约3:16"})
+
+    assert bodies[0]["system"] == "系统提示"
+    assert len(bodies[0]["messages"][0]["content"]) == 1
@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+
+from backend.benchmarks.bench_load import CONFIGURATIONS, run_configuration, synthetic_traffic
+from backend.benchmarks.fake_claude import FakeClaudeConfig, start_fake_claude
+from backend.devolight_router.services.llm_client import ClaudeMessagesCallable, ClaudeMessagesError
+
+
+def test_fake_server_streams_and_reports_usage():
+    server, base_url = start_fake_claude(config=FakeClaudeConfig(stream_chunks=3, output_tokens=42))
+    llm = ClaudeMessagesCallable(api_key="test", base_url=base_url, model="fake")
+
+    async def collect():
+        try:
+            return [chunk async for chunk in llm.astream("角色提示", {"scripture": "约3:16"})]
+        finally:
+            await llm.aclose()
+
+    try:
+        chunks = asyncio.run(collect())
+    finally:
+        server.shutdown()
+
+    assert len(chunks) == 3
+    assert "".join(chunks) == FakeClaudeConfig().role_text
+    assert llm.usage.output_tokens == 42
+
+
+def test_fake_server_injects_retryable_errors():
+    server, base_url = start_fake_claude(config=FakeClaudeConfig(error_rate=1.0))
+    llm = ClaudeMessagesCallable(api_key="test", base_url=base_url, model="fake")
+    try:
+        with pytest.raises(ClaudeMessagesError) as excinfo:
+            llm("提示", {"scripture": "约3:16"})
+    finally:
+        llm.close()
+        server.shutdown()
+
+    assert excinfo.value.retryable
+
+
+def test_load_run_reports_percentiles_and_throughput():
+    result = asyncio.run(
+        run_configuration(
+            CONFIGURATIONS["async-parallel-cache"], synthetic_traffic(20), 200.0, FakeClaudeConfig()
+        )
+    )
+    report = result.to_dict()
+
+    assert result.sent == 20
+    assert result.succeeded == 20
+    assert 0 < report["p50_ms"] <= report["p99_ms"]
+    assert report["throughput_rps"] > 0
+    assert report["peak_rss_mb"] > 0
@@ -0,0 +1,148 @@
+import json
+import logging
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.devolight_router.container import build_container
+from backend.devolight_router.main import app, get_container
+from backend.devolight_router.services import observability
+from backend.devolight_router.services.observability import (
+    MetricsRegistry,
+    configure_payload_logging,
+    configure_pricing,
+    log_payload,
+    observe_usage,
+    render_stats,
+    stage_timer,
+)
+from backend.devolight_router.services.serialization import EncodedPayload
+
+DECISION = {
+    "mode": "single",
+    "selected_roles": [
+        {"name": "LukeScribe", "score": 0.9, "reason": "背景", "handoff_note": "最终输出"}
+    ],
+    "overall_rationale": "历史背景。",
+    "fallback_plan": "无",
+    "warnings": [],
+}
+
+
+def test_registry_renders_prometheus_histogram_and_counter():
+    registry = MetricsRegistry()
+    latency = registry.histogram("demo_seconds", "Demo latency.", ("stage",), buckets=(0.1, 1.0))
+    errors = registry.counter("demo_errors_total", "Demo errors.", ("error",))
+    latency.observe(0.05, stage="meta")
+    latency.observe(0.5, stage="meta")
+    errors.inc(error="Timeout")
+
+    text = registry.render()
+
+    assert '# TYPE demo_seconds histogram' in text
+    assert 'demo_seconds_bucket{stage="meta",le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{stage="meta",le="+Inf"} 2' in text
+    assert 'demo_seconds_count{stage="meta"} 2' in text
+    assert 'demo_errors_total{error="Timeout"} 1' in text
+    assert registry.counter("demo_errors_total", "again") is errors
+
+
+def test_stage_timer_counts_errors_by_class():
+    before = observability.STAGE_SECONDS.count(stage="test_stage", role="")
+
+    with pytest.raises(KeyError):
+        with stage_timer("test_stage"):
+            raise KeyError("x")
+
+    assert observability.STAGE_SECONDS.count(stage="test_stage", role="") == before + 1
+    assert observability.STAGE_ERRORS.value(stage="test_stage", error="KeyError") >= 1
+
+
+def test_observe_usage_records_tokens_and_cost():
+    configure_pricing(input_per_mtok=3.0, output_per_mtok=15.0)
+    try:
+        before = observability.LLM_COST.value(model="cost-test")
+        observe_usage(
+            "cost-test",
+            {"input_tokens": 1000, "output_tokens": 100, "cache_read_input_tokens": 10000},
+            ("input_tokens", "output_tokens", "cache_read_input_tokens"),
+        )
+    finally:
+        configure_pricing()
+
+    expected = (1000 * 3.0 + 100 * 15.0 + 10000 * 3.0 * 0.1) / 1_000_000
+    assert observability.LLM_COST.value(model="cost-test") - before == pytest.approx(expected)
+    assert observability.LLM_TOKENS.count(model="cost-test", kind="cache_read_input") == 1
+
+
+def test_log_payload_is_sampled_and_redacted(caplog):
+    logger = logging.getLogger("devolight.test.payload")
+    logger.propagate = True
+    try:
+        configure_payload_logging(sample_rate=0.0)
+        with caplog.at_level(logging.INFO, logger=logger.name):
+            log_payload(logger, "payload", {"scripture": "约3:16"})
+        assert caplog.records == []
+
+        configure_payload_logging(sample_rate=1.0, redact=True)
+        with caplog.at_level(logging.INFO, logger=logger.name):
+            log_payload(logger, "payload", {"scripture": "约3:16", "user_question": "我的秘密"})
+    finally:
+        configure_payload_logging()
+
+    message = caplog.records[0].getMessage()
+    assert "约3:16" in message
+    assert "我的秘密" not in message
+    assert "redacted" in message
+
+
+def test_encoded_payload_without_private_fields_is_logged_without_reencoding(caplog, monkeypatch):
+    logger = logging.getLogger("devolight.test.encoded")
+    logger.propagate = True
+    payload = EncodedPayload({"scripture": "约3:16", "handoff_note": "最终输出"})
+    expected = payload.json
+
+    def fail(value, **kwargs):
+        raise AssertionError("re-encoded")
+
+    monkeypatch.setattr(observability, "dumps_str", fail)
+    configure_payload_logging(sample_rate=1.0, redact=True)
+    try:
+        with caplog.at_level(logging.INFO, logger=logger.name):
+            log_payload(logger, "payload", payload)
+    finally:
+        configure_payload_logging()
+
+    assert caplog.records[0].getMessage() == f"payload: {expected}"
+
+
+def test_render_stats_flattens_numeric_leaves():
+    text = render_stats(
+        {
+            "decision_cache": {"hits": 3, "hit_rate": 0.5},
+            "llm_resilience": {"circuits": {"a": "closed"}},
+        }
+    )
+
+    assert "devolight_decision_cache_hits 3" in text
+    assert "devolight_decision_cache_hit_rate 0.5" in text
+    assert "closed" not in text
+
+
+def test_metrics_endpoint_reports_stage_latency():
+    container = build_container(
+        llm_call=lambda prompt, payload: json.dumps(DECISION, ensure_ascii=False)
+    )
+    app.dependency_overrides[get_container] = lambda: container
+    try:
+        client = TestClient(app)
+        client.post("/route", params={"session_id": "m1"}, json={"scripture": "约3:16"})
+        response = client.get("/metrics")
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'devolight_stage_seconds_count{stage="meta_router",role=""}' in response.text
+    assert 'devolight_stage_seconds_count{stage="role",role="LukeScribe"}' in response.text
+    assert "devolight_decision_cache_misses" in response.text
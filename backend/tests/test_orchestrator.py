@@ -0,0 +1,79 @@
+import asyncio
+import time
+
+from backend.devolight_router.models import RoutingContext, RoutingDecision
+from backend.devolight_router.services.router import ExecutionOrchestrator, ExecutionPlanner
+
+
+def _decision(mode, *roles):
+    return RoutingDecision.parse_obj(
+        {
+            "mode": mode,
+            "selected_roles": [
+                {"name": name, "score": 0.9, "reason": "测试", "handoff_note": note}
+                for name, note in roles
+            ],
+            "overall_rationale": "测试",
+            "fallback_plan": "无",
+        }
+    )
+
+
+def _sleeping_executor(delay):
+    async def executor(context, role):
+        await asyncio.sleep(delay)
+        return role.name
+
+    return executor
+
+
+def test_planner_serializes_sequence_and_named_handoffs():
+    planner = ExecutionPlanner()
+    sequence = _decision("sequence", ("AntiochTeacher", "交给路加"), ("LukeScribe", "最终输出"))
+    smart = _decision(
+        "smart",
+        ("AntiochTeacher", "请交给马大姊妹延伸应用。"),
+        ("BarnabasCompanion", "最终输出"),
+        ("MarthaMentor", "最终输出"),
+    )
+
+    assert planner.plan(sequence) == [[0], [1]]
+    assert planner.plan(smart) == [[0, 1], [2]]
+
+
+def test_independent_roles_run_concurrently_in_decision_order():
+    names = ["AntiochTeacher", "LukeScribe", "MarthaMentor", "BarnabasCompanion"]
+    delays = {"AntiochTeacher": 0.08, "LukeScribe": 0.02, "MarthaMentor": 0.05, "BarnabasCompanion": 0.01}
+    orchestrator = ExecutionOrchestrator(
+        {name: _sleeping_executor(delay) for name, delay in delays.items()}
+    )
+    decision = _decision("smart", *[(name, "最终输出") for name in names])
+
+    started = time.perf_counter()
+    results = asyncio.run(orchestrator.run(RoutingContext(scripture="约3:16"), decision))
+    elapsed = time.perf_counter() - started
+
+    assert [result.content for result in results] == names
+    assert elapsed < sum(delays.values())
+
+
+def test_concurrency_limit_of_one_runs_roles_serially():
+    active = 0
+    peak = 0
+
+    async def executor(context, role):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        return role.name
+
+    orchestrator = ExecutionOrchestrator(
+        {"AntiochTeacher": executor, "BarnabasCompanion": executor}, max_concurrency=1
+    )
+    decision = _decision("smart", ("AntiochTeacher", "最终输出"), ("BarnabasCompanion", "最终输出"))
+
+    asyncio.run(orchestrator.run(RoutingContext(scripture="约3:16"), decision))
+
+    assert peak == 1
@@ -0,0 +1,84 @@
+import asyncio
+import os
+
+import pytest
+
+from backend.devolight_router.models import RoutingContext, SelectedRole
+from backend.devolight_router.prompts import PromptRegistry, load_variant_weights, prompt_assignment
+from backend.devolight_router.services.cache import InMemoryCache
+from backend.devolight_router.services.executor import PromptRoleExecutor
+from backend.devolight_router.services.role_cache import RoleOutputCache
+
+
+def _write(path, text, mtime_ns=None):
+    path.write_text(text, encoding="utf-8")
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_prompts_load_lazily_and_reload_after_edits(tmp_path):
+    _write(tmp_path / "luke_scribe.md", "旧提示词", mtime_ns=1_000_000_000)
+    registry = PromptRegistry(tmp_path)
+
+    assert registry.stats()["loaded"] == 0
+    first = registry.get("luke_scribe")
+    assert first.text == "旧提示词"
+    assert registry.reload_changed() == []
+
+    _write(tmp_path / "luke_scribe.md", "新的提示词内容", mtime_ns=2_000_000_000)
+    assert registry.reload_changed() == ["luke_scribe"]
+    second = registry.get("luke_scribe")
+    assert second.text == "新的提示词内容"
+    assert second.hash != first.hash
+
+    (tmp_path / "luke_scribe.md").unlink()
+    assert registry.reload_changed() == []
+    assert registry.get("luke_scribe").text == "新的提示词内容"
+    with pytest.raises(FileNotFoundError):
+        registry.get("missing")
+
+
+def test_variants_split_traffic_by_assignment_key(tmp_path):
+    _write(tmp_path / "martha_mentor.md", "基础版")
+    _write(tmp_path / "martha_mentor.concise.md", "精简版")
+    (tmp_path / "variants.json").write_text('{"martha_mentor": {"concise": 0.5}}', encoding="utf-8")
+    registry = PromptRegistry(tmp_path)
+    registry.set_variant_weights(load_variant_weights(str(tmp_path / "variants.json")))
+
+    assert registry.variants("martha_mentor") == ["concise"]
+    assert registry.preload() == ["martha_mentor"]
+    assert registry.select("martha_mentor").variant is None  # no assignment key
+    assigned = {}
+    for index in range(200):
+        with prompt_assignment(f"session-{index}"):
+            assigned[index] = registry.select("martha_mentor").label
+            assert registry.select("martha_mentor").label == assigned[index]
+    share = sum(label == "martha_mentor.concise" for label in assigned.values()) / len(assigned)
+    assert 0.35 < share < 0.65
+
+    registry.set_variant_weights({"martha_mentor": {"missing": 1.0}})
+    with prompt_assignment("session-1"):
+        assert registry.select("martha_mentor").text == "基础版"
+
+
+def test_executor_picks_up_reloaded_prompt_and_new_cache_key(tmp_path):
+    _write(tmp_path / "luke_scribe.md", "版本一", mtime_ns=1_000_000_000)
+    registry = PromptRegistry(tmp_path)
+    prompts_seen = []
+
+    def llm_call(prompt, payload):
+        prompts_seen.append(prompt)
+        return f"输出 {len(prompts_seen)}"
+
+    executor = PromptRoleExecutor(
+        llm_call, "luke_scribe", output_cache=RoleOutputCache(InMemoryCache()), prompts=registry
+    )
+    context = RoutingContext(scripture="约3:16")
+    role = SelectedRole(name="LukeScribe", score=0.9, reason="背景", handoff_note="最终输出")
+
+    assert asyncio.run(executor(context, role)) == "输出 1"
+    assert asyncio.run(executor(context, role)) == "输出 1"
+    _write(tmp_path / "luke_scribe.md", "版本二", mtime_ns=2_000_000_000)
+    registry.reload_changed()
+    assert asyncio.run(executor(context, role)) == "输出 2"
+    assert prompts_seen == ["版本一", "版本二"]
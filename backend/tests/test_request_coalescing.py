@@ -0,0 +1,64 @@
+import asyncio
+import json
+
+from backend.devolight_router.services.executor import build_default_orchestrator
+from backend.devolight_router.services.meta_client import MetaRouterClient
+from backend.devolight_router.services.router import RouterService
+from backend.devolight_router.services.sessions import InMemorySessionRepository
+
+DECISION = {
+    "mode": "single",
+    "selected_roles": [
+        {"name": "MarthaMentor", "score": 0.9, "reason": "生活应用", "handoff_note": "最终输出"}
+    ],
+    "overall_rationale": "应用为主。",
+    "fallback_plan": "无",
+    "warnings": [],
+}
+
+
+def _service(calls, repository=None):
+    async def llm_call(prompt, payload):
+        calls.append(payload)
+        await asyncio.sleep(0.02)
+        return json.dumps(DECISION, ensure_ascii=False)
+
+    return RouterService(
+        meta_client=MetaRouterClient(llm_call),
+        orchestrator=build_default_orchestrator(),
+        session_repository=repository if repository is not None else InMemorySessionRepository(),
+    )
+
+
+def test_identical_inflight_requests_share_one_pipeline():
+    calls = []
+    service = _service(calls)
+
+    async def scenario():
+        payload = {"scripture": "腓4:6"}
+        return await asyncio.gather(*(service.route("s-1", dict(payload)) for _ in range(5)))
+
+    results = asyncio.run(scenario())
+
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert service.stats()["coalesced_requests"] == 4
+    assert service.stats()["inflight"] == 0
+
+
+def test_different_payloads_for_one_session_are_serialized():
+    calls = []
+    repository = InMemorySessionRepository()
+    service = _service(calls, repository)
+
+    async def scenario():
+        await asyncio.gather(
+            service.route("s-1", {"scripture": "腓4:6"}),
+            service.route("s-1", {"scripture": "腓4:7"}),
+        )
+
+    asyncio.run(scenario())
+
+    assert len(calls) == 2
+    assert len(repository.get("s-1").recent_calls) == 2
+    assert service.stats()["locked_sessions"] == 0
@@ -0,0 +1,135 @@
+import asyncio
+import json
+
+import pytest
+
+from backend.devolight_router.services.executor import build_default_orchestrator
+from backend.devolight_router.services.llm_client import ClaudeMessagesError
+from backend.devolight_router.services.meta_client import MetaRouterClient
+from backend.devolight_router.services.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    HedgedLLMCallable,
+    LatencyTracker,
+    ResilientLLMCallable,
+    RetryPolicy,
+)
+from backend.devolight_router.services.router import RouterService
+
+
+def test_retries_honor_retry_after_then_succeed():
+    attempts = []
+    delays = []
+
+    async def flaky(prompt, payload):
+        attempts.append(prompt)
+        if len(attempts) < 3:
+            raise ClaudeMessagesError("busy", status_code=429, retry_after=1.5)
+        return "ok"
+
+    async def fake_sleep(seconds):
+        delays.append(seconds)
+
+    llm = ResilientLLMCallable(flaky, retry_policy=RetryPolicy(max_attempts=3), sleep=fake_sleep)
+
+    assert asyncio.run(llm.acall("p", {})) == "ok"
+    assert delays == [1.5, 1.5]
+
+
+def test_circuit_breaker_fails_fast_until_reset():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10.0, clock=lambda: now[0])
+    calls = []
+
+    async def down(prompt, payload):
+        calls.append(prompt)
+        raise ClaudeMessagesError("503", status_code=503)
+
+    async def no_sleep(seconds):
+        return None
+
+    llm = ResilientLLMCallable(
+        down, retry_policy=RetryPolicy(max_attempts=2), breaker=breaker, sleep=no_sleep
+    )
+    with pytest.raises(ClaudeMessagesError):
+        asyncio.run(llm.acall("p", {}))
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(llm.acall("p", {}))
+
+    assert len(calls) == 2
+    now[0] = 11.0
+    assert breaker.state == "half_open"
+
+
+def test_cancelled_probe_releases_the_half_open_circuit():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10.0, clock=lambda: now[0])
+    breaker.record_failure(ClaudeMessagesError("503", status_code=503))
+    now[0] = 11.0
+
+    async def slow(prompt, payload):
+        await asyncio.sleep(5)
+        return "late"
+
+    async def recovered(prompt, payload):
+        return "ok"
+
+    async def scenario():
+        probe = ResilientLLMCallable(slow, breaker=breaker)
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(probe.acall("p", {}), 0.01)
+        return await ResilientLLMCallable(recovered, breaker=breaker).acall("p", {})
+
+    assert asyncio.run(scenario()) == "ok"
+    assert breaker.state == "closed"
+
+
+def test_hedged_call_returns_faster_duplicate():
+    delays = [0.5, 0.01]
+
+    async def slow_then_fast(prompt, payload):
+        await asyncio.sleep(delays.pop(0))
+        return "done"
+
+    tracker = LatencyTracker(min_samples=1)
+    tracker.observe(0.02)
+    llm = HedgedLLMCallable(slow_then_fast, tracker=tracker)
+
+    async def timed():
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        result = await llm.acall("p", {})
+        return result, loop.time() - started
+
+    result, elapsed = asyncio.run(timed())
+
+    assert result == "done"
+    assert llm.hedges == 1
+    assert elapsed < 0.3
+
+
+def test_completed_roles_survive_a_failing_role():
+    decision = {
+        "mode": "smart",
+        "selected_roles": [
+            {"name": "AntiochTeacher", "score": 0.9, "reason": "神学", "handoff_note": "最终输出"},
+            {"name": "LukeScribe", "score": 0.8, "reason": "背景", "handoff_note": "最终输出"},
+        ],
+        "overall_rationale": "并行。",
+        "fallback_plan": "无",
+    }
+
+    async def broken(context, role):
+        raise ClaudeMessagesError("upstream timeout", retryable=True)
+
+    orchestrator = build_default_orchestrator()
+    orchestrator.register("LukeScribe", broken)
+    service = RouterService(
+        meta_client=MetaRouterClient(lambda prompt, payload: json.dumps(decision, ensure_ascii=False)),
+        orchestrator=orchestrator,
+    )
+
+    result = asyncio.run(service.route("s-1", {"scripture": "徒11:26"}))
+
+    assert [output.role_name for output in result.role_outputs] == ["AntiochTeacher"]
+    assert any("LukeScribe" in warning for warning in result.warnings)
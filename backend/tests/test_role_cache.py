@@ -0,0 +1,131 @@
+import asyncio
+
+from backend.devolight_router.models import RoutingContext, SelectedRole, UserProfile
+from backend.devolight_router.services.cache import InMemoryCache
+from backend.devolight_router.services.executor import PromptRoleExecutor, build_default_orchestrator
+from backend.devolight_router.services.role_cache import RoleOutputCache, load_role_cache_policies
+from backend.devolight_router.warmup import parse_plan, warm_role_cache
+
+
+def _role(name):
+    return SelectedRole(name=name, score=0.9, reason="测试", handoff_note="最终输出")
+
+
+def _counting_llm():
+    calls = []
+
+    def llm_call(prompt, payload):
+        calls.append(payload)
+        return f"输出 {len(calls)}"
+
+    return llm_call, calls
+
+
+def test_scripture_level_output_is_shared_across_users():
+    llm_call, calls = _counting_llm()
+    cache = RoleOutputCache(InMemoryCache())
+    executor = PromptRoleExecutor(llm_call, "luke_scribe", output_cache=cache)
+    first = RoutingContext(scripture="约3:16", user_question="背景是什么？")
+    second = RoutingContext(
+        scripture="约3:16", user_question="谁写的？", user_profile=UserProfile(age_group="青年")
+    )
+
+    assert asyncio.run(executor(first, _role("LukeScribe"))) == "输出 1"
+    assert asyncio.run(executor(second, _role("LukeScribe"))) == "输出 1"
+    assert len(calls) == 1
+    assert cache.stats.hits == 1
+
+
+def test_profile_aware_policy_separates_users():
+    llm_call, calls = _counting_llm()
+    cache = RoleOutputCache(InMemoryCache())
+    executor = PromptRoleExecutor(llm_call, "martha_mentor", output_cache=cache)
+
+    asyncio.run(executor(RoutingContext(scripture="约3:16", user_question="如何应用？"), _role("MarthaMentor")))
+    asyncio.run(executor(RoutingContext(scripture="约3:16", user_question="怎么祷告？"), _role("MarthaMentor")))
+    asyncio.run(executor(RoutingContext(scripture="约3:16", user_question="如何应用？"), _role("MarthaMentor")))
+
+    assert len(calls) == 2
+
+
+def test_teacher_answers_are_not_shared_between_questions():
+    llm_call, calls = _counting_llm()
+    cache = RoleOutputCache(InMemoryCache())
+    executor = PromptRoleExecutor(llm_call, "antioch_teacher", output_cache=cache)
+    handoff = SelectedRole(name="AntiochTeacher", score=0.9, reason="测试", handoff_note="请交给马大姊妹")
+
+    first = asyncio.run(executor(RoutingContext(scripture="约3:16", user_question="何为重生？"), _role("AntiochTeacher")))
+    second = asyncio.run(executor(RoutingContext(scripture="约3:16", user_question="何为永生？"), _role("AntiochTeacher")))
+    asyncio.run(executor(RoutingContext(scripture="约3:16", user_question="何为重生？"), handoff))
+
+    assert (first, second) == ("输出 1", "输出 2")
+    assert len(calls) == 3
+    assert cache.stats.hits == 0
+
+
+def test_uncached_role_and_missing_scripture_bypass_cache():
+    llm_call, calls = _counting_llm()
+    cache = RoleOutputCache(InMemoryCache())
+    barnabas = PromptRoleExecutor(llm_call, "barnabas_companion", output_cache=cache)
+    luke = PromptRoleExecutor(llm_call, "luke_scribe", output_cache=cache)
+
+    for _ in range(2):
+        asyncio.run(barnabas(RoutingContext(scripture="约3:16"), _role("BarnabasCompanion")))
+        asyncio.run(luke(RoutingContext(), _role("LukeScribe")))
+
+    assert len(calls) == 4
+    assert len(cache.backend) == 0
+
+
+def test_streamed_output_is_cached():
+    async def astream(prompt, payload):
+        for chunk in ("经文", "背景"):
+            yield chunk
+
+    class StreamingLLM:
+        def __init__(self):
+            self.streams = 0
+
+        def __call__(self, prompt, payload):
+            raise AssertionError("non-streaming path should not be used")
+
+        async def astream(self, prompt, payload):
+            self.streams += 1
+            async for chunk in astream(prompt, payload):
+                yield chunk
+
+    async def collect(executor):
+        return [chunk async for chunk in executor.stream(RoutingContext(scripture="约3:16"), _role("LukeScribe"))]
+
+    llm = StreamingLLM()
+    executor = PromptRoleExecutor(llm, "luke_scribe", output_cache=RoleOutputCache(InMemoryCache()))
+
+    assert asyncio.run(collect(executor)) == ["经文", "背景"]
+    assert asyncio.run(collect(executor)) == ["经文背景"]
+    assert llm.streams == 1
+
+
+def test_policies_load_from_json(tmp_path):
+    path = tmp_path / "policies.json"
+    path.write_text('{"LukeScribe": {"key_fields": ["scripture"]}, "MarthaMentor": null}', encoding="utf-8")
+
+    policies = load_role_cache_policies(str(path))
+
+    assert policies["LukeScribe"].key_fields == ("scripture",)
+    assert "MarthaMentor" not in policies
+    assert policies["AntiochTeacher"].shared
+
+
+def test_warm_up_precomputes_shared_roles():
+    llm_call, calls = _counting_llm()
+    cache = RoleOutputCache(InMemoryCache())
+    orchestrator = build_default_orchestrator(llm_call, output_cache=cache)
+    entries = parse_plan(['{"scripture": "约3:16"}', "", "not json", '{"scripture": "诗23"}'])
+
+    report = asyncio.run(warm_role_cache(orchestrator, cache, entries))
+
+    assert report.entries == 2
+    assert report.outputs == 4  # AntiochTeacher + LukeScribe per passage
+    executor = PromptRoleExecutor(llm_call, "antioch_teacher", output_cache=cache)
+    asyncio.run(executor(RoutingContext(scripture="诗23"), _role("AntiochTeacher")))
+    assert len(calls) == 4
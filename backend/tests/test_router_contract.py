@@ -1,3 +1,4 @@
+import asyncio
 import json
 
 import pytest
@@ -9,8 +10,8 @@ from backend.devolight_router.services.router import (
     ContextBuilder,
     FallbackManager,
     RouterService,
-    SessionRepository,
 )
+from backend.devolight_router.services.sessions import InMemorySessionRepository
 
 
 def test_meta_router_client_parses_valid_json():
@@ -34,7 +35,7 @@ def test_meta_router_client_parses_valid_json():
     client = MetaRouterClient(lambda prompt, payload: raw_response)
     context = RoutingContext(scripture="约3:16")
 
-    decision = client.route(context)
+    decision = asyncio.run(client.route(context))
 
     assert decision.mode is RoutingMode.SINGLE
     assert decision.selected_roles[0].name == "AntiochTeacher"
@@ -45,7 +46,7 @@ def test_meta_router_client_raises_on_invalid_json():
     context = RoutingContext(scripture="约3:16")
 
     with pytest.raises(MetaRouterResponseError):
-        client.route(context)
+        asyncio.run(client.route(context))
 
 
 def test_router_service_runs_with_stub_meta_router():
@@ -80,15 +81,17 @@ def test_router_service_runs_with_stub_meta_router():
         context_builder=ContextBuilder(),
         orchestrator=orchestrator,
         fallback_manager=FallbackManager(),
-        session_repository=SessionRepository(),
+        session_repository=InMemorySessionRepository(),
     )
 
-    result = service.route(
-        session_id="session-1",
-        raw_payload={
-            "scripture": "约3:16",
-            "user_question": "这段经文在生活中如何应用？",
-        },
+    result = asyncio.run(
+        service.route(
+            session_id="session-1",
+            raw_payload={
+                "scripture": "约3:16",
+                "user_question": "这段经文在生活中如何应用？",
+            },
+        )
     )
 
     assert result.decision.mode is RoutingMode.SMART
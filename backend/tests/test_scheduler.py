@@ -0,0 +1,99 @@
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.devolight_router.container import AppContainer
+from backend.devolight_router.main import app, get_container
+from backend.devolight_router.services.meta_client import MetaRouterClient
+from backend.devolight_router.services.router import RouterService
+from backend.devolight_router.services.scheduler import (
+    BATCH,
+    META,
+    LLMScheduler,
+    ScheduledLLMCallable,
+    SchedulerOverloadedError,
+    call_kind,
+    traffic_class,
+)
+
+
+def test_waiting_calls_are_admitted_by_priority():
+    scheduler = LLMScheduler(max_in_flight=1)
+    order = []
+
+    async def call(name, traffic, kind):
+        with traffic_class(traffic), call_kind(kind):
+            async with scheduler.slot():
+                order.append(name)
+
+    async def scenario():
+        await scheduler.acquire()
+        tasks = [
+            asyncio.ensure_future(call("batch-role", BATCH, "role")),
+            asyncio.ensure_future(call("interactive-role", "interactive", "role")),
+            asyncio.ensure_future(call("batch-meta", BATCH, META)),
+            asyncio.ensure_future(call("interactive-meta", "interactive", META)),
+        ]
+        await asyncio.sleep(0)
+        assert scheduler.stats()["queued"] == 4
+        scheduler.release()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+
+    assert order == ["interactive-meta", "interactive-role", "batch-meta", "batch-role"]
+    assert scheduler.stats() == {"in_flight": 0, "queued": 0, "admitted": 5, "rejected": 0}
+
+
+def test_queue_timeout_sheds_with_retry_after():
+    scheduler = LLMScheduler(max_in_flight=1, queue_timeout=0.05)
+
+    async def scenario():
+        await scheduler.acquire()
+        with pytest.raises(SchedulerOverloadedError) as excinfo:
+            await scheduler.acquire()
+        scheduler.release()
+        await scheduler.acquire()  # the shed waiter did not leak a slot
+        return excinfo.value
+
+    error = asyncio.run(scenario())
+
+    assert error.retry_after >= 1
+    assert scheduler.rejected == 1
+    assert scheduler.in_flight == 1
+
+
+def test_request_and_token_buckets_pace_calls():
+    scheduler = LLMScheduler(requests_per_minute=600, tokens_per_minute=60_000, burst_seconds=0.1)
+    calls = []
+
+    async def llm(prompt, payload):
+        calls.append(time.perf_counter())
+        return "ok"
+
+    scheduled = ScheduledLLMCallable(llm, scheduler)
+
+    async def scenario():
+        await asyncio.gather(*(scheduled.acall("提示词", {"text": "经文"}) for _ in range(3)))
+
+    asyncio.run(scenario())
+
+    # one request of burst, then 10 requests/s
+    assert calls[2] - calls[0] >= 0.15
+
+
+def test_route_returns_503_with_retry_after_when_shed():
+    def overloaded(prompt, payload):
+        raise SchedulerOverloadedError("服务繁忙", retry_after=7)
+
+    container = AppContainer(router_service=RouterService(meta_client=MetaRouterClient(overloaded)))
+    app.dependency_overrides[get_container] = lambda: container
+    try:
+        response = TestClient(app).post("/route", params={"session_id": "s"}, json={"scripture": "约3:16"})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "7"
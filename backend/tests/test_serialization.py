@@ -0,0 +1,79 @@
+import asyncio
+import json
+
+import httpx
+from fastapi.testclient import TestClient
+
+from backend.devolight_router.container import AppContainer
+from backend.devolight_router.main import RouterResponseModel, app, get_container
+from backend.devolight_router.services import serialization
+from backend.devolight_router.services.executor import build_default_orchestrator
+from backend.devolight_router.services.llm_client import ClaudeMessagesCallable
+from backend.devolight_router.services.meta_client import MetaRouterClient
+from backend.devolight_router.services.router import RouterService
+from backend.devolight_router.services.scheduler import LLMScheduler, ScheduledLLMCallable
+from backend.devolight_router.services.serialization import EncodedPayload
+
+
+def test_payload_is_encoded_once_for_estimate_and_request_body(monkeypatch):
+    encodings = []
+    original = serialization.dumps_str
+
+    def counting_dumps_str(value, **kwargs):
+        encodings.append(value)
+        return original(value, **kwargs)
+
+    monkeypatch.setattr(serialization, "dumps_str", counting_dumps_str)
+    bodies = []
+
+    def handler(request):
+        bodies.append(request.content)
+        return httpx.Response(200, json={"content": [{"type": "text", "text": "平安"}]})
+
+    llm_call = ClaudeMessagesCallable(
+        api_key="key",
+        base_url="http://claude.test",
+        model="m",
+        async_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+    scheduled = ScheduledLLMCallable(llm_call, LLMScheduler())
+    payload = EncodedPayload(scripture="约3:16", user_question="何为重生？")
+
+    assert asyncio.run(scheduled.acall("提示词", payload)) == "平安"
+
+    assert [value for value in encodings if value is payload] == [payload]
+    body = json.loads(bodies[0])
+    assert json.loads(body["messages"][0]["content"][0]["text"]) == payload
+    assert "约3:16".encode("utf-8") in bodies[0]  # not ASCII-escaped
+
+
+def test_route_response_matches_the_documented_model():
+    decision = {
+        "mode": "single",
+        "selected_roles": [
+            {"name": "LukeScribe", "score": 0.9, "reason": "历史背景", "handoff_note": "最终输出"}
+        ],
+        "overall_rationale": "单角色即可。",
+        "fallback_plan": "无",
+        "warnings": [],
+    }
+
+    def llm_call(prompt, payload):
+        return json.dumps(decision, ensure_ascii=False) if "selected_roles" in prompt else "路加的回应"
+
+    service = RouterService(
+        meta_client=MetaRouterClient(llm_call), orchestrator=build_default_orchestrator(llm_call)
+    )
+    container = AppContainer(router_service=service)
+    app.dependency_overrides[get_container] = lambda: container
+    try:
+        response = TestClient(app).post("/route", params={"session_id": "s"}, json={"scripture": "路2:1"})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    model = RouterResponseModel.parse_raw(response.content)
+    assert json.loads(response.content) == json.loads(model.json())
+    assert json.loads(model.decision.json()) == decision
+    assert [output.content for output in model.role_outputs] == ["路加的回应"]
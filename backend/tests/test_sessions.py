@@ -0,0 +1,105 @@
+from datetime import datetime
+
+from backend.devolight_router.models import RoleCallRecord, SessionState
+from backend.devolight_router.services.sessions import (
+    InMemorySessionRepository,
+    SQLiteSessionRepository,
+)
+
+
+def test_in_memory_repository_bounds_sessions_ttl_and_history():
+    now = [0.0]
+    repository = InMemorySessionRepository(
+        max_sessions=2, idle_ttl_seconds=60.0, max_recent_calls=2, clock=lambda: now[0]
+    )
+    state = SessionState(
+        session_id="a",
+        recent_calls=[RoleCallRecord(role_name=name) for name in ("AntiochTeacher", "LukeScribe", "MarthaMentor")],
+    )
+    repository.save(state)
+    repository.save(SessionState(session_id="b"))
+    repository.save(SessionState(session_id="c"))
+
+    assert repository.get("a") is None
+    assert len(repository) == 2
+    assert [call.role_name for call in state.recent_calls] == ["LukeScribe", "MarthaMentor"]
+    now[0] = 61.0
+    assert repository.get("b") is None
+
+
+def test_sqlite_repository_appends_only_new_calls(tmp_path):
+    path = str(tmp_path / "sessions.sqlite3")
+    repository = SQLiteSessionRepository(path, max_recent_calls=3)
+    state = SessionState(session_id="s", summary="第一轮")
+    state.recent_calls.append(RoleCallRecord(role_name="AntiochTeacher"))
+    repository.save(state)
+
+    loaded = repository.get("s")
+    loaded.recent_calls.append(RoleCallRecord(role_name="BarnabasCompanion"))
+    loaded.summary = "第二轮"
+    repository.save(loaded)
+    repository.close()
+
+    reopened = SQLiteSessionRepository(path, max_recent_calls=3)
+    restored = reopened.get("s")
+    rows = reopened._conn.execute("SELECT COUNT(*) FROM role_calls").fetchone()[0]
+    reopened.close()
+
+    assert restored.summary == "第二轮"
+    assert restored.last_role() == "BarnabasCompanion"
+    assert rows == 2
+
+
+def test_in_memory_repository_keeps_compact_ring_buffer_history():
+    repository = InMemorySessionRepository(max_recent_calls=3)
+    repository.save(
+        SessionState(
+            session_id="s",
+            summary="初次灵修",
+            last_known_spiritual_state="平安",
+            recent_calls=[RoleCallRecord(role_name="AntiochTeacher", highlights="重生")],
+        )
+    )
+    for name in ("LukeScribe", "MarthaMentor", "BarnabasCompanion"):
+        state = repository.get("s")
+        state.recent_calls.append(RoleCallRecord(role_name=name))
+        repository.save(state)
+
+    compact = repository._store["s"]
+    assert len(compact) == 3 and compact._head == 1  # wrapped once, updated in place
+    assert compact._extras == {}  # the highlighted call was evicted with its extras
+    state = repository.get("s")
+    assert [call.role_name for call in state.recent_calls] == [
+        "LukeScribe",
+        "MarthaMentor",
+        "BarnabasCompanion",
+    ]
+    assert state.last_role() == compact.last_role() == "BarnabasCompanion"
+    assert (state.summary, state.last_known_spiritual_state) == ("初次灵修", "平安")
+    state.summary = "未保存的修改"
+    assert repository.get("s").summary == "初次灵修"
+
+
+def test_in_memory_repository_keeps_calls_made_in_the_same_millisecond():
+    repository = InMemorySessionRepository(max_recent_calls=3)
+    now = datetime(2026, 1, 1, 8, 0, 0)
+    repository.save(
+        SessionState(
+            session_id="s",
+            recent_calls=[
+                RoleCallRecord(role_name="LukeScribe", timestamp=now, highlights="第一次"),
+                RoleCallRecord(role_name="LukeScribe", timestamp=now, feedback="第二次"),
+            ],
+        )
+    )
+    state = repository.get("s")
+    state.recent_calls.append(RoleCallRecord(role_name="LukeScribe", timestamp=now))
+    repository.save(state)
+
+    calls = repository.get("s").recent_calls
+    assert [(call.highlights, call.feedback) for call in calls] == [
+        ("第一次", None),
+        (None, "第二次"),
+        (None, None),
+    ]
+    assert repository._store["s"]._head == 0 and len(repository._store["s"]) == 3
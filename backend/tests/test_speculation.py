@@ -0,0 +1,172 @@
+import asyncio
+import json
+import time
+
+from backend.devolight_router.models import RoleCallRecord, RoutingContext, RoutingDecision, SessionState
+from backend.devolight_router.services.executor import build_default_orchestrator
+from backend.devolight_router.services.meta_client import MetaRouterClient
+from backend.devolight_router.services.router import (
+    ContextBuilder,
+    ExecutionOrchestrator,
+    FallbackManager,
+    RouterService,
+)
+from backend.devolight_router.services.speculation import RolePredictor, RoleSpeculator
+
+
+def _decision(*roles):
+    return json.dumps(
+        {
+            "mode": "smart",
+            "selected_roles": [
+                {"name": name, "score": 0.9, "reason": "测试。", "handoff_note": note}
+                for name, note in roles
+            ],
+            "overall_rationale": "测试。",
+            "fallback_plan": "无。",
+            "warnings": [],
+        },
+        ensure_ascii=False,
+    )
+
+
+def _service(decision, role_calls, speculator_kwargs=None):
+    async def meta_llm(prompt, payload):
+        await asyncio.sleep(0.2)
+        return decision
+
+    async def role(context, selected):
+        role_calls.append(selected.name)
+        await asyncio.sleep(0.2)
+        return f"{selected.name} 的输出"
+
+    orchestrator = ExecutionOrchestrator(
+        {"AntiochTeacher": role, "MarthaMentor": role, "LukeScribe": role}
+    )
+    speculator = RoleSpeculator(orchestrator, **(speculator_kwargs or {}))
+    service = RouterService(
+        meta_client=MetaRouterClient(meta_llm),
+        context_builder=ContextBuilder(),
+        orchestrator=orchestrator,
+        fallback_manager=FallbackManager(),
+        speculator=speculator,
+    )
+    return service, speculator
+
+
+def test_predictor_uses_priors_then_observed_decisions_and_session_history():
+    predictor = RolePredictor(min_samples=2)
+    passage = RoutingContext(scripture="约3:16")
+    question = RoutingContext(scripture="约3:16", user_question="如何应用？")
+
+    assert predictor.predict(passage, None) == ["AntiochTeacher"]
+    assert predictor.predict(question, None) == []
+
+    session = SessionState(
+        session_id="s",
+        recent_calls=[RoleCallRecord(role_name="MarthaMentor")] * 3,
+    )
+    martha_only = RoutingDecision.parse_raw(_decision(("MarthaMentor", "最终输出")))
+    for _ in range(2):
+        predictor.observe(question, martha_only)
+
+    assert predictor.scores(question, None) == {"MarthaMentor": 1.0}
+    assert predictor.predict(question, session) == ["MarthaMentor"]
+    assert predictor.scores(passage, session)["AntiochTeacher"] < 0.6
+
+
+def test_compatible_prediction_is_reused_and_overlaps_the_meta_call():
+    role_calls = []
+    service, speculator = _service(_decision(("AntiochTeacher", "最终输出")), role_calls)
+
+    started = time.perf_counter()
+    result = asyncio.run(service.route("s", {"scripture": "约3:16"}))
+    elapsed = time.perf_counter() - started
+
+    assert [output.role_name for output in result.role_outputs] == ["AntiochTeacher"]
+    assert role_calls == ["AntiochTeacher"]
+    assert elapsed < 0.35
+    stats = speculator.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 0, 1.0)
+    assert stats["saved_seconds"] > 0.1
+
+
+def test_incompatible_prediction_is_cancelled_and_charged_to_the_waste_budget():
+    role_calls = []
+    decision = _decision(("AntiochTeacher", "请交给马大姊妹延伸应用。"), ("MarthaMentor", "最终输出"))
+    service, speculator = _service(
+        decision,
+        role_calls,
+        {"waste_budget_tokens_per_minute": 1_500, "estimated_tokens_per_role": 1_500},
+    )
+
+    async def scenario():
+        first = await service.route("s", {"scripture": "约3:16"})
+        second = await service.route("s", {"scripture": "约3:17"})
+        return first, second
+
+    first, second = asyncio.run(scenario())
+
+    assert [output.role_name for output in first.role_outputs] == ["AntiochTeacher", "MarthaMentor"]
+    assert all(output.error is None for output in second.role_outputs)
+    # speculative teacher + the real two-stage run, then no speculation once the budget is spent
+    assert role_calls.count("AntiochTeacher") == 3
+    assert speculator.stats() == {
+        "hits": 0,
+        "misses": 1,
+        "skipped": 1,
+        "hit_rate": 0.0,
+        "wasted_tokens": 1_500,
+        "saved_seconds": 0.0,
+    }
+
+
+def test_prediction_with_a_different_handoff_note_is_discarded():
+    role_calls = []
+    decision = _decision(("AntiochTeacher", "最终输出，请着重解释重生。"))
+    service, speculator = _service(decision, role_calls)
+
+    result = asyncio.run(service.route("s", {"scripture": "约3:16"}))
+
+    assert [output.role_name for output in result.role_outputs] == ["AntiochTeacher"]
+    assert role_calls == ["AntiochTeacher", "AntiochTeacher"]
+    assert (speculator.stats()["hits"], speculator.stats()["misses"]) == (0, 1)
+
+
+def test_stream_reuses_a_compatible_prediction():
+    role_calls = []
+    service, speculator = _service(_decision(("AntiochTeacher", "最终输出")), role_calls)
+
+    async def collect():
+        return [event async for event in service.stream("s", {"scripture": "约3:16"})]
+
+    events = asyncio.run(collect())
+
+    assert [e.data["text"] for e in events if e.event == "role_delta"] == ["AntiochTeacher 的输出"]
+    assert role_calls == ["AntiochTeacher"]
+    assert speculator.stats()["hits"] == 1
+
+
+def test_speculative_payload_leaves_out_the_routing_annotations_without_compaction():
+    payloads = []
+
+    async def llm_call(prompt, payload):
+        if "selected_roles" in prompt:
+            await asyncio.sleep(0.1)
+            return _decision(("AntiochTeacher", "最终输出"))
+        payloads.append(dict(payload))
+        return "老师的讲解"
+
+    orchestrator = build_default_orchestrator(llm_call)  # no compactor
+    speculator = RoleSpeculator(orchestrator)
+    service = RouterService(
+        meta_client=MetaRouterClient(llm_call), orchestrator=orchestrator, speculator=speculator
+    )
+
+    result = asyncio.run(service.route("s", {"scripture": "约3:16"}))
+
+    assert [output.content for output in result.role_outputs] == ["老师的讲解"]
+    assert speculator.stats()["hits"] == 1
+    [payload] = payloads
+    assert payload["handoff_note"] == "最终输出"
+    assert "role_reason" not in payload and "role_score" not in payload
@@ -0,0 +1,160 @@
+import asyncio
+import json
+import time
+
+import httpx
+from fastapi.testclient import TestClient
+
+from backend.devolight_router.main import app, get_router_service
+from backend.devolight_router.services.degradation import DegradationPolicy
+from backend.devolight_router.services.executor import build_default_orchestrator
+from backend.devolight_router.services.llm_client import ClaudeMessagesCallable, ClaudeMessagesError
+from backend.devolight_router.services.meta_client import MetaRouterClient
+from backend.devolight_router.services.router import ExecutionOrchestrator, RouterService
+from backend.devolight_router.services.sessions import InMemorySessionRepository
+
+DECISION = {
+    "mode": "smart",
+    "selected_roles": [
+        {"name": "AntiochTeacher", "score": 0.9, "reason": "神学", "handoff_note": "最终输出"},
+        {"name": "BarnabasCompanion", "score": 0.8, "reason": "陪伴", "handoff_note": "最终输出"},
+    ],
+    "overall_rationale": "神学与陪伴并行。",
+    "fallback_plan": "无",
+    "warnings": [],
+}
+
+
+def test_astream_yields_text_deltas():
+    events = [
+        {"type": "message_start", "message": {}},
+        {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": "神爱"}},
+        {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": "世人"}},
+        {"type": "message_stop"},
+    ]
+    body = "".join(f"event: {event['type']}\ndata: {json.dumps(event)}\n\n" for event in events)
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert json.loads(request.content)["stream"] is True
+        return httpx.Response(200, text=body, headers={"Content-Type": "text/event-stream"})
+
+    llm_call = ClaudeMessagesCallable(
+        api_key="key",
+        base_url="http://claude.test",
+        model="m",
+        async_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+
+    async def collect():
+        return [chunk async for chunk in llm_call.astream("prompt", {"scripture": "约3:16"})]
+
+    assert asyncio.run(collect()) == ["神爱", "世人"]
+
+
+def test_route_stream_emits_decision_roles_then_warnings():
+    service = RouterService(
+        meta_client=MetaRouterClient(lambda prompt, payload: json.dumps(DECISION, ensure_ascii=False)),
+        orchestrator=build_default_orchestrator(),
+        session_repository=InMemorySessionRepository(),
+    )
+    app.dependency_overrides[get_router_service] = lambda: service
+    try:
+        client = TestClient(app)
+        response = client.post("/route/stream?session_id=s-1", json={"scripture": "约3:16"})
+    finally:
+        app.dependency_overrides.clear()
+
+    names = [line[len("event: "):] for line in response.text.splitlines() if line.startswith("event: ")]
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert names[0] == "decision"
+    assert names[-1] == "warnings"
+    assert names.count("role_delta") == 2
+    assert names.count("role_end") == 2
+
+
+def test_abandoned_stream_releases_the_session_and_stops_waiting_at_the_deadline():
+    async def llm_call(prompt, payload):
+        if "selected_roles" in prompt:
+            return json.dumps(DECISION, ensure_ascii=False)
+        await asyncio.sleep(5)
+        return "太迟了"
+
+    service = RouterService(
+        meta_client=MetaRouterClient(llm_call),
+        orchestrator=build_default_orchestrator(llm_call),
+        request_timeout=0.3,
+    )
+
+    async def scenario():
+        abandoned = service.stream("s", {"scripture": "约3:16"})
+        first = await abandoned.__anext__()
+        await abandoned.aclose()
+        unlocked = service.stats()["locked_sessions"] == 0
+        started = time.perf_counter()
+        events = [event async for event in service.stream("s", {"scripture": "约3:16"})]
+        return first, unlocked, events, time.perf_counter() - started
+
+    first, unlocked, events, elapsed = asyncio.run(scenario())
+
+    assert first.event == "decision"
+    assert unlocked
+    assert elapsed < 1.0
+    names = [event.event for event in events]
+    assert names.count("role_error") == 2
+    assert names[-1] == "warnings"
+
+
+def test_deadline_does_not_cut_off_a_role_that_is_already_streaming():
+    class SlowTeacher:
+        async def __call__(self, context, role):
+            return "".join([chunk async for chunk in self.stream(context, role)])
+
+        async def stream(self, context, role):
+            for chunk in ("神爱", "世人", "。"):
+                yield chunk
+                await asyncio.sleep(0.15)
+
+    decision = {**DECISION, "mode": "single", "selected_roles": DECISION["selected_roles"][:1]}
+    service = RouterService(
+        meta_client=MetaRouterClient(lambda prompt, payload: json.dumps(decision, ensure_ascii=False)),
+        orchestrator=ExecutionOrchestrator({"AntiochTeacher": SlowTeacher()}),
+        request_timeout=0.2,
+    )
+
+    async def scenario():
+        return [event async for event in service.stream("s", {"scripture": "约3:16"})]
+
+    events = asyncio.run(scenario())
+
+    assert "".join(e.data["text"] for e in events if e.event == "role_delta") == "神爱世人。"
+    assert [e.data["freshness"] for e in events if e.event == "role_end"] == ["fresh"]
+
+
+def test_stream_through_a_failing_meta_router_degrades_like_route():
+    async def down(prompt, payload):
+        if "selected_roles" in prompt:
+            raise ClaudeMessagesError("上游繁忙", status_code=529)
+        return "安提阿老师的讲解"
+
+    async def garbled(prompt, payload):
+        return "这不是 JSON"
+
+    def service(llm_call):
+        policy = DegradationPolicy()
+        return RouterService(
+            meta_client=MetaRouterClient(llm_call),
+            orchestrator=build_default_orchestrator(llm_call, degradation=policy),
+            degradation=policy,
+        )
+
+    async def collect(llm_call):
+        return [event async for event in service(llm_call).stream("s", {"scripture": "约3:16"})]
+
+    degraded = asyncio.run(collect(down))
+    halted = asyncio.run(collect(garbled))
+
+    assert degraded[0].data["mode"] == "single"
+    assert [e.data["text"] for e in degraded if e.event == "role_delta"] == ["安提阿老师的讲解"]
+    assert "上游繁忙" in degraded[-1].data["warnings"]
+    assert [event.event for event in halted] == ["decision", "warnings"]
+    assert halted[0].data["mode"] == "halt"
@@ -0,0 +1,118 @@
+import asyncio
+import json
+
+from backend.devolight_router.models import RoutingContext, SessionState
+from backend.devolight_router.services.executor import build_default_orchestrator
+from backend.devolight_router.services.meta_client import MetaRouterClient
+from backend.devolight_router.services.router import (
+    ContextBuilder,
+    FallbackManager,
+    RoleExecutionResult,
+    RouterService,
+    SessionLocks,
+)
+from backend.devolight_router.services.sessions import InMemorySessionRepository
+from backend.devolight_router.services.summarizer import SessionSummarizer
+
+DECISION = {
+    "mode": "single",
+    "selected_roles": [
+        {"name": "AntiochTeacher", "score": 0.9, "reason": "神学", "handoff_note": "最终输出"}
+    ],
+    "overall_rationale": "只需神学解释。",
+    "fallback_plan": "无",
+    "warnings": [],
+}
+
+
+def _output(content):
+    return RoleExecutionResult(role_name="AntiochTeacher", content=content)
+
+
+def _summary_llm(calls, reply="用户在学习约3:16，关注神的爱。"):
+    def llm_call(prompt, payload):
+        calls.append(payload)
+        return reply
+
+    return llm_call
+
+
+def test_debounce_folds_several_turns_into_one_call():
+    calls = []
+    repository = InMemorySessionRepository()
+    repository.save(SessionState(session_id="s", summary="之前讨论过诗篇23篇。"))
+    summarizer = SessionSummarizer(_summary_llm(calls), repository, debounce_seconds=10.0)
+
+    async def scenario():
+        for question in ("这段经文讲什么？", "如何应用？"):
+            summarizer.schedule("s", RoutingContext(scripture="约3:16", user_question=question), [_output("回答")])
+        await summarizer.flush()
+
+    asyncio.run(scenario())
+
+    assert len(calls) == 1
+    assert calls[0]["previous_summary"] == "之前讨论过诗篇23篇。"
+    assert [turn["user_question"] for turn in calls[0]["new_turns"]] == ["这段经文讲什么？", "如何应用？"]
+    assert repository.get("s").summary == "用户在学习约3:16，关注神的爱。"
+    assert summarizer.stats() == {"scheduled": 2, "completed": 1, "failed": 0, "pending_sessions": 0}
+
+
+def test_failed_summary_keeps_previous_one():
+    def failing_llm(prompt, payload):
+        raise RuntimeError("upstream down")
+
+    repository = InMemorySessionRepository()
+    repository.save(SessionState(session_id="s", summary="旧摘要"))
+    summarizer = SessionSummarizer(failing_llm, repository, debounce_seconds=0.0)
+
+    async def scenario():
+        summarizer.schedule("s", RoutingContext(scripture="约3:16"), [_output("回答")])
+        await summarizer.flush()
+
+    asyncio.run(scenario())
+
+    assert repository.get("s").summary == "旧摘要"
+    assert summarizer.failed == 1
+
+
+def test_router_hands_turns_to_summarizer_and_reads_summary_back():
+    summary_calls = []
+
+    def llm_call(prompt, payload):
+        if "selected_roles" in prompt:
+            return json.dumps(DECISION, ensure_ascii=False)
+        return "神爱世人。"
+
+    repository = InMemorySessionRepository()
+    locks = SessionLocks()
+    summarizer = SessionSummarizer(
+        _summary_llm(summary_calls, "用户关心约3:16中神的爱。"),
+        repository,
+        locks=locks,
+        debounce_seconds=0.0,
+    )
+    service = RouterService(
+        meta_client=MetaRouterClient(llm_call),
+        context_builder=ContextBuilder(),
+        orchestrator=build_default_orchestrator(llm_call),
+        fallback_manager=FallbackManager(),
+        session_repository=repository,
+        summarizer=summarizer,
+        session_locks=locks,
+    )
+
+    async def scenario():
+        await service.route("s", {"scripture": "约3:16", "user_question": "讲什么？"})
+        # the rationale no longer overwrites the rolling summary
+        assert repository.get("s").summary is None
+        await summarizer.flush()
+        return service._context_builder.build(
+            {"scripture": "约3:16"}, repository.get("s")
+        )
+
+    context = asyncio.run(scenario())
+
+    assert summary_calls[0]["new_turns"][0]["outputs"] == [
+        {"role_name": "AntiochTeacher", "content": "神爱世人。"}
+    ]
+    assert context.history_summary == "用户关心约3:16中神的爱。"
@@ -248,6 +248,13 @@ function App() {
                       <Box key={output.role_name}>
                         <Typography variant="subtitle1" gutterBottom>
                           {output.role_name}
+                          {output.freshness !== 'fresh' && (
+                            <Chip
+                              size="small"
+                              sx={{ ml: 1 }}
+                              label={output.freshness === 'stale' ? '缓存内容' : '备用内容'}
+                            />
+                          )}
                         </Typography>
                         <Paper variant="outlined" sx={{ p: 2, whiteSpace: 'pre-wrap' }}>
                           {output.content}
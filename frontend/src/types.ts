@@ -16,6 +16,7 @@ export interface RoutingDecision {
 export interface RoleOutputModel {
   role_name: string;
   content: string;
+  freshness: 'fresh' | 'stale' | 'stub';
 }
 
 export interface RouterResponse {